@@ -86,9 +86,48 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests (seconds); the pragmas below then run once per connection
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent writers wait in busy_timeout
+            # instead of failing when a read transaction has to be upgraded to a write
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# SQLite performance profile, applied to every new SQLite connection (see datavis_project/sqlite.py)
+# Set to {} to use SQLite's defaults (rollback journal, synchronous=FULL, 5 s lock timeout).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',          # Readers and the writer no longer block each other
+    'synchronous': 'NORMAL',        # Durable with WAL; fsync only at checkpoints
+    'busy_timeout': 20000,          # Milliseconds to wait for the write lock before "database is locked"
+    'cache_size': -64000,           # Page cache per connection; negative values are KiB (64 MB)
+    'mmap_size': 256 * 1024 * 1024, # Read pages through a memory map instead of read() calls
+    'temp_store': 'MEMORY',         # GROUP BY / ORDER BY temporary B-trees
+}
+
+# Keep sessions (and the cache) in their own SQLite file, so session reads and writes never
+# wait for upload/ingest transactions on the main database. After enabling, run:
+#   python manage.py migrate --database=sessions && python manage.py createcachetable --database=sessions
+SEPARATE_SESSION_DATABASE = False
+
+if SEPARATE_SESSION_DATABASE:
+    DATABASES['sessions'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'sessions.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }
+    DATABASE_ROUTERS = ['datavis_project.sqlite.SessionDatabaseRouter']
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'datavis_cache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -139,6 +178,41 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # The URL prefix for serving media files
 MEDIA_URL = '/media/'
 
+# Content-addressed cache of parsed uploads (see file_handlers/parse_cache.py)
+# Re-uploading an identical file reuses the cached dataset instead of converting it again.
+PARSE_CACHE_DIR = os.path.join(MEDIA_ROOT, 'parse_cache')
+PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024 # Disk quota; least recently used entries are evicted beyond it
+
+# Django's upload handlers, hashing each upload while it is stored (content_hash, see visualizer/upload_handlers.py)
+FILE_UPLOAD_HANDLERS = [
+    'visualizer.upload_handlers.HashingMemoryFileUploadHandler',
+    'visualizer.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+
+# Rows per executemany INSERT batch (and per database transaction) when bank rows are written to Transaction
+TRANSACTION_INGEST_BATCH_SIZE = 5000
+
+# Uploads stored on disk are parsed in a pool of converter processes (see visualizer/converter_pool.py),
+# started from a process that imported pandas and the converters once.
+# Results come back as columnar files. 0 parses in the thread handling the upload.
+# The pool belongs to each server process: with N WSGI/ASGI worker processes (e.g. gunicorn --workers N)
+# up to N x CONVERTER_POOL_WORKERS converters run, so keep N x CONVERTER_POOL_WORKERS near os.cpu_count().
+CONVERTER_POOL_WORKERS = 2
+# Start each server process's converters when datavis_project/wsgi.py is loaded instead of on its
+# first large upload; with many server processes this starts N x CONVERTER_POOL_WORKERS at once.
+CONVERTER_POOL_WARM_UP = False
+CONVERTER_POOL_QUEUE_DEPTH = 8 # Conversions waiting for a free worker before new ones wait for a queue slot
+CONVERTER_POOL_QUEUE_TIMEOUT = 60 # Seconds to wait for a queue slot before reporting the server as busy
+CONVERTER_POOL_MIN_BYTES = 256 * 1024 # Smaller uploads are parsed in the calling thread
+CONVERTER_POOL_START_METHOD = 'forkserver'
+
+# Uploads are converted by background jobs (see visualizer/jobs.py); the upload response
+# returns immediately and the job page reports progress. False converts within the request.
+CONVERSION_JOBS_ENABLED = True
+# Conversions running at the same time in each server process; a job mostly waits for its converter process
+CONVERSION_JOB_WORKERS = max(2, CONVERTER_POOL_WORKERS)
+CONVERSION_JOB_STALE_SECONDS = 300 # A running job without progress for this long is reported as failed
+
 # Construct the expected path to the custom_filters.py file
 # Assumes visualizer app is directly in your project root
 visualizer_app_path = os.path.join(settings.BASE_DIR, 'visualizer')
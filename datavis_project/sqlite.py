@@ -0,0 +1,50 @@
+# In datavis_project/sqlite.py
+
+import logging
+
+from django.conf import settings
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+SESSION_DATABASE = 'sessions'
+# App labels stored in the separate session database (django_cache is the DatabaseCache table)
+SESSION_APP_LABELS = ('sessions', 'django_cache')
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    connection_created receiver: applies settings.SQLITE_PRAGMAS to every new SQLite connection.
+    With CONN_MAX_AGE, connections are reused across requests, so this runs once per connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    logger.debug(f"Debug in apply_sqlite_pragmas: Applied {len(pragmas)} pragmas to '{connection.alias}'.")
+
+
+class SessionDatabaseRouter:
+    """Routes sessions and the database cache to the 'sessions' database (see SEPARATE_SESSION_DATABASE)."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in SESSION_APP_LABELS:
+            return SESSION_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label in SESSION_APP_LABELS:
+            return db == SESSION_DATABASE
+        if db == SESSION_DATABASE:
+            return False
+        return None
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'datavis_project.settings')
 
 application = get_wsgi_application()
+
+# Optionally start this process's converter pool now rather than on the first large upload
+from django.conf import settings # noqa: E402
+
+if getattr(settings, 'CONVERTER_POOL_WARM_UP', False):
+    from visualizer.converter_pool import warm_converter_pool # noqa: E402 (needs the apps loaded above)
+
+    warm_converter_pool()
@@ -5,94 +5,158 @@ import io
 import logging
 
 # Import helper functions from the utils module
-from .utils import clean_and_parse_amount # csv_to_list_of_dicts only uses clean_and_parse_amount
+from .utils import clean_and_parse_amount, iter_decoded_lines, parse_date_column # Amount/date parsing and line decoding
+from ..dataset import Column, Dataset, DATE, STRING
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
 
+DATE_HEADER_NAMES = ['date', 'posting date', 'transaction date'] # Columns (lowercase) stored as dates when every cell parses
 
-# CSV converter function implementation
-# It still needs to handle the 'Amount' conversion to float.
-# Ensure the header detection is simple, assuming the first row of the CSV it receives is the header.
-def csv_to_list_of_dicts(csv_file_object):
+
+# Streaming CSV row generator
+# Normalizes each data row exactly like csv_to_list_of_dicts, but yields rows one by one
+# so callers can consume them without holding the whole file in memory.
+def iter_csv_dicts(csv_reader, header_list):
     """
-    Converts CSV content from a file-like object into a list of dictionaries.
-    Assumes the first row is the header.
+    Yields one dictionary per non-empty data row read from csv_reader.
     Attempts to convert 'Amount' column to float.
-    Includes debug logging.
 
     Args:
-        csv_file_object: A file-like object containing CSV data (e.g., result of open(), io.StringIO).
+        csv_reader: A csv.reader positioned just after the header row.
+        header_list (list): List of (already stripped) column headers.
+
+    Yields:
+        dict: A dictionary representing one data row.
+    """
+    # Resolve the columns once instead of checking every header for every cell
+    named_columns = [(i, header_name) for i, header_name in enumerate(header_list) if header_name]
+    amount_columns = {i for i, header_name in named_columns if header_name.lower() == 'amount'}
+    header_count = len(header_list)
+
+    for row in csv_reader:
+        if not any(cell.strip() for cell in row):
+            continue
+
+        row_dict = {}
+        padded_row = row + [None] * (header_count - len(row))
+
+        for i, header_name in named_columns:
+            cell_value = padded_row[i]
+
+            # --- Data Type Conversion Logic ---
+            if i in amount_columns:
+                try:
+                    # Use the helper function for amount parsing
+                    row_dict[header_name] = clean_and_parse_amount(cell_value)
+                except (ValueError, TypeError):
+                    row_dict[header_name] = None # Set to None if conversion fails
+            else:
+                row_dict[header_name] = cell_value
+
+        if row_dict and any(row_dict.values()):
+            yield row_dict
+
+
+def stream_csv_rows(csv_source):
+    """
+    Reads the header row from CSV content and returns a lazy iterator over the data rows.
+    Assumes the first non-empty row is the header.
+
+    Args:
+        csv_source: A file-like object or any iterable of text lines
+                    (e.g. the output of iter_decoded_lines(uploaded_file.chunks())).
 
     Returns:
         A tuple containing:
         - header_list (list): List of column headers.
-        - list_of_dicts (list): List of dictionaries, each representing a row.
-        - error_message (str or None): An error message if conversion failed.
+        - row_iterator (iterator): Generator yielding one dictionary per data row.
+        - error_message (str or None): An error message if the header could not be read.
     """
-    header_list = []
-    list_of_dicts = []
-    error_message = None
-
-    # logger.debug(f"Debug in csv_to_list_of_dicts: Input type: {type(csv_file_object)}") # Keep minimized
+    csv_reader = csv.reader(csv_source)
 
+    # Read the header row (assuming the first row is the header now)
     try:
-        csv_reader = csv.reader(csv_file_object)
+        header_row = None
+        for row in csv_reader:
+            if any(cell.strip() for cell in row):
+                header_row = row
+                break # Found the first non-empty row, assume it's the header
 
-        # Read the header row (assuming the first row is the header now)
-        try:
-            header_row = None
-            for row in csv_reader:
-                if any(cell.strip() for cell in row):
-                    header_row = row
-                    break # Found the first non-empty row, assume it's the header
+        if header_row is None:
+            error_message = "CSV file is empty or contains only empty rows."
+            logger.debug(f"Debug in stream_csv_rows: {error_message}")
+            return [], iter(()), error_message
 
-            if header_row is None:
-                error_message = "CSV file is empty or contains only empty rows."
-                logger.debug(f"Debug in csv_to_list_of_dicts: {error_message}")
-                return [], [], error_message
+        header_list = [header.strip() for header in header_row] # Strip whitespace from headers
+        logger.debug(f"Debug in stream_csv_rows: Identified {len(header_list)} headers.")
 
+    except Exception as e:
+        error_message = f"Error reading header row from CSV: {e}"
+        logger.error(f"Debug in stream_csv_rows: {error_message}", exc_info=True)
+        return [], iter(()), error_message
 
-            header_list = [header.strip() for header in header_row] # Strip whitespace from headers
-            logger.debug(f"Debug in csv_to_list_of_dicts: Identified {len(header_list)} headers.")
+    return header_list, iter_csv_dicts(csv_reader, header_list), None
 
-        except Exception as e:
-            error_message = f"Error reading header row from CSV: {e}"
-            logger.error(f"Debug in csv_to_list_of_dicts: {error_message}", exc_info=True)
-            return [], [], error_message
 
+def csv_chunks_to_list_of_dicts(byte_chunks, encoding='utf-8'):
+    """
+    Converts CSV content arriving as byte chunks (e.g. UploadedFile.chunks())
+    into a Dataset without first reading and decoding the whole upload.
 
-        # Process data rows
-        for row in csv_reader:
-            if not any(cell.strip() for cell in row):
-                continue
+    Args:
+        byte_chunks: An iterable of bytes objects.
+        encoding (str): Text encoding of the upload.
 
-            row_dict = {}
-            padded_row = row + [None] * (len(header_list) - len(row))
+    Returns:
+        Same tuple as csv_to_list_of_dicts.
+    """
+    return csv_to_list_of_dicts(iter_decoded_lines(byte_chunks, encoding))
 
-            for i, header_name in enumerate(header_list):
-                if not header_name:
-                    continue
 
-                cell_value = padded_row[i]
+# CSV converter function implementation
+# It still needs to handle the 'Amount' conversion to float.
+# Ensure the header detection is simple, assuming the first row of the CSV it receives is the header.
+def csv_to_list_of_dicts(csv_file_object):
+    """
+    Converts CSV content from a file-like object into a columnar Dataset.
+    Assumes the first row is the header.
+    Attempts to convert 'Amount' column to float and date columns (DATE_HEADER_NAMES) to dates.
+    Includes debug logging.
 
-                # --- Data Type Conversion Logic ---
-                if isinstance(header_name, str) and header_name.lower() == 'amount':
-                    try:
-                        # Use the helper function for amount parsing
-                        amount_value = clean_and_parse_amount(cell_value)
-                        row_dict[header_name] = amount_value
+    Args:
+        csv_file_object: A file-like object containing CSV data (e.g., result of open(), io.StringIO),
+                         or any iterable of text lines.
 
-                    except (ValueError, TypeError) as e:
-                        # logger.debug(f"Debug in csv_to_list_of_dicts: Could not convert Amount value '{cell_value}' to float for column '{headerName}': {e}") # Keep minimized
-                        row_dict[header_name] = None # Set to None if conversion fails
+    Returns:
+        A tuple containing:
+        - header_list (list): List of column headers.
+        - list_of_dicts (Dataset): Columnar dataset; iterating it yields one dictionary per row.
+        - error_message (str or None): An error message if conversion failed.
+    """
+    header_list = []
+    list_of_dicts = []
+    error_message = None
 
-                else:
-                    row_dict[header_name] = cell_value
+    try:
+        header_list, row_iterator, error_message = stream_csv_rows(csv_file_object)
+        if error_message:
+            return [], [], error_message
 
-            if row_dict and any(row_dict.values()):
-                list_of_dicts.append(row_dict)
+        # Process data rows straight into typed columns (no intermediate list of dicts)
+        list_of_dicts = Dataset.from_rows([h for h in header_list if h], row_iterator)
 
+        # Date columns arrive as text; parse them once per column (the format is inferred once)
+        for header in list_of_dicts.headers:
+            column = list_of_dicts.column(header)
+            if column.kind != STRING or header.lower() not in DATE_HEADER_NAMES:
+                continue
+            date_days, date_valid = column.to_day_array(parse_date_column)
+            # Keep the text if any non-empty cell is not a date, so no value is lost
+            if date_valid.any() and date_valid.sum() == column.valid.sum():
+                list_of_dicts.columns[header] = Column(header, DATE, date_days, date_valid)
+            else:
+                logger.debug(f"Debug in csv_to_list_of_dicts: Column '{header}' kept as text ({int(column.valid.sum() - date_valid.sum())} cells are not dates).")
 
         if not list_of_dicts:
             error_message = error_message if error_message else "No data rows found in CSV."
@@ -109,4 +173,4 @@ def csv_to_list_of_dicts(csv_file_object):
         list_of_dicts = []
 
 
-    return header_list, list_of_dicts, error_message
\ No newline at end of file
+    return header_list, list_of_dicts, error_message
@@ -0,0 +1,136 @@
+# In file_handlers/converters/detect.py
+
+import re
+import codecs
+import logging
+import xml.etree.ElementTree as ET
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Sniffed upload formats (keys of the converter registry)
+CSV = 'csv'
+XLSX = 'xlsx'
+XLS = 'xls'
+ODS = 'ods'
+JSON = 'json'
+SPREADSHEETML = 'spreadsheetml'
+GENERIC_XML = 'xml'
+
+SNIFF_SIZE = 8192 # Bytes read from the start of an upload to detect its format
+
+SS_NAMESPACE = "urn:schemas-microsoft-com:office:spreadsheet"
+
+# File signatures
+_ZIP_SIGNATURE = b'PK\x03\x04'
+_OLE2_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' # Legacy .xls (and other MS Office) files
+_ODS_MIMETYPE = b'application/vnd.oasis.opendocument.spreadsheet' # Stored uncompressed first in ODS files
+# Office Open XML packages (.xlsx, .docx, .pptx) are told apart by the folder of their parts:
+# the name of a part starts 26 bytes after the signature of its ZIP local file header
+_OOXML_PART_PATTERN = re.compile(rb'PK\x03\x04.{26}(xl|word|ppt)/', re.DOTALL)
+
+# <?mso-application progid="Excel.Sheet"?> marks Excel 2003 XML (SpreadsheetML)
+_MSO_APPLICATION_PATTERN = re.compile(r'<\?mso-application\s[^>]*progid\s*=\s*["\']Excel\.Sheet["\']', re.IGNORECASE)
+
+# Fallback when the content itself is not conclusive
+_EXTENSION_FORMATS = {
+    '.csv': CSV,
+    '.xlsx': XLSX,
+    '.xls': XLS,
+    '.ods': ODS,
+    '.json': JSON,
+    '.xml': GENERIC_XML,
+}
+
+
+def _decode_head(head):
+    """Decodes the start of a text upload, ignoring a multi-byte character cut off at the end."""
+    for bom, encoding in ((b'\xef\xbb\xbf', 'utf-8'), (b'\xff\xfe', 'utf-16-le'), (b'\xfe\xff', 'utf-16-be')):
+        if head.startswith(bom):
+            return head[len(bom):].decode(encoding, errors='ignore')
+    return head.decode('utf-8', errors='ignore')
+
+
+def _is_text(head):
+    """Returns True if head is valid UTF-8 text without NUL bytes (a character cut off at the end is allowed)."""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return b'\x00' not in head
+
+
+def _sniff_xml_root(head):
+    """
+    Returns the tag of the root element ('{namespace}name' or 'name') found in the start
+    of an XML document, or None if the root element does not start within head.
+    """
+    parser = ET.XMLPullParser(events=('start',))
+    try:
+        parser.feed(head)
+        for _, element in parser.read_events():
+            return element.tag
+    except ET.ParseError as e:
+        logger.debug(f"Debug in _sniff_xml_root: Could not read the root element: {e}")
+    return None
+
+
+def sniff_format(head, file_extension=None):
+    """
+    Detects the format of an upload from its first bytes (see SNIFF_SIZE).
+    The file extension is only used when the content is not conclusive
+    (e.g. plain text that could be CSV, or a ZIP container without a known marker).
+
+    Args:
+        head (bytes): The first bytes of the upload.
+        file_extension (str): Lowercase extension including the dot (e.g. '.xml'), if known.
+
+    Returns:
+        One of CSV, XLSX, XLS, ODS, JSON, SPREADSHEETML or GENERIC_XML, or None if the
+        format is not supported.
+    """
+    extension_format = _EXTENSION_FORMATS.get(file_extension)
+
+    # --- Binary containers ---
+    if head.startswith(_ZIP_SIGNATURE):
+        if _ODS_MIMETYPE in head:
+            return ODS
+        part_folders = {match[1] for match in _OOXML_PART_PATTERN.finditer(head)}
+        if b'xl' in part_folders:
+            return XLSX
+        if part_folders:
+            return None # A Word or PowerPoint document
+        return extension_format if extension_format in (XLSX, ODS) else None
+    if head.startswith(_OLE2_SIGNATURE):
+        return XLS
+
+    # --- Text formats ---
+    text = _decode_head(head).lstrip()
+    if text.startswith('<'):
+        if _MSO_APPLICATION_PATTERN.search(text):
+            return SPREADSHEETML
+        root_tag = _sniff_xml_root(text)
+        if root_tag is not None and root_tag.startswith(f'{{{SS_NAMESPACE}}}'):
+            return SPREADSHEETML
+        if root_tag is not None or extension_format == GENERIC_XML:
+            return GENERIC_XML
+    if text.startswith(('{', '[')) and extension_format in (JSON, None):
+        return JSON
+
+    if extension_format in (CSV, JSON, GENERIC_XML):
+        return extension_format
+    if extension_format is None and text and _is_text(head):
+        return CSV # Unknown extension, but the upload is text
+    return None
+
+
+def sniff_upload(uploaded_file, file_extension=None):
+    """
+    Detects the format of an uploaded file (any seekable binary file object, such as a
+    Django UploadedFile) and rewinds it so the converter reads it from the start.
+    """
+    head = uploaded_file.read(SNIFF_SIZE)
+    uploaded_file.seek(0)
+    detected_format = sniff_format(head, file_extension)
+    logger.debug(f"Debug in sniff_upload: Detected format '{detected_format}' (extension '{file_extension}').")
+    return detected_format
@@ -1,67 +1,428 @@
 # In file_handlers/converters/json.py
 
+import io
 import json
+import codecs
 import logging
 
 # Import helper functions from the utils module
-from .utils import clean_and_format_date, clean_and_parse_amount # Import if needed for standardizing JSON data
+from .utils import parse_amount_column, parse_date_column # Standardize amount/date fields like the other converters
+from ..dataset import Column, Dataset, DATE, FLOAT, STRING
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 64 * 1024            # Read size for file-like sources
+MAX_NDJSON_PROBE = 1024 * 1024    # Longest first line inspected when deciding between NDJSON and one JSON document
+# Keys of {"records": [...]}-style envelopes; a list of objects under one of them (the first in
+# document order) is preferred to a list of objects under any other key
+ENVELOPE_KEYS = ['records', 'data', 'items', 'results', 'rows', 'entries']
 
-# JSON converter function implementation
-def json_to_list_of_dicts(raw_file_content: bytes):
+_WHITESPACE = ' \t\n\r'
+_NO_ELEMENT = object() # Sentinel for an empty array
+_NUMBER_CONTINUATION = '.eE' # Characters that may continue a number decoded at a chunk boundary
+
+
+class _JSONStream:
     """
-    Parses JSON file content and returns data as a list of dictionaries.
-    Needs full implementation for reading and standardizing data.
-    Includes debug logging.
+    Incremental reader over a stream of text chunks.
+    Keeps only the unread part of the input in memory and decodes one JSON value at a time,
+    so the elements of a large array can be consumed while the upload is still being read.
+    """
+
+    def __init__(self, text_chunks):
+        self.text_chunks = iter(text_chunks)
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, min_chars=1):
+        """
+        Appends chunks to the buffer until at least min_chars characters were added; returns
+        False if the input ended before anything was added. The chunks are joined once per call.
+        """
+        if self.eof:
+            return False
+        if self.pos > CHUNK_SIZE:
+            # Drop the consumed part so the buffer stays around one chunk in size
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        pieces = [self.buffer]
+        added = 0
+        while added < min_chars:
+            chunk = next(self.text_chunks, None)
+            if chunk is None:
+                self.eof = True
+                break
+            pieces.append(chunk)
+            added += len(chunk)
+        if added:
+            self.buffer = ''.join(pieces)
+        return added > 0
+
+    def _grow(self):
+        """
+        Reads at least as much input again as is unread in the buffer. Callers that rescan the
+        unread part after each read (an incomplete value or line) then scan every character a
+        bounded number of times, however long the value.
+        """
+        return self._fill(min_chars=max(1, len(self.buffer) - self.pos))
+
+    def peek(self):
+        """Skips whitespace and returns the next character without consuming it ('' at the end)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON: expected '{char}' but found '{self.peek() or 'end of input'}'.")
+        self.pos += 1
+
+    def peek_line(self, limit):
+        """Returns the next line (without consuming it), or None if it is longer than limit characters."""
+        searched = 0 # Characters after pos already known to hold no newline
+        while True:
+            end = self.buffer.find('\n', self.pos + searched)
+            if end != -1:
+                return self.buffer[self.pos:end] if end - self.pos <= limit else None
+            searched = len(self.buffer) - self.pos
+            if searched > limit:
+                return None
+            if not self._grow():
+                return self.buffer[self.pos:]
+
+    def iter_lines(self):
+        """Yields the remaining input line by line."""
+        searched = 0
+        while True:
+            end = self.buffer.find('\n', self.pos + searched)
+            if end != -1:
+                line = self.buffer[self.pos:end]
+                self.pos = end + 1
+                searched = 0
+                yield line
+                continue
+            searched = len(self.buffer) - self.pos
+            if not self._grow():
+                if self.pos < len(self.buffer):
+                    line = self.buffer[self.pos:]
+                    self.pos = len(self.buffer)
+                    yield line
+                return
+
+    def next_line_has_data(self):
+        """Skips whitespace; returns True if it held a line break and more input follows."""
+        line_break = False
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                line_break = line_break or self.buffer[self.pos] == '\n'
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return line_break and self.pos < len(self.buffer)
+
+    def decode_value(self):
+        """Decodes and consumes the next complete JSON value, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number cut at the end of the buffer ('12', '2.', '1e') may continue in the next chunk
+                if self.eof or (end < len(self.buffer) and self.buffer[end] not in _NUMBER_CONTINUATION):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # raw_decode starts over from pos: double the unread input so a large value is rescanned
+            # only a few times. At the end of the input, the next attempt returns or raises.
+            self._grow()
+
+    def iter_array(self):
+        """Consumes an array and yields its elements one by one."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+    def skip_value(self):
+        """Consumes the next JSON value without building it: only its scalars are decoded, one at a time."""
+        char = self.peek()
+        if char == '[':
+            self.expect('[')
+            if self.peek() == ']':
+                self.pos += 1
+                return
+            while True:
+                self.skip_value()
+                if self.peek() == ',':
+                    self.pos += 1
+                    continue
+                self.expect(']')
+                return
+        elif char == '{':
+            for _ in self.iter_object_keys():
+                self.skip_value()
+        else:
+            self.decode_value()
+
+    def iter_object_keys(self):
+        """
+        Consumes an object member by member and yields each key.
+        The caller must consume the member's value (decode_value or iter_array) before resuming.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+
+def _iter_decoded_text(byte_chunks, encoding):
+    """Decodes byte chunks incrementally (a UTF-8 byte order mark is dropped)."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig' if encoding.lower().replace('_', '-') in ('utf-8', 'utf8') else encoding)()
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def flatten_record(record, prefix=''):
+    """
+    Flattens nested objects into dotted column names ({"a": {"b": 1}} -> {"a.b": 1}).
+    Lists are kept as JSON text; values that are not objects are stored under 'value'.
+    """
+    if not isinstance(record, dict):
+        record = {'value': record}
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flat.update(flatten_record(value, prefix=f"{name}."))
+        elif isinstance(value, dict):
+            flat[name] = None
+        elif isinstance(value, list):
+            flat[name] = json.dumps(value)
+        else:
+            flat[name] = value
+    return flat
+
+
+def _is_record_list(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+def _envelope_records(document):
+    """
+    Returns the list of records held by a parsed document: the document itself if it is an array,
+    else the first list of objects under one of ENVELOPE_KEYS, else the first list of objects under
+    any key, else the object itself as the only record.
+    """
+    if isinstance(document, list):
+        return document
+    if isinstance(document, dict):
+        candidate_keys = [key for key in document if key in ENVELOPE_KEYS] + [key for key in document if key not in ENVELOPE_KEYS]
+        for key in candidate_keys:
+            if _is_record_list(document[key]):
+                return document[key]
+        return [document]
+    return [document]
+
+
+def _iter_envelope(stream, lines_may_follow=False):
+    """
+    Streams the records of a top-level object with the preference order of _envelope_records:
+    the first array of objects under one of ENVELOPE_KEYS is read element by element as soon as
+    it is reached. Other members are only kept while the object may still be the only record;
+    the first array of objects under another key is kept as well and returned if the end of the
+    object is reached without an envelope array. Every other member is skipped without being built.
+
+    With lines_may_follow (the object's first line was too long to probe for NDJSON), more
+    values on the following lines make the input NDJSON: the object is then the first record,
+    or, if its envelope array was already streamed, every line is read as such an envelope.
+    """
+    members = {}
+    streamed = False
+    fallback_found = False
+    for key in stream.iter_object_keys():
+        if not streamed and key in ENVELOPE_KEYS and stream.peek() == '[':
+            elements = stream.iter_array()
+            first = next(elements, _NO_ELEMENT)
+            if isinstance(first, dict):
+                streamed = True
+                yield first
+                yield from elements
+                continue
+            # Not a list of records: keep it as an ordinary member
+            members[key] = ([first] if first is not _NO_ELEMENT else []) + list(elements)
+        elif streamed or fallback_found:
+            stream.skip_value()
+        else:
+            members[key] = stream.decode_value()
+            fallback_found = _is_record_list(members[key])
+    if lines_may_follow and stream.next_line_has_data():
+        logger.debug("Debug in _iter_envelope: Reading JSON Lines (first line longer than the probe).")
+        if not streamed:
+            yield members
+        for line in stream.iter_lines():
+            if line.strip():
+                yield from (_envelope_records(json.loads(line)) if streamed else [json.loads(line)])
+        return
+    if not streamed:
+        yield from _envelope_records(members)
+    if stream.peek():
+        raise ValueError("Invalid JSON: unexpected data after the top-level object.")
+
+
+def iter_json_records(text_chunks):
+    """
+    Yields the records of a JSON upload, reading it incrementally:
+    - a top-level array of objects is decoded element by element,
+    - a {"records": [...]}-style envelope streams the elements of its array,
+    - NDJSON / JSON Lines (one object per line) is decoded line by line.
+
+    Args:
+        text_chunks: An iterable of str chunks.
+    """
+    stream = _JSONStream(text_chunks)
+    first_char = stream.peek()
+    if first_char == '':
+        return
+    if first_char == '[':
+        yield from stream.iter_array()
+        if stream.peek():
+            raise ValueError("Invalid JSON: unexpected data after the top-level array.")
+        return
+    if first_char != '{':
+        # A bare scalar document
+        yield stream.decode_value()
+        return
+
+    # An object on the first line followed by more lines is NDJSON; otherwise it is one document
+    first_line = stream.peek_line(MAX_NDJSON_PROBE)
+    first_value = None
+    if first_line is not None:
+        try:
+            first_value = json.loads(first_line)
+        except json.JSONDecodeError:
+            first_value = None
+
+    if first_value is None:
+        # Multi-line (pretty-printed) or very long single-line document, or NDJSON with a very long first line
+        yield from _iter_envelope(stream, lines_may_follow=first_line is None)
+        return
+
+    lines = stream.iter_lines()
+    next(lines) # The first line was already decoded
+    following_line = next((line for line in lines if line.strip()), None)
+    if following_line is None:
+        # The whole document is on one line
+        yield from _envelope_records(first_value)
+        return
+
+    logger.debug("Debug in iter_json_records: Reading JSON Lines.")
+    yield first_value
+    yield json.loads(following_line)
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def json_chunks_to_list_of_dicts(byte_chunks, encoding='utf-8'):
     """
-    logger.debug("Debug in json_to_list_of_dicts: Starting JSON parsing.")
+    Converts JSON content arriving as byte chunks (e.g. UploadedFile.chunks())
+    into a Dataset without first reading and decoding the whole upload.
+
+    Args:
+        byte_chunks: An iterable of bytes objects.
+        encoding (str): Text encoding of the upload.
+
+    Returns:
+        Same tuple as json_to_list_of_dicts.
+    """
+    logger.debug("Debug in json_chunks_to_list_of_dicts: Starting JSON parsing.")
     header_list = []
     list_of_dicts = []
     error_message = None
 
     try:
-        # --- Implementation for reading and standardizing JSON goes here ---
-        # You will need to add code here to:
-        # 1. Decode raw_file_content from bytes to a string (e.g., raw_file_content.decode('utf-8'))
-        # 2. Parse the JSON string into Python data structures (e.g., json.loads())
-        # 3. Iterate through the JSON data to extract records.
-        # 4. For each record, create a dictionary.
-        # 5. Use the helper functions (clean_and_format_date, clean_and_parse_amount) if necessary
-        #    to standardize date and amount fields for consistency with other converters.
-        # 6. Populate header_list and list_of_dicts.
-
-        # Example (replace with your actual JSON parsing logic):
-        # json_data = json.loads(raw_file_content.decode('utf-8'))
-        # Assuming json_data is a list of dictionaries
-        # list_of_dicts = json_data # Basic example, may need standardization
-        # if list_of_dicts:
-        #    header_list = list(list_of_dicts[0].keys()) # Basic header extraction
-
-
-        # For now, just a placeholder if the implementation is not ready
-        error_message = "JSON conversion function is a placeholder and not fully implemented."
-        logger.debug(f"Debug in json_to_list_of_dicts: {error_message}")
-        # Ensure header_list and list_of_dicts are empty if not implemented
-        header_list = []
-        list_of_dicts = []
-        return header_list, list_of_dicts, error_message # Return placeholder error
+        records = iter_json_records(_iter_decoded_text(byte_chunks, encoding))
+
+        # Headers are the union of (flattened) keys, discovered while the records are stored
+        list_of_dicts = Dataset.from_records(flatten_record(record) for record in records)
+        header_list = list(list_of_dicts.headers)
+
+        # --- Data Type Conversion Logic (whole columns at once) ---
+        for header in header_list:
+            column = list_of_dicts.column(header)
+            if column.kind != STRING:
+                continue # Already typed by the JSON decoder
+            if header.lower() == 'amount':
+                amount_values, amount_valid = column.to_float_array(parse_amount_column)
+                list_of_dicts.columns[header] = Column(header, FLOAT, amount_values, amount_valid)
+            elif header.lower() == 'date':
+                date_days, date_valid = column.to_day_array(parse_date_column)
+                list_of_dicts.columns[header] = Column(header, DATE, date_days, date_valid)
+
+        logger.debug(f"Debug in json_chunks_to_list_of_dicts: Read {len(list_of_dicts)} records with {len(header_list)} columns.")
 
+        if not list_of_dicts:
+            error_message = "No records found in JSON."
+            logger.debug(f"Debug in json_chunks_to_list_of_dicts: {error_message}")
 
-    except json.JSONDecodeError as e:
-        error_message = f"Error decoding JSON file: {e}"
-        logger.error(f"Debug in json_to_list_of_dicts: {error_message}", exc_info=True)
-        # Ensure header_list and list_of_dicts are empty on error
+    except (ValueError, UnicodeDecodeError) as e: # json.JSONDecodeError is a ValueError
+        error_message = f"Error parsing JSON: {e}"
+        logger.error(f"Debug in json_chunks_to_list_of_dicts: {error_message}", exc_info=True)
         header_list = []
         list_of_dicts = []
     except Exception as e:
-        error_message = f"Error processing JSON file: {e}"
-        logger.error(f"Debug in json_to_list_of_dicts: {error_message}", exc_info=True)
-        # Ensure header_list and list_of_dicts are empty on error
+        error_message = f"An unexpected error occurred during JSON processing: {e}"
+        logger.error(f"Debug in json_chunks_to_list_of_dicts: {error_message}", exc_info=True)
         header_list = []
         list_of_dicts = []
 
+    return header_list, list_of_dicts, error_message
 
-    return header_list, list_of_dicts, error_message
\ No newline at end of file
+
+# JSON converter function implementation
+def json_to_list_of_dicts(raw_file_content, encoding='utf-8'):
+    """
+    Parses JSON file content (array of objects, {"records": [...]} envelope or JSON Lines)
+    into a columnar Dataset. Nested objects are flattened to dotted column names.
+    Includes debug logging.
+
+    Args:
+        raw_file_content: The raw byte content of the JSON file, or a binary file-like object.
+        encoding (str): Text encoding of the content.
+
+    Returns:
+        A tuple containing:
+        - header_list (list): Union of the record keys, in first-seen order.
+        - list_of_dicts (Dataset): Columnar dataset; iterating it yields one dictionary per record.
+        - error_message (str or None): An error message if conversion failed.
+    """
+    if isinstance(raw_file_content, (bytes, bytearray)):
+        raw_file_content = io.BytesIO(raw_file_content)
+    byte_chunks = iter(lambda: raw_file_content.read(CHUNK_SIZE), b'')
+    return json_chunks_to_list_of_dicts(byte_chunks, encoding)
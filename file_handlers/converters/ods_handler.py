@@ -1,58 +1,182 @@
-# In file_handlers/converters/ods.py
-print("--- Loading ods.py ---") # Add this as the very first line
-
-import sys
-import os
-import io # Make sure io is imported here too
-
-print("--- Debugging Environment ---")
-print(f"Current working directory: {os.getcwd()}")
-print(f"Python Executable: {sys.executable}")
-print("Sys Path:")
-for path in sys.path:
-    print(f"- {path}")
-print("---------------------------")
-
-# --- Necessary imports start here ---
-#from file_handlers.converters.ods import ods_to_list_of_dicts
-import file_handlers.converters.ods_handler as ods_handler
-import pyexcel
+# In file_handlers/converters/ods_handler.py
+
+import io
+import zipfile
 import logging
-import datetime # Needed for isinstance check in ods_to_list_of_dicts if you're using it there
-from odfpy import opendoc
+import datetime
+import xml.etree.ElementTree as ET
 
 # Import helper functions from the utils module
-from .utils import clean_and_format_date, clean_and_parse_amount
+from .utils import parse_amount_column, parse_date_column
+from ..dataset import Column, Dataset, DATE, FLOAT
 
-# Get a logger instance for this module (assuming this is done below imports)
+# Get a logger instance for this module
 logger = logging.getLogger(__name__)
 
-def test_odfpy_read(raw_file_content: bytes):
+# Namespaces used in the OpenDocument content.xml
+TABLE_NAMESPACE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+OFFICE_NAMESPACE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+TEXT_NAMESPACE = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+TABLE_TAG = f'{{{TABLE_NAMESPACE}}}table'
+TABLE_NAME_ATTRIBUTE = f'{{{TABLE_NAMESPACE}}}name'
+ROW_TAG = f'{{{TABLE_NAMESPACE}}}table-row'
+CELL_TAG = f'{{{TABLE_NAMESPACE}}}table-cell'
+COVERED_CELL_TAG = f'{{{TABLE_NAMESPACE}}}covered-table-cell' # Hidden part of a merged cell
+ROWS_REPEATED_ATTRIBUTE = f'{{{TABLE_NAMESPACE}}}number-rows-repeated'
+COLUMNS_REPEATED_ATTRIBUTE = f'{{{TABLE_NAMESPACE}}}number-columns-repeated'
+VALUE_TYPE_ATTRIBUTE = f'{{{OFFICE_NAMESPACE}}}value-type'
+VALUE_ATTRIBUTE = f'{{{OFFICE_NAMESPACE}}}value'
+DATE_VALUE_ATTRIBUTE = f'{{{OFFICE_NAMESPACE}}}date-value'
+TIME_VALUE_ATTRIBUTE = f'{{{OFFICE_NAMESPACE}}}time-value'
+BOOLEAN_VALUE_ATTRIBUTE = f'{{{OFFICE_NAMESPACE}}}boolean-value'
+PARAGRAPH_TAG = f'{{{TEXT_NAMESPACE}}}p'
+SPACE_TAG = f'{{{TEXT_NAMESPACE}}}s'
+SPACE_COUNT_ATTRIBUTE = f'{{{TEXT_NAMESPACE}}}c'
+TAB_TAG = f'{{{TEXT_NAMESPACE}}}tab'
+LINE_BREAK_TAG = f'{{{TEXT_NAMESPACE}}}line-break'
+
+# Header names searched for the standardized 'Date' and 'Amount' columns, in priority order
+# Adjust these lookup keys if your ODS file headers use different words (e.g., 'transaction date', 'value')
+DATE_HEADER_NAMES = ['date', 'posting date', 'transaction date']
+AMOUNT_HEADER_NAMES = ['amount', 'value', 'credit', 'debit']
+
+
+def _paragraph_text(element):
+    """Returns the text of a text:p element, expanding text:s (spaces), text:tab and text:line-break."""
+    parts = [element.text or '']
+    for child in element:
+        if child.tag == SPACE_TAG:
+            parts.append(' ' * int(child.get(SPACE_COUNT_ATTRIBUTE, 1)))
+        elif child.tag == TAB_TAG:
+            parts.append('\t')
+        elif child.tag == LINE_BREAK_TAG:
+            parts.append('\n')
+        else:
+            parts.append(_paragraph_text(child)) # text:span, text:a, ...
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+
+def _cell_value(cell):
     """
-    Tests reading ODS file content directly using odfpy.
+    Returns the typed value of a table:table-cell (float/int, date/datetime, bool, str) or None if empty.
+    A number or date cell without its office:value / office:date-value falls back to its displayed text.
     """
-    logger.debug("Debug in test_odfpy_read: Starting direct read test with odfpy.")
-    try:
-        # Use io.BytesIO to wrap the bytes content for odfpy
-        file_like_object = io.BytesIO(raw_file_content)
-        doc = opendoc.OpenDocument(file_like_object)
-        # If no exception is raised by OpenDocument, it means odfpy could open the file
-        logger.debug("Debug in test_odfpy_read: Successfully opened ODS file directly with odfpy.")
-        # You could add more checks here, e.g., accessing sheets or cells
-        body = doc.text()
-        logger.debug(f"Debug in test_odfpy_read: Successfully accessed document body with odfpy (partial read test).")
-
-        return True, None # Success
+    value_type = cell.get(VALUE_TYPE_ATTRIBUTE)
+    if value_type in ('float', 'percentage', 'currency') and cell.get(VALUE_ATTRIBUTE) is not None:
+        number = float(cell.get(VALUE_ATTRIBUTE))
+        return int(number) if number.is_integer() else number
+    if value_type == 'date' and cell.get(DATE_VALUE_ATTRIBUTE) is not None:
+        date_value = cell.get(DATE_VALUE_ATTRIBUTE)
+        if len(date_value) == 10:
+            return datetime.date.fromisoformat(date_value)
+        return datetime.datetime.fromisoformat(date_value)
+    if value_type == 'boolean':
+        return cell.get(BOOLEAN_VALUE_ATTRIBUTE) == 'true'
+    if value_type == 'time':
+        return cell.get(TIME_VALUE_ATTRIBUTE) # ISO 8601 duration, e.g. PT13H30M00S
+
+    # Strings (and cells without a value type): the displayed paragraphs, one per line
+    paragraphs = [_paragraph_text(child) for child in cell if child.tag == PARAGRAPH_TAG]
+    if not paragraphs:
+        return None
+    return '\n'.join(paragraphs)
+
+
+def _row_values(row):
+    """
+    Returns the cell values of one table:table-row.
+    Repeated empty cells are only expanded when a non-empty cell follows them, so trailing
+    repeats (often thousands of formatted but empty columns) cost nothing.
+    """
+    row_values = []
+    pending_empty_cells = 0
+    for cell in row:
+        if cell.tag != CELL_TAG and cell.tag != COVERED_CELL_TAG:
+            continue
+        repeat = int(cell.get(COLUMNS_REPEATED_ATTRIBUTE, 1))
+        value = _cell_value(cell) if cell.tag == CELL_TAG else None
+        if value is None:
+            pending_empty_cells += repeat
+            continue
+        if pending_empty_cells:
+            row_values.extend([None] * pending_empty_cells)
+            pending_empty_cells = 0
+        row_values.extend([value] * repeat)
+    return row_values
+
+
+def iter_ods_rows(ods_source, sheet_index=0):
+    """
+    Yields the cell values (list) of every non-empty row of one sheet of an ODS file.
+    content.xml is read from the zip archive and parsed incrementally; rows are discarded once
+    processed, empty repeated rows are skipped without being expanded, and parsing stops at
+    the end of the requested sheet.
+
+    Args:
+        ods_source: Raw bytes or a seekable binary file-like object.
+        sheet_index (int): Index of the sheet (table:table) to read.
+    """
+    if isinstance(ods_source, (bytes, bytearray)):
+        ods_source = io.BytesIO(ods_source)
+
+    with zipfile.ZipFile(ods_source) as archive, archive.open('content.xml') as content:
+        open_elements = [] # Ancestors of the element being parsed, outermost first
+        rows_open = 0      # Number of currently open rows (their cells must be kept)
+        tables_seen = 0
+        in_selected_table = False
+        for event, element in ET.iterparse(content, events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                open_elements.append(element)
+                if tag == ROW_TAG:
+                    rows_open += 1
+                elif tag == TABLE_TAG:
+                    in_selected_table = tables_seen == sheet_index
+                    tables_seen += 1
+                    if in_selected_table:
+                        logger.debug(f"Debug in iter_ods_rows: Reading sheet '{element.get(TABLE_NAME_ATTRIBUTE)}'.")
+                continue
+
+            open_elements.pop()
+            if rows_open and tag != ROW_TAG:
+                continue # Cell content, handled when its row ends
+            if tag == ROW_TAG:
+                rows_open -= 1
+                if rows_open:
+                    continue
+                if in_selected_table:
+                    row_values = _row_values(element)
+                    if any(cell is not None and cell != '' for cell in row_values):
+                        for _ in range(int(element.get(ROWS_REPEATED_ATTRIBUTE, 1))):
+                            yield row_values
+            elif tag == TABLE_TAG and in_selected_table:
+                return # Stop after the requested sheet
+            if open_elements:
+                # Done with this element (a whole row, or anything outside rows): drop it
+                open_elements[-1].remove(element)
+
+    if tables_seen <= sheet_index:
+        logger.debug(f"Debug in iter_ods_rows: ODS file has no sheet with index {sheet_index}.")
 
-    except Exception as e:
-        logger.error(f"Debug in test_odfpy_read: Failed to read ODS file directly with odfpy: {e}", exc_info=True)
-        return False, str(e) # Failure
 
 # ODS converter function implementation
-def ods_to_list_of_dicts(raw_file_content: bytes):
+def ods_to_list_of_dicts(raw_file_content, sheet_index=0):
     """
-    Parses ODS file content and returns data as a list of dictionaries.
-    Includes extensive debug logging to diagnose issues.
+    Parses ODS file content and returns the 'Date' and 'Amount' columns as a columnar Dataset.
+    The first non-empty row of the sheet is the header row.
+    Includes debug logging.
+
+    Args:
+        raw_file_content: The raw byte content of the ODS file, or a seekable binary file-like object.
+        sheet_index (int): Index of the sheet to read.
+
+    Returns:
+        A tuple containing:
+        - header_list (list): List of column headers found in the sheet.
+        - list_of_dicts (Dataset): Columnar dataset with standardized 'Date' and 'Amount' columns.
+        - error_message (str or None): An error message if conversion failed.
     """
     logger.debug("Debug in ods_to_list_of_dicts: Starting ODS parsing.")
 
@@ -61,154 +185,71 @@ def ods_to_list_of_dicts(raw_file_content: bytes):
     error_message = None
 
     try:
-        # Use pyexcel to get the book from the raw byte content
-        # CORRECTED: Added file_type='.ods' argument
-        logger.debug("Debug in ods_to_list_of_dicts: Calling pyexcel.get_book with file_type='.ods'.")
-        book = pyexcel.get_book(file_content=raw_file_content, file_type='ods', library='pyexcel-ods3')
-
-        logger.debug("Debug in ods_to_list_of_dicts: Got book object.")
-        # Access sheets using the correct method .sheets()
-        logger.debug(f"Debug in ods_to_list_of_dicts: Number of sheets: {len(book.sheets())}")
-        logger.debug(f"Debug in ods_to_list_of_dicts: Sheet names: {book.sheet_names()}")
-
-        # Check if there are any sheets using the correct method .sheets()
-        if not book.sheets():
-            error_message = "ODS file contains no sheets."
-            logger.debug(f"Debug in ods_to_list_of_dicts: {error_message}")
-            return header_list, list_of_dicts, error_message
-
-        # Assuming data is in the first sheet (index 0)
-        sheet = book.sheet_by_index(0)
-        logger.debug(f"Debug in ods_to_list_of_dicts: Selected first sheet: '{sheet.name}'")
+        rows = iter_ods_rows(raw_file_content, sheet_index=sheet_index)
 
-        # Get data as list of lists using the correct method .to_array()
-        data_as_lists = sheet.to_array()
-        logger.debug(f"Debug in ods_to_list_of_dicts: Got data as list of lists. Total rows (including potential header): {len(data_as_lists)}")
-
-        if len(data_as_lists) > 0:
-            # Log the first few raw rows from pyexcel to inspect structure and data types
-            logger.debug(f"Debug in ods_to_list_of_dicts: First 5 raw rows from sheet.to_array(): {data_as_lists[:5]}")
-        else:
-            logger.debug("Debug in ods_to_list_of_dicts: data_as_lists is empty after sheet.to_array().")
-
-        if not data_as_lists:
+        # Assume the first row is headers
+        raw_headers = next(rows, None)
+        if raw_headers is None:
             error_message = "ODS sheet is empty."
             logger.debug(f"Debug in ods_to_list_of_dicts: {error_message}")
             return header_list, list_of_dicts, error_message
 
-        # Check if data_as_lists has at least one row for the header
-        if len(data_as_lists) < 1:
-            error_message = "ODS sheet contains no rows (expected at least a header row)."
-            logger.debug(f"Debug in ods_to_list_of_dicts: {error_message}")
-            return header_list, list_of_dicts, error_message
-
-        # Assume the first row is headers
-        raw_headers = data_as_lists[0]
-        data_rows = data_as_lists[1:] # Data starts from the second row
-
-
         # Clean headers and create a mapping to lowercase for easier lookup
         header_list = [str(h).strip() if h is not None else '' for h in raw_headers]
         # Create a mapping from cleaned lowercase header name to its original index
         header_map = {h.lower(): i for i, h in enumerate(header_list) if h}
-
         logger.debug(f"Debug in ods_to_list_of_dicts: Processed headers: {header_list}")
-        logger.debug(f"Debug in ods_to_list_of_dicts: Header map (lowercase -> index): {header_map}")
 
-
-        # --- Standardize data into list of dictionaries ---
+        # --- Standardize data into 'Date' and 'Amount' columns ---
         # Identify column indices for 'Date' and 'Amount' (case-insensitive lookup)
-        # Adjust these lookup keys if your ODS file headers use different words (e.g., 'transaction date', 'value')
         # Ensure the dictionary keys created ('Date', 'Amount') match what your JS expects!
-        date_col_index = header_map.get('date', -1) # Look for 'date'
-        amount_col_index = header_map.get('amount', -1) # Look for 'amount'
-
-        # Add checks for alternative common headers if needed (adjust based on your file's likely headers)
-        if date_col_index == -1:
-            date_col_index = header_map.get('posting date', -1) # Also look for 'posting date'
-        if date_col_index == -1:
-            date_col_index = header_map.get('transaction date', -1) # Also look for 'transaction date'
-
-        if amount_col_index == -1:
-            amount_col_index = header_map.get('value', -1) # Also look for 'value'
-        if amount_col_index == -1:
-            amount_col_index = header_map.get('credit', -1) # Also look for 'credit'
-        if amount_col_index == -1:
-            amount_col_index = header_map.get('debit', -1) # Also look for 'debit'
-
-
+        date_col_index = next((header_map[name] for name in DATE_HEADER_NAMES if name in header_map), -1)
+        amount_col_index = next((header_map[name] for name in AMOUNT_HEADER_NAMES if name in header_map), -1)
         logger.debug(f"Debug in ods_to_list_of_dicts: Determined column indices - Date: {date_col_index}, Amount: {amount_col_index}")
 
         if date_col_index == -1 or amount_col_index == -1:
             error_message = "Could not find required 'Date' or 'Amount' columns in the ODS file based on common headers. Please check your ODS file headers."
             logger.debug(f"Debug in ods_to_list_of_dicts: {error_message}")
-            # Ensure header_list and list_of_dicts are empty before returning on this specific error
-            header_list = []
-            list_of_dicts = []
-            return header_list, list_of_dicts, error_message
-
+            return [], [], error_message
 
-        # Determine the maximum index needed to avoid IndexError when accessing row data
+        # Collect the raw Date and Amount cells; rows too short to hold both are skipped
         max_index = max(date_col_index, amount_col_index)
-        logger.debug(f"Debug in ods_to_list_of_dicts: Maximum column index needed for data extraction: {max_index}")
-        logger.debug(f"Debug in ods_to_list_of_dicts: Processing {len(data_rows)} data rows...")
-
-
-        # Iterate over the data rows and create dictionaries
-        for i, row in enumerate(data_rows):
-            # Add a check to skip empty rows
-            # Ensure the row has enough columns before accessing indices
-            if len(row) > max_index and any(cell for cell in row): # Skip if the row is entirely empty or None values AND has enough columns
-                # Extract raw values using the identified column indices
-                raw_date = row[date_col_index]
-                raw_amount = row[amount_col_index]
-
-                # Use your existing or new helper functions to clean and parse
-                # Log types before cleaning to help diagnose parsing issues
-                logger.debug(f"Debug in ods_to_list_of_dicts: Processing Row {i+2} - Raw Date: '{raw_date}' (Type: {type(raw_date)}), Raw Amount: '{raw_amount}' (Type: {type(raw_amount)})")
-                cleaned_date = clean_and_format_date(raw_date) # Call your helper function
-                cleaned_amount = clean_and_parse_amount(raw_amount) # Call your helper function
-                logger.debug(f"Debug in ods_to_list_of_dicts: Row {i+2} - Cleaned Date: '{cleaned_date}', Cleaned Amount: {cleaned_amount}")
-
-
-                # Only add the row if key data (Date and Amount) was successfully parsed by the helper functions
-                if cleaned_date is not None and cleaned_amount is not None:
-                    # Create a dictionary for the row with standardized keys
-                    # Make sure 'Date' and 'Amount' match the keys expected by your frontend JS (in chart_only.html and visualizer_interface.html)
-                    row_dict = {
-                        'Date': cleaned_date, # Standardized key for Date
-                        'Amount': cleaned_amount, # Standardized key for Amount
-                        # You can add other fields here if needed...
-                    }
-                    list_of_dicts.append(row_dict)
-                else:
-                    # More detailed skipping message
-                    logger.debug(f"Debug in ods_to_list_of_dicts: Skipping row {i+2} due to failed date or amount parsing. Raw Date='{raw_date}', Raw Amount='{raw_amount}', Cleaned Date='{cleaned_date}', Cleaned Amount='{cleaned_amount}'")
-
-
+        raw_dates = []
+        raw_amounts = []
+        skipped_rows = 0
+        for row in rows:
+            if len(row) > max_index:
+                raw_dates.append(row[date_col_index])
+                raw_amounts.append(row[amount_col_index])
             else:
-                # More detailed skipping message (handles both insufficient columns and empty rows)
-                 if not any(cell for cell in row):
-                      logger.debug(f"Debug in ods_to_list_of_dicts: Skipping row {i+2} as it appears empty.")
-                 else:
-                      logger.debug(f"Debug in ods_to_list_of_dicts: Skipping row {i+2} due to insufficient columns (Row length: {len(row)}, Max expected index: {max_index}).")
+                skipped_rows += 1
+        if skipped_rows:
+            logger.debug(f"Debug in ods_to_list_of_dicts: Skipped {skipped_rows} rows with insufficient columns (Max expected index: {max_index}).")
+
+        # Clean and parse whole columns at once (the date format is inferred once per column)
+        date_days, date_valid = parse_date_column(raw_dates)
+        amount_values, amount_valid = parse_amount_column(raw_amounts)
+
+        # Only keep rows where key data (Date and Amount) was successfully parsed
+        keep_rows = date_valid & amount_valid
+        if not keep_rows.all():
+            logger.debug(f"Debug in ods_to_list_of_dicts: Skipping {int((~keep_rows).sum())} rows due to failed date or amount parsing.")
+
+        # Store the standardized rows as typed columns
+        # Make sure 'Date' and 'Amount' match the keys expected by your frontend JS (in chart_only.html and visualizer_interface.html)
+        list_of_dicts = Dataset(['Date', 'Amount'], {
+            'Date': Column('Date', DATE, date_days[keep_rows], date_valid[keep_rows]), # Standardized key for Date
+            'Amount': Column('Amount', FLOAT, amount_values[keep_rows], amount_valid[keep_rows]), # Standardized key for Amount
+        })
 
-
-        logger.debug(f"Debug in ods_to_list_of_dicts: Finished processing data rows.")
         logger.debug(f"Debug in ods_to_list_of_dicts: Final list_of_dicts size: {len(list_of_dicts)}")
-        # Uncomment the line below to see the first few dictionaries extracted
-        # logger.debug(f"Debug in ods_to_list_of_dicts: Final list_of_dicts content (first 5 rows): {list_of_dicts[:5]}")
-
 
     # Capture the exception and include its string representation in the error message
     except Exception as e:
-        # This line formats the error message and includes the traceback due to exc_info=True
         error_message = f"An unexpected error occurred during ODS processing: {e}"
         logger.error(f"Debug in ods_to_list_of_dicts: {error_message}", exc_info=True)
         # Ensure header_list and list_of_dicts are empty on error
         header_list = []
         list_of_dicts = []
-        return header_list, list_of_dicts, error_message
 
-    # Return the results if no exception occurred
-    return header_list, list_of_dicts, error_message
\ No newline at end of file
+    return header_list, list_of_dicts, error_message
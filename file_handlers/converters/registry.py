@@ -0,0 +1,82 @@
+# In file_handlers/converters/registry.py
+
+import logging
+
+from . import detect
+from .csv import csv_chunks_to_list_of_dicts
+from .xlsx import xlsx_to_list_of_dicts, xls_to_list_of_dicts
+from .ods_handler import ods_to_list_of_dicts
+from .xml import spreadsheetml_to_list_of_dicts, generic_xml_to_list_of_dicts
+from .json import json_chunks_to_list_of_dicts
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024 # Read size for file objects that have no chunks() method
+
+# Converters keyed by sniffed format (see detect.sniff_format).
+# Every converter takes a binary file object and returns (header_list, list_of_dicts, error_message).
+CONVERTERS = {}
+
+
+def register_converter(file_format):
+    """Decorator registering the decorated function as the converter for file_format."""
+    def decorator(converter):
+        CONVERTERS[file_format] = converter
+        return converter
+    return decorator
+
+
+def get_converter(file_format):
+    """Returns the converter registered for file_format, or None if the format is not supported."""
+    return CONVERTERS.get(file_format)
+
+
+def _iter_chunks(file_object):
+    """Yields the content of file_object as byte chunks (UploadedFile.chunks() when available)."""
+    if hasattr(file_object, 'chunks'):
+        yield from file_object.chunks()
+        return
+    yield from iter(lambda: file_object.read(CHUNK_SIZE), b'')
+
+
+# --- Registered converters ---
+@register_converter(detect.CSV)
+def convert_csv(file_object):
+    # Decode incrementally from the upload chunks and parse row by row
+    return csv_chunks_to_list_of_dicts(_iter_chunks(file_object))
+
+
+@register_converter(detect.XLSX)
+def convert_xlsx(file_object):
+    # Streamed from the file object in read-only mode
+    return xlsx_to_list_of_dicts(file_object)
+
+
+@register_converter(detect.XLS)
+def convert_xls(file_object):
+    return xls_to_list_of_dicts(file_object.read())
+
+
+@register_converter(detect.ODS)
+def convert_ods(file_object):
+    # content.xml is streamed from the zip archive
+    return ods_to_list_of_dicts(file_object)
+
+
+@register_converter(detect.JSON)
+def convert_json(file_object):
+    # Decoded incrementally from the upload chunks
+    return json_chunks_to_list_of_dicts(_iter_chunks(file_object))
+
+
+@register_converter(detect.SPREADSHEETML)
+def convert_spreadsheetml(file_object):
+    # Parsed incrementally straight from the file object
+    return spreadsheetml_to_list_of_dicts(file_object)
+
+
+@register_converter(detect.GENERIC_XML)
+def convert_generic_xml(file_object):
+    # Parsed incrementally straight from the file object
+    return generic_xml_to_list_of_dicts(file_object)
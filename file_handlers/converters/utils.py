@@ -1,7 +1,12 @@
 # In file_handlers/utils.py
 
+import codecs
 import datetime
+import functools
+import re
+import numpy as np
 import pandas as pd
+from numpy.dtypes import StringDType
 import logging
 
 # Get a logger instance for this module
@@ -86,4 +91,437 @@ def clean_and_parse_amount(raw_amount):
         # Handle None or other types
         if raw_amount is not None:
             logger.debug(f"Debug in clean_and_parse_amount: Unhandled amount type: {type(raw_amount)} for value {raw_amount}")
-        return None
\ No newline at end of file
+        return None
+
+
+
+# --- Column-level (vectorized) amount parsing ---
+# The string cells of a column are joined into one byte buffer, which bytes.translate cleans in a
+# single pass (currency symbols, thousands separators). The eight bytes at the start of every cell
+# are then loaded as one little-endian uint64 and converted with a few multiplications (eight digits
+# at a time, SWAR), so a column costs a few dozen numpy operations per block of cells.
+_AMOUNT_MAX_LENGTH = 15       # Bytes of a number (digits and point); longer numbers use the scalar parser
+_AMOUNT_BLOCK_SIZE = 262144   # Characters per block, so temporary buffers stay in the CPU cache
+_AMOUNT_PADDING = 16          # Bytes in front of the first cell, so the 16 bytes before any cell end can be loaded
+
+_EIGHT_ZEROS = 0x3030303030303030 # b'00000000': XOR maps the digit characters to the byte values 0-9
+_EIGHT_POINTS = 0x1E1E1E1E1E1E1E1E # b'........' after the XOR
+_ALL_BITS = 0xFFFFFFFFFFFFFFFF
+_LOW_ONES = 0x0101010101010101
+_HIGH_BITS = 0x8080808080808080
+# By 2 * point index + negative: the signed power of ten that divides the mantissa, NaN for irregular cells (index 9)
+_AMOUNT_IRREGULAR = 9
+_AMOUNT_DIVISORS = np.array([[10.0 ** (8 - point_index), -10.0 ** (8 - point_index)] for point_index in range(9)]
+                            + [[np.nan, np.nan]]).ravel()
+
+# Single-byte characters deleted before parsing, and multi-byte ones removed with bytes.replace
+_AMOUNT_DELETED_BYTES = {'.': {'latin-1': b'$,\xa3', 'utf-8': b'$,'},
+                         ',': {'latin-1': b'$. \xa0\xa3', 'utf-8': b'$. '}}
+_AMOUNT_DELETED_SEQUENCES = {'.': [b'\xc2\xa3', b'\xe2\x82\xac'], # '£', '€'
+                             ',': [b'\xc2\xa3', b'\xe2\x82\xac', b'\xc2\xa0', b'\xe2\x80\xaf']} # + (narrow) no-break spaces
+_DECIMAL_COMMA_TABLE = bytes.maketrans(b',', b'.')
+
+
+def _drop_low_bytes(words, counts):
+    """Sets the first counts[i] bytes (0 to 8, as int64) of words[i] to zero."""
+    bits = (counts << 3).view(np.uint64)
+    return (words >> bits) << bits
+
+
+def _drop_point(digits):
+    """
+    Removes the first '.' of every word (digit bytes after the XOR), moving the bytes after it
+    down one byte. Returns (digits, byte index of the point as uint64, 8 where there is none).
+    """
+    not_point = digits ^ _EIGHT_POINTS
+    point_bytes = not_point - _LOW_ONES
+    point_bytes &= ~not_point
+    point_bytes &= _HIGH_BITS # Exact for the lowest zero byte
+    point_bytes -= 1
+    point_bits = (np.bitwise_count(point_bytes) & 0x78).astype(np.uint64)
+    after_point = digits >> (point_bits + 8)
+    after_point <<= point_bits
+    digits = digits & (_ALL_BITS >> (64 - point_bits))
+    digits |= after_point
+    return digits, point_bits >> 3
+
+
+def _all_digits(digits):
+    """True where every byte is 0-9 (bytes above 9 set their high bit)."""
+    return (((digits + 0x7676767676767676) | digits) & _HIGH_BITS) == 0
+
+
+def _eight_digit_values(digits):
+    """Converts uint64 words of eight digit bytes (0-9, first digit in the lowest byte) to their values."""
+    digits = digits * (10 * 256 + 1) # Pairs of digits, then quadruples, then all eight
+    digits >>= 8
+    digits &= 0x00FF00FF00FF00FF
+    digits *= 100 * 65536 + 1
+    digits >>= 16
+    digits &= 0x0000FFFF0000FFFF
+    digits *= 10000 * 2 ** 32 + 1
+    digits >>= 32
+    return digits
+
+
+def _parse_amount_block(text, decimal_separator):
+    """
+    Parses a block of newline-separated cells (str) that follow the plain amount
+    grammar once currency symbols and thousands separators are removed: an optional '-' or
+    accounting parentheses around digits with an optional '.' followed by at most seven digits,
+    fifteen bytes at most.
+
+    Returns the amounts as float64, one per cell, NaN for every cell that does not follow the
+    grammar. Those cells must be parsed by the caller with the scalar function, so unusual
+    spellings keep exactly the scalar semantics.
+    """
+    try:
+        encoding, data = 'latin-1', text.encode('latin-1') # One byte per character, so '£' is a single byte
+    except UnicodeEncodeError:
+        encoding, data = 'utf-8', text.encode('utf-8')
+        for sequence in _AMOUNT_DELETED_SEQUENCES[decimal_separator]:
+            if sequence in data:
+                data = data.replace(sequence, b'')
+    deleted = _AMOUNT_DELETED_BYTES[decimal_separator][encoding]
+    if decimal_separator == ',':
+        data = data.translate(_DECIMAL_COMMA_TABLE, deleted)
+    elif any(deleted[i:i + 1] in data for i in range(len(deleted))):
+        data = data.translate(None, deleted)
+    # Padding in front for the loads before the first cell, and after the last one for the load at its start
+    data = b'0' * _AMOUNT_PADDING + data + b'\n' + b'\0' * 8
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    words = np.ndarray((len(data) - 7,), dtype='<u8', buffer=data, strides=(1,)) # The eight bytes at every offset
+    ends = np.flatnonzero(buffer == ord('\n'))
+    starts = np.empty_like(ends)
+    starts[0] = _AMOUNT_PADDING
+    starts[1:] = ends[:-1] + 1
+
+    first = buffer.take(starts)
+    negative = first == ord('-')
+    if b'(' in data:
+        in_parentheses = (first == ord('(')) & (buffer.take(ends - 1) == ord(')'))
+        negative |= in_parentheses
+        ends -= in_parentheses
+    starts += negative
+    counts = ends - starts # Bytes of the number
+
+    # Numbers of up to eight bytes (most amounts) are whole in the word at their start; shifting
+    # them to its end leaves zeros (leading zero digits) in front
+    number = words[starts]
+    number ^= _EIGHT_ZEROS
+    number <<= ((8 - counts) << 3).view(np.uint64)
+    digits, point_index = _drop_point(number)
+    regular = _all_digits(digits) & (point_index + counts.view(np.uint64) > 8) # At least one integer digit
+    point_index[~regular] = _AMOUNT_IRREGULAR
+    mantissa = _eight_digit_values(digits)
+
+    # Longer numbers are read from the two words before their end
+    long_rows = np.flatnonzero(counts > 8)
+    if len(long_rows):
+        long_ends = ends[long_rows]
+        long_counts = counts[long_rows]
+        tail, tail_point_index = _drop_point(words[long_ends - 8] ^ _EIGHT_ZEROS)
+        leading = _drop_low_bytes(words[long_ends - 16] ^ _EIGHT_ZEROS, np.maximum(16 - long_counts, 0))
+        mantissa[long_rows] = _eight_digit_values(tail) + _eight_digit_values(leading) * 100_000_000
+        point_index[long_rows] = np.where(_all_digits(tail) & _all_digits(leading) & (long_counts <= _AMOUNT_MAX_LENGTH),
+                                          tail_point_index, _AMOUNT_IRREGULAR)
+
+    # The mantissa is an exact integer below 10**15, so one correctly rounded division gives
+    # the same result as float()
+    point_index <<= 1
+    point_index |= negative
+    amounts = mantissa.astype(np.float64)
+    amounts /= _AMOUNT_DIVISORS.take(point_index.view(np.intp))
+    return amounts
+
+
+def _parse_amount_strings(strings, decimal_separator):
+    """
+    Vectorized part of parse_amount_column for a list of str (TypeError for anything else).
+    The strings are joined once and parsed in blocks of about _AMOUNT_BLOCK_SIZE characters, so
+    every temporary buffer stays small. Returns the amounts like _parse_amount_block, one per string,
+    or None when a string contains a newline (the separator of the cells).
+    """
+    text = '\n'.join(strings)
+    amounts = np.empty(len(strings))
+    row = start = 0
+    while True:
+        # Blocks end at a newline, so they hold whole cells
+        end = text.find('\n', start + _AMOUNT_BLOCK_SIZE)
+        block_amounts = _parse_amount_block(text[start:end if end >= 0 else len(text)], decimal_separator)
+        if row + len(block_amounts) > len(strings):
+            return None
+        amounts[row:row + len(block_amounts)] = block_amounts
+        row += len(block_amounts)
+        if end < 0:
+            break
+        start = end + 1
+    return amounts if row == len(strings) else None
+
+
+def parse_amount_column(values, decimal_separator='.'):
+    """
+    Column-level counterpart of clean_and_parse_amount.
+    Parses a whole column (list, numpy array or pandas Series of str/number/None) at once.
+
+    Numbers are converted directly. Strings are cleaned and parsed with vectorized operations
+    and handle currency symbols ($, €, £), thousands separators, a leading minus and accounting
+    parentheses. Cells that do not follow that grammar are passed to the scalar parser, so
+    with decimal_separator='.' the results match calling clean_and_parse_amount on every cell.
+
+    Args:
+        values: The column values.
+        decimal_separator (str): '.' (e.g. '1,234.56') or ',' for locales that write '1.234,56'
+                                 or '1 234,56'.
+
+    Returns:
+        A tuple containing:
+        - amounts (np.ndarray): float64 array, NaN where the cell could not be parsed.
+        - valid (np.ndarray): Boolean mask, True where the cell parsed to a number.
+    """
+    if isinstance(values, pd.Series):
+        values = values.to_numpy()
+    if isinstance(values, np.ndarray):
+        # Numeric columns need no cleaning at all
+        if values.dtype.kind in 'iuf':
+            amounts = values.astype(np.float64)
+            return amounts, ~np.isnan(amounts)
+        values = values.tolist()
+    elif not isinstance(values, list):
+        values = list(values)
+
+    count = len(values)
+    if count == 0:
+        return np.full(0, np.nan), np.zeros(0, dtype=bool)
+
+    # Columns of strings only (the common case) are parsed as they are; others are split by type first
+    string_rows = None
+    try:
+        string_amounts = _parse_amount_strings(values, decimal_separator)
+    except TypeError:
+        column = np.array(values, dtype=object)
+        is_number = np.fromiter((isinstance(v, (int, float)) for v in values), dtype=bool, count=count)
+        string_rows = np.flatnonzero(np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=count))
+        values = column[string_rows].tolist()
+        string_amounts = _parse_amount_strings(values, decimal_separator) if values else np.empty(0)
+
+    if string_amounts is None:
+        # Cells containing a newline cannot be joined; every cell of such a column uses the scalar parser
+        string_amounts = np.full(len(values), np.nan)
+
+    # Anything the grammar did not cover (empty strings, exponents, 'inf', ...) uses the scalar parser
+    for index in np.flatnonzero(np.isnan(string_amounts)):
+        raw_value = values[index]
+        if decimal_separator == ',':
+            raw_value = raw_value.replace('.', '').replace(' ', '').replace('\u00a0', '').replace('\u202f', '').replace(',', '.')
+        parsed_value = clean_and_parse_amount(raw_value)
+        if parsed_value is not None:
+            string_amounts[index] = parsed_value
+
+    if string_rows is None:
+        amounts = string_amounts
+    else:
+        amounts = np.full(count, np.nan)
+        amounts[is_number] = column[is_number].astype(np.float64)
+        amounts[string_rows] = string_amounts
+    return amounts, ~np.isnan(amounts)
+
+
+# --- Column-level date parsing ---
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+_EXCEL_EPOCH_DAYS = (datetime.date(1899, 12, 30) - datetime.date(1970, 1, 1)).days # Excel (Windows) day 0
+_DATE_SAMPLE_SIZE = 200       # Distinct values inspected to infer a column's date format
+DATE_CACHE_SIZE = 65536       # Distinct strings remembered by the fallback parser
+
+# Formats the column parser can infer from a sample, with the regex that recognizes them
+_DATE_FORMATS = [
+    ('iso', re.compile(r'\d{4}-\d{2}-\d{2}')),
+    ('iso-datetime', re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}')), # e.g. SpreadsheetML 2024-01-31T00:00:00.000
+    ('us', re.compile(r'\d{1,2}/\d{1,2}/\d{4}')),
+]
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _cached_date_days(raw_date):
+    """
+    Scalar fallback for parse_date_column: days since 1970-01-01 for one raw value, or None.
+    Bounded LRU cache, because statements repeat the same date strings many times.
+    """
+    cleaned_date = clean_and_format_date(raw_date)
+    if cleaned_date is None:
+        return None
+    return datetime.date.fromisoformat(cleaned_date).toordinal() - _EPOCH_ORDINAL
+
+
+def infer_date_format(sample):
+    """
+    Infers the date format shared by every value in sample (non-missing raw cell values).
+    Returns 'excel' for numbers (Excel serial dates), 'iso', 'iso-datetime' or 'us' for strings,
+    or None when the sample is empty or mixes formats.
+    """
+    if not sample:
+        return None
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in sample):
+        return 'excel'
+    if not all(isinstance(v, str) for v in sample):
+        return None
+    for format_name, pattern in _DATE_FORMATS:
+        if all(pattern.fullmatch(v.strip()) if format_name != 'iso-datetime' else pattern.match(v.strip()) for v in sample):
+            return format_name
+    return None
+
+
+def parse_date_column(values):
+    """
+    Column-level counterpart of clean_and_format_date.
+    Infers the date format once from a sample of distinct values and parses the whole column
+    in one vectorized call. Values that do not fit the inferred format (or every value, for
+    mixed columns) go through the scalar parser behind a bounded LRU cache.
+
+    Args:
+        values: The column values (list, numpy array or pandas Series of str/number/date/None).
+
+    Returns:
+        A tuple containing:
+        - days (np.ndarray): int64 days since 1970-01-01, 0 where the cell is not a valid date.
+        - valid (np.ndarray): Boolean mask, True where the cell parsed to a date.
+    """
+    if isinstance(values, pd.Series):
+        values = values.to_numpy()
+    elif not isinstance(values, np.ndarray):
+        values = np.array(list(values), dtype=object)
+
+    count = len(values)
+    days = np.zeros(count, dtype=np.int64)
+    valid = np.zeros(count, dtype=bool)
+    if count == 0:
+        return days, valid
+
+    # Typed input needs no format inference
+    if values.dtype.kind == 'M':
+        as_days = values.astype('datetime64[D]')
+        valid = ~np.isnat(as_days)
+        return np.where(valid, as_days.astype(np.int64), 0), valid
+
+    values = values.astype(object)
+    codes, distinct = pd.factorize(values, use_na_sentinel=True)
+    distinct = np.asarray(distinct, dtype=object)
+    distinct_days = np.zeros(len(distinct), dtype=np.int64)
+    distinct_valid = np.zeros(len(distinct), dtype=bool)
+
+    date_format = infer_date_format(distinct[:_DATE_SAMPLE_SIZE].tolist())
+    logger.debug(f"Debug in parse_date_column: Inferred date format '{date_format}' for {count} values ({len(distinct)} distinct).")
+
+    if date_format == 'excel':
+        serials = distinct.astype(np.float64)
+        # Same range as pandas Timestamps, which clean_and_format_date relies on
+        distinct_valid = np.isfinite(serials) & (np.abs(serials + _EXCEL_EPOCH_DAYS) < 106000)
+        distinct_days = np.where(distinct_valid, np.floor(np.where(distinct_valid, serials, 0)).astype(np.int64) + _EXCEL_EPOCH_DAYS, 0)
+    elif date_format is not None:
+        text = pd.Series(distinct, dtype=object).str.strip()
+        if date_format == 'iso-datetime':
+            text = text.str.slice(0, 10) # Keep the date part, as clean_and_format_date does
+        pattern = '%m/%d/%Y' if date_format == 'us' else '%Y-%m-%d'
+        parsed = pd.to_datetime(text, format=pattern, errors='coerce').to_numpy(dtype='datetime64[D]')
+        distinct_valid = ~np.isnat(parsed)
+        distinct_days = np.where(distinct_valid, parsed.astype(np.int64), 0)
+
+    # Anything not covered by the inferred format: date objects, mixed columns, odd spellings
+    for index in np.flatnonzero(~distinct_valid):
+        raw_date = distinct[index]
+        if isinstance(raw_date, datetime.date):
+            raw_date = raw_date if not isinstance(raw_date, datetime.datetime) else raw_date.date()
+            distinct_days[index] = raw_date.toordinal() - _EPOCH_ORDINAL
+            distinct_valid[index] = True
+            continue
+        try:
+            parsed_days = _cached_date_days(raw_date)
+        except TypeError: # Unhashable values cannot be cached (or parsed)
+            parsed_days = None
+        if parsed_days is not None:
+            distinct_days[index] = parsed_days
+            distinct_valid[index] = True
+
+    if len(distinct):
+        safe_codes = np.maximum(codes, 0)
+        valid = (codes >= 0) & distinct_valid[safe_codes]
+        days = np.where(valid, distinct_days[safe_codes], 0)
+    return days, valid
+
+
+def format_date_days(days, valid):
+    """Converts int64 days since 1970-01-01 into ISO 'YYYY-MM-DD' strings (None where not valid)."""
+    as_strings = np.asarray(days, dtype=np.int64).astype('datetime64[D]').astype(str).astype(object)
+    as_strings[~np.asarray(valid, dtype=bool)] = None
+    return as_strings
+
+
+def find_matching_header(headers, candidate_names):
+    """
+    Returns the first header (original spelling) whose lowercase name matches one of
+    candidate_names, trying the candidates in priority order. Returns None if none match.
+    """
+    if not headers:
+        return None
+    headers_by_lower = {}
+    for header in headers:
+        if isinstance(header, str):
+            headers_by_lower.setdefault(header.strip().lower(), header)
+    for candidate in candidate_names:
+        if candidate.lower() in headers_by_lower:
+            return headers_by_lower[candidate.lower()]
+    return None
+
+
+def find_numeric_header(headers, data, exclude=()):
+    """
+    Returns the first header whose column holds at least one value that parses as an amount.
+    data may be a list of dictionaries or a file_handlers.dataset.Dataset.
+    Returns None if no numeric column is found.
+    """
+    for header in headers or []:
+        if header in exclude:
+            continue
+        column = data.column(header) if hasattr(data, 'column') else None
+        if column is not None:
+            if column.to_float_array(parse_amount_column)[1].any():
+                return header
+            continue
+        if any(clean_and_parse_amount(row.get(header)) is not None for row in data if isinstance(row, dict)):
+            return header
+    return None
+
+def iter_decoded_lines(byte_chunks, encoding='utf-8'):
+    """
+    Incrementally decodes an iterable of byte chunks (e.g. UploadedFile.chunks())
+    and yields text lines with their '\n' line endings preserved.
+    Only the current chunk and a trailing partial line are held in memory, so the
+    output can be fed straight into csv.reader (or any line-based parser).
+    Multi-byte characters split across chunk boundaries are handled by the
+    incremental decoder, and a UTF-8 byte order mark (written by Excel) is dropped.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig' if encoding.lower().replace('_', '-') in ('utf-8', 'utf8') else encoding)()
+    # Pieces of the current line, joined once its newline arrives (appending them to one
+    # string would copy the line again for every chunk of a long line)
+    pending_pieces = []
+
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if '\n' not in text:
+            if text:
+                pending_pieces.append(text)
+            continue
+        lines = text.split('\n')
+        if pending_pieces:
+            pending_pieces.append(lines[0])
+            lines[0] = ''.join(pending_pieces)
+        # The last piece has no newline yet, keep it until the next chunk arrives
+        last_piece = lines.pop()
+        pending_pieces = [last_piece] if last_piece else []
+        for line in lines:
+            yield line + '\n'
+
+    pending_pieces.append(decoder.decode(b'', final=True))
+    pending_line = ''.join(pending_pieces)
+    if pending_line:
+        yield pending_line
@@ -0,0 +1,77 @@
+# In file_handlers/converters/worker.py
+
+import os
+import logging
+
+# Imported at module level on purpose: the converter pool preloads this module (and with it
+# pandas, numpy, openpyxl and every converter) once, before its worker processes start.
+from .registry import get_converter
+from ..dataset import Dataset, report_row_progress
+from ..store import save_dataset
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+PROGRESS_SUFFIX = '.progress'
+
+
+def warm_up():
+    """
+    Process pool initializer. Everything the converters need is imported with this module;
+    this only logs that the worker is ready (and imports it in workers started with 'spawn').
+    """
+    logger.debug(f"Debug in warm_up: Converter worker {os.getpid()} ready.")
+
+
+def ping():
+    """No-op task used to start every worker of a pool ahead of the first upload."""
+    return os.getpid()
+
+
+def write_progress(progress_path, rows_read, bytes_read):
+    with open(progress_path, 'w') as f:
+        f.write(f"{rows_read} {bytes_read}")
+
+
+def read_progress(progress_path):
+    """Returns (rows_read, bytes_read) written by a running convert_file, or None if there is none yet."""
+    try:
+        with open(progress_path) as f:
+            rows_read, bytes_read = f.read().split()
+        return int(rows_read), int(bytes_read)
+    except (OSError, ValueError):
+        return None # Not written yet, or read while being rewritten
+
+
+def convert_file(file_type, source_path, result_path):
+    """
+    Runs the converter registered for file_type on a file, in a converter pool worker.
+    The converted rows are written to result_path as a columnar file (file_handlers.store)
+    with the header list in its metadata, so only file paths and the error message cross
+    the process boundary; the caller loads the result with open_dataset.
+    While the converter runs, rows and bytes read so far are written to
+    result_path + PROGRESS_SUFFIX every ROW_PROGRESS_INTERVAL rows (see read_progress).
+
+    Args:
+        file_type (str): Format returned by detect.sniff_upload.
+        source_path (str): The uploaded file.
+        result_path (str): Where to write the converted dataset. Nothing is written when
+                           the converter returns no rows.
+
+    Returns:
+        A tuple (header_list, error_message), as returned by the converter.
+    """
+    converter = get_converter(file_type)
+    progress_path = result_path + PROGRESS_SUFFIX
+    with open(source_path, 'rb') as file_object:
+        def report(rows_read):
+            write_progress(progress_path, rows_read, os.lseek(file_object.fileno(), 0, os.SEEK_CUR))
+
+        with report_row_progress(report):
+            header_list, list_of_dicts, error_message = converter(file_object)
+
+    dataset = Dataset.coerce(list_of_dicts, header_list)
+    if dataset.columns:
+        save_dataset(dataset, result_path, metadata={'header': header_list})
+    logger.debug(f"Debug in convert_file: Worker {os.getpid()} converted {len(dataset)} {file_type} rows.")
+    return header_list, error_message
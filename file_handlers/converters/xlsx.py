@@ -3,62 +3,154 @@
 import pandas as pd
 import io
 import logging
-# No need to import helper functions here if pandas handles date/amount conversion directly
+import openpyxl
+from ..dataset import Dataset
+# No need to import helper functions here, openpyxl already returns typed cell values (numbers, datetimes)
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
 
 
-# Updated xlsx_to_list_of_dicts function to handle Timestamp serialization and logging
-def xlsx_to_list_of_dicts(xlsx_content: bytes):
+def _unique_headers(raw_headers):
     """
-    Converts XLSX content (bytes) to a list of dictionaries.
+    Cleans the header row the way pd.read_excel does: empty cells become 'Unnamed: <index>'
+    and repeated names get a '.1', '.2', ... suffix.
+    """
+    header_list = []
+    seen = {}
+    for i, header in enumerate(raw_headers):
+        name = f"Unnamed: {i}" if header is None or header == '' else str(header)
+        candidate = name
+        while candidate in seen:
+            seen[name] += 1
+            candidate = f"{name}.{seen[name]}"
+        seen[candidate] = 0
+        header_list.append(candidate)
+    return header_list
+
+
+def stream_xlsx_rows(xlsx_source, max_rows=None):
+    """
+    Opens the first worksheet of an XLSX workbook in read-only mode and returns a lazy
+    iterator over its data rows. Rows are read from the file as they are consumed, so the
+    first row is available without loading the sheet.
     Assumes the first row is the header.
-    Attempts to convert Timestamp objects to strings.
+
+    Args:
+        xlsx_source: Raw bytes or a binary file-like object.
+        max_rows (int): Stop after this many data rows (e.g. for previews). None reads the whole sheet.
+
+    Returns:
+        A tuple containing:
+        - header_list (list): List of column headers.
+        - row_iterator (iterator): Generator yielding one dictionary per non-empty data row.
+        - error_message (str or None): An error message if the sheet has no header row.
+    """
+    if isinstance(xlsx_source, (bytes, bytearray)):
+        xlsx_source = io.BytesIO(xlsx_source)
+
+    # read_only streams the sheet XML, data_only returns cached formula results instead of formulas
+    workbook = openpyxl.load_workbook(xlsx_source, read_only=True, data_only=True)
+    rows = workbook.worksheets[0].iter_rows(values_only=True)
+
+    raw_headers = next(rows, None)
+    if raw_headers is None:
+        workbook.close()
+        error_message = "XLSX sheet is empty."
+        logger.debug(f"Debug in stream_xlsx_rows: {error_message}")
+        return [], iter(()), error_message
+
+    # Trailing empty header cells only come from formatting, not from data
+    raw_headers = list(raw_headers)
+    while raw_headers and raw_headers[-1] is None:
+        raw_headers.pop()
+    header_list = _unique_headers(raw_headers)
+    logger.debug(f"Debug in stream_xlsx_rows: Identified {len(header_list)} headers.")
+
+    def iter_rows():
+        try:
+            row_count = 0
+            for row in rows:
+                if max_rows is not None and row_count >= max_rows:
+                    break
+                if all(cell is None for cell in row):
+                    continue # Skip empty rows
+                row_count += 1
+                yield dict(zip(header_list, row))
+        finally:
+            workbook.close() # Read-only workbooks keep the archive open until closed
+
+    return header_list, iter_rows(), None
+
+
+# Updated xlsx_to_list_of_dicts function: streams the sheet instead of going through a DataFrame
+def xlsx_to_list_of_dicts(xlsx_content, max_rows=None):
+    """
+    Converts XLSX content to a columnar Dataset, reading the sheet row by row.
+    Assumes the first row is the header.
+    Date columns are stored as typed day numbers (ISO strings in the row view).
     Includes debug logging.
+
+    Args:
+        xlsx_content: The raw byte content of the XLSX file, or a binary file-like object.
+        max_rows (int): Read at most this many data rows (e.g. for previews). None reads the whole sheet.
+
+    Returns:
+        A tuple containing:
+        - header_list (list): List of column headers.
+        - list_of_dicts (Dataset): Columnar dataset; iterating it yields one dictionary per row.
+        - error_message (str or None): An error message if conversion failed.
     """
     header_list = []
     list_of_dicts = []
     error_message = None
 
-    # logger.debug(f"Debug in xlsx_to_list_of_dicts: Input type: {type(xlsx_content)}") # Keep minimized
-
     try:
-        excel_file = io.BytesIO(xlsx_content)
-        # Read the Excel file, keeping original data types where possible
-        # Pandas handles date and number conversion well by default
-        df = pd.read_excel(excel_file, sheet_name=0, header=0)
+        header_list, row_iterator, error_message = stream_xlsx_rows(xlsx_content, max_rows=max_rows)
+        if error_message:
+            return [], [], error_message
 
-        header_list = df.columns.tolist()
+        # Build typed columns while the rows are read; dates are normalized once per distinct value
+        list_of_dicts = Dataset.from_rows(header_list, row_iterator)
 
-        # Convert DataFrame to a list of dictionaries
-        # Use .where(pd.notna, None) to replace NaN with None, which is JSON serializable
-        list_of_dicts = df.where(pd.notna, None).to_dict('records')
+        logger.debug(f"Debug in xlsx_to_list_of_dicts: Converted XLSX to {len(list_of_dicts)} rows with {len(header_list)} headers.")
+
+    except Exception as e:
+        error_message = f"Error processing XLSX file: {e}"
+        logger.error(f"Debug in xlsx_to_list_of_dicts: {error_message}", exc_info=True)
+        header_list = []
+        list_of_dicts = []
 
-        # --- Data Type Conversion Logic for XLSX (Handle Timestamps for JSON) ---
-        # Iterate through the list of dictionaries and convert specific types for JSON serialization
-        for row_dict in list_of_dicts:
-            for key, value in row_dict.items():
-                # Convert Pandas Timestamp objects to ISO 8601 strings for JSON compatibility
-                if isinstance(value, pd.Timestamp):
-                    try:
-                        # Convert to ISO 8601 format string
-                        row_dict[key] = value.isoformat()
-                        # logger.debug(f"Debug in xlsx_to_list_of_dicts: Converted Timestamp for column '{key}' to string.") # Keep minimized
-                    except Exception as e:
-                        logger.debug(f"Debug in xlsx_to_list_of_dicts: Error converting Timestamp for column '{key}': {e}")
-                        row_dict[key] = str(value) # Fallback to string conversion
 
-                # Pandas usually handles numeric conversion well, so no need to explicitly convert 'Amount' here
-                # If needed, you could add a check similar to other converters
+    return header_list, list_of_dicts, error_message
 
-        logger.debug(f"Debug in xlsx_to_list_of_dicts: Converted XLSX to {len(list_of_dicts)} rows with {len(header_list)} headers. Timestamp objects converted.")
+
+# Legacy .xls workbooks are not supported by openpyxl and still go through pandas
+def xls_to_list_of_dicts(xls_content: bytes):
+    """
+    Converts legacy XLS content (bytes) to a columnar Dataset using pd.read_excel.
+    Assumes the first row is the header.
+    Includes debug logging.
+    """
+    header_list = []
+    list_of_dicts = []
+    error_message = None
+
+    try:
+        excel_file = io.BytesIO(xls_content)
+        df = pd.read_excel(excel_file, sheet_name=0, header=0)
+
+        # Build typed columns straight from the DataFrame
+        list_of_dicts = Dataset.from_dataframe(df)
+        header_list = list(list_of_dicts.headers)
+
+        logger.debug(f"Debug in xls_to_list_of_dicts: Converted XLS to {len(list_of_dicts)} rows with {len(header_list)} headers.")
 
     except Exception as e:
-        error_message = f"Error processing XLSX file: {e}"
-        logger.error(f"Debug in xlsx_to_list_of_dicts: {error_message}", exc_info=True)
+        error_message = f"Error processing XLS file: {e}"
+        logger.error(f"Debug in xls_to_list_of_dicts: {error_message}", exc_info=True)
         header_list = []
         list_of_dicts = []
 
 
-    return header_list, list_of_dicts, error_message
\ No newline at end of file
+    return header_list, list_of_dicts, error_message
@@ -4,11 +4,13 @@ import xml.etree.ElementTree as ET
 import json
 import io
 import csv
+import itertools
 import re
 import logging
 
 # Import helper functions from the utils module
-from .utils import clean_and_format_date, clean_and_parse_amount
+from .utils import parse_amount_column, parse_date_column
+from ..dataset import Column, Dataset, DATE, FLOAT
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
@@ -27,11 +29,196 @@ namespaces = {
 EXPECTED_SPREADSHEETML_HEADERS = ["Posting date", "Description", "Type", "Amount", "Reconcile"]
 
 
+# Precompiled patterns used while scanning SpreadsheetML rows
+SS_WORKSHEET_TAG = f'{{{SS_NAMESPACE}}}Worksheet'
+SS_TABLE_TAG = f'{{{SS_NAMESPACE}}}Table'
+SS_ROW_TAG = f'{{{SS_NAMESPACE}}}Row'
+SS_CELL_TAG = f'{{{SS_NAMESPACE}}}Cell'
+SS_DATA_TAG = f'{{{SS_NAMESPACE}}}Data'
+SS_INDEX_ATTRIBUTE = f'{{{SS_NAMESPACE}}}Index'
+# Use regex word boundaries to match whole words, not substrings within words
+_HEADER_KEYWORD_PATTERNS = [re.compile(r'\b' + re.escape(expected_header.lower()) + r'\b') for expected_header in EXPECTED_SPREADSHEETML_HEADERS]
+# Basic date pattern check for the first cell of a data row (SpreadsheetML date-time or MM/DD/YYYY)
+_DATA_ROW_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}T|\d{2}/\d{2}/\d{4}')
+MAX_ROWS_TO_CHECK_FOR_HEADER = 10
+HEADER_MATCH_THRESHOLD = 3 # Minimum number of expected header keywords in the header row
+
+
+def _spreadsheetml_row_values(row):
+    """Returns the cell texts of one ss:Row, inserting empty strings for ss:Index gaps."""
+    row_values = []
+    current_cell_index = 1
+    for cell in row.iter(SS_CELL_TAG):
+        index_attr = cell.get(SS_INDEX_ATTRIBUTE)
+        if index_attr:
+            cell_index = int(index_attr)
+            if cell_index > current_cell_index:
+                row_values.extend([""] * (cell_index - current_cell_index))
+            current_cell_index = cell_index
+
+        cell_value = ""
+        for data_element in cell.iter(SS_DATA_TAG):
+            cell_value = ''.join(data_element.itertext()).strip() # Strip whitespace
+            break # Only the first ss:Data element of a cell holds its value
+
+        row_values.append(cell_value)
+        current_cell_index += 1
+    return row_values
+
+
+def _iter_spreadsheetml_rows(xml_source):
+    """
+    Yields the cell values (list of str) of every ss:Row in the first ss:Table of the first
+    ss:Worksheet, parsing the document incrementally. Rows are discarded once processed and
+    parsing stops at the end of that table.
+
+    Args:
+        xml_source: Raw bytes or a binary file-like object.
+    """
+    if isinstance(xml_source, (bytes, bytearray)):
+        xml_source = io.BytesIO(xml_source)
+
+    open_elements = [] # Ancestors of the element being parsed, outermost first
+    rows_open = 0      # Number of currently open ss:Row elements (their cells must be kept)
+    worksheet = None
+    table = None
+    for event, element in ET.iterparse(xml_source, events=('start', 'end')):
+        if event == 'start':
+            open_elements.append(element)
+            if element.tag == SS_ROW_TAG:
+                rows_open += 1
+            elif element.tag == SS_WORKSHEET_TAG and worksheet is None:
+                worksheet = element
+            elif element.tag == SS_TABLE_TAG and worksheet is not None and table is None:
+                table = element
+            continue
+
+        open_elements.pop()
+        if element is table:
+            return # Only the first table is read
+        if element is worksheet:
+            logger.debug("Debug in _iter_spreadsheetml_rows: No Table found in SpreadsheetML.")
+            return
+        if element.tag == SS_ROW_TAG:
+            rows_open -= 1
+            if table is not None and rows_open == 0:
+                yield _spreadsheetml_row_values(element)
+        if rows_open == 0 and open_elements:
+            # Done with this element (a whole row, or anything outside rows): drop it
+            open_elements[-1].remove(element)
+
+
+def stream_spreadsheetml_rows(xml_source):
+    """
+    Finds the header row of a SpreadsheetML document (searching the first rows for the
+    expected header keywords) and returns a lazy iterator over the data rows after it.
+
+    Args:
+        xml_source: Raw bytes or a binary file-like object.
+
+    Returns:
+        A tuple containing:
+        - header_list (list): The expected SpreadsheetML headers.
+        - row_iterator (iterator): Generator yielding one dictionary (str values) per data row.
+        - error_message (str or None): An error message if the header row was not found.
+    """
+    rows = _iter_spreadsheetml_rows(xml_source)
+
+    # --- Phase 1: Find the header row ---
+    # Check the initial rows for enough of the expected header keywords
+    header_row_index = None
+    for i, row_values in enumerate(itertools.islice(rows, MAX_ROWS_TO_CHECK_FOR_HEADER)):
+        row_string_lower = " ".join(v.lower() for v in row_values) # Combine row values into a single lowercase string
+        found_header_keywords = sum(1 for pattern in _HEADER_KEYWORD_PATTERNS if pattern.search(row_string_lower))
+        if found_header_keywords >= HEADER_MATCH_THRESHOLD:
+            header_row_index = i
+            logger.debug(f"Debug in stream_spreadsheetml_rows: Identified header row at index {header_row_index}.")
+            break
+
+    # If header was not found, we cannot proceed
+    if header_row_index is None:
+        error_message = "SpreadsheetML header row not found."
+        logger.debug(f"Debug in stream_spreadsheetml_rows: {error_message}")
+        return [], iter(()), error_message
+
+    header_list = list(EXPECTED_SPREADSHEETML_HEADERS)
+
+    # --- Phase 2: Extract data rows after the header ---
+    def iter_rows():
+        for row_values in rows:
+            # Only keep rows whose first column looks like a date
+            # This helps filter out summary rows or other non-data rows that might appear after the header
+            if row_values and row_values[0] and _DATA_ROW_DATE_PATTERN.match(row_values[0]):
+                # Ensure the row has enough columns to match the header, pad with empty strings if not
+                padded_row = row_values + [""] * (len(header_list) - len(row_values))
+                yield dict(zip(header_list, padded_row))
+
+    return header_list, iter_rows(), None
+
+
+def spreadsheetml_to_list_of_dicts(xml_content):
+    """
+    Converts SpreadsheetML XML content into a columnar Dataset in a single streaming pass.
+    Searches for the header row based on keywords, then extracts the data rows after it.
+    Attempts to convert 'Amount' column to float and the date column to dates.
+
+    Args:
+        xml_content: The raw byte content of the SpreadsheetML XML file, or a binary file-like object.
+
+    Returns:
+        A tuple containing:
+        - header_list (list): List of column headers.
+        - list_of_dicts (Dataset): Columnar dataset; iterating it yields one dictionary per data row.
+        - error_message (str or None): An error message if conversion failed.
+    """
+    header_list = []
+    list_of_dicts = []
+    error_message = None
+
+    try:
+        header_list, row_iterator, error_message = stream_spreadsheetml_rows(xml_content)
+        if error_message:
+            return [], [], error_message
+
+        list_of_dicts = Dataset.from_rows(header_list, row_iterator)
+        logger.debug(f"Debug in spreadsheetml_to_list_of_dicts: Extracted {len(list_of_dicts)} data rows from SpreadsheetML.")
+
+        if not list_of_dicts:
+            error_message = "No data rows found after header in SpreadsheetML."
+            logger.debug(f"Debug in spreadsheetml_to_list_of_dicts: {error_message}")
+            return [], [], error_message
+
+        # --- Data Type Conversion Logic (whole columns at once) ---
+        for header in header_list:
+            column = list_of_dicts.column(header)
+            if header.lower() == 'amount':
+                amount_values, amount_valid = column.to_float_array(parse_amount_column)
+                list_of_dicts.columns[header] = Column(header, FLOAT, amount_values, amount_valid)
+            elif 'date' in header.lower():
+                # Data rows were selected by their date, so only switch to dates if every one parses
+                date_days, date_valid = column.to_day_array(parse_date_column)
+                if date_valid.all():
+                    list_of_dicts.columns[header] = Column(header, DATE, date_days, date_valid)
+
+    except ET.ParseError as e:
+        error_message = f"Error parsing XML as SpreadsheetML: {e}"
+        logger.error(f"Debug in spreadsheetml_to_list_of_dicts: {error_message}", exc_info=True)
+        header_list = []
+        list_of_dicts = []
+    except Exception as e:
+        error_message = f"An unexpected error occurred during SpreadsheetML parsing: {e}"
+        logger.error(f"Debug in spreadsheetml_to_list_of_dicts: {error_message}", exc_info=True)
+        header_list = []
+        list_of_dicts = []
+
+    return header_list, list_of_dicts, error_message
+
+
 def xml_to_csv_spreadsheetml(xml_content: bytes) -> str:
     """
     Converts SpreadsheetML XML content to CSV format, searching for the header row
     based on keywords and then extracting data rows.
-    Includes debug logging to track progress.
+    Kept for callers that need CSV text; the upload view uses spreadsheetml_to_list_of_dicts.
 
     Args:
         xml_content: The raw byte content of the SpreadsheetML XML file.
@@ -43,136 +230,22 @@ def xml_to_csv_spreadsheetml(xml_content: bytes) -> str:
     csv_output = io.StringIO()
     csv_writer = csv.writer(csv_output)
 
-    header_list = []
-    data_rows = []
-    header_row_index = None # To store the index of the row containing headers
-
     try:
-        # Attempt to parse the XML
-        root = ET.fromstring(xml_content)
-        logger.debug("Debug in xml_to_csv_spreadsheetml: Successfully parsed XML.")
-
-
-        # Check if this looks like SpreadsheetML XML
-        worksheet = root.find('.//ss:Worksheet', namespaces)
-        if worksheet is None:
-            # This doesn't look like SpreadsheetML, return empty string for this function
-            logger.debug("Debug in xml_to_csv_spreadsheetml: Input does not appear to be SpreadsheetML XML.")
+        header_list, row_iterator, error_message = stream_spreadsheetml_rows(xml_content)
+        if error_message:
             return ""
 
-        table = worksheet.find('.//ss:Table', namespaces)
-        if table is None:
-            logger.debug("Debug in xml_to_csv_spreadsheetml: No Table found in SpreadsheetML.")
-            return ""
+        csv_writer.writerow(header_list) # Write the extracted headers
+        row_count = 0
+        for row_dict in row_iterator:
+            csv_writer.writerow(row_dict.values())
+            row_count += 1
 
-        # Get all rows first to be able to check indices
-        rows = table.findall('.//ss:Row', namespaces)
-        logger.debug(f"Debug in xml_to_csv_spreadsheetml: Found {len(rows)} rows in SpreadsheetML.")
-
-        # --- Phase 1: Find the header row ---
-        # Iterate through initial rows to find the header based on keywords
-        max_rows_to_check_for_header = 10
-        logger.debug(f"Debug in xml_to_csv_spreadsheetml: Searching for header in first {min(len(rows), max_rows_to_check_for_header)} rows...")
-        for i in range(min(len(rows), max_rows_to_check_for_header)):
-            row = rows[i]
-            row_values = []
-            current_cell_index = 1
-
-            # Extract cell values for the current row being checked for header
-            for cell in row.findall('.//ss:Cell', namespaces):
-                index_attr = cell.get(f'{{{SS_NAMESPACE}}}Index')
-                if index_attr:
-                    cell_index = int(index_attr)
-                    while current_cell_index < cell_index:
-                        row_values.append("")
-                        current_cell_index += 1
-                    current_cell_index = cell_index
-
-                data_element = cell.find('.//ss:Data', namespaces)
-                cell_value = ""
-                if data_element is not None:
-                    cell_value = ''.join(data_element.itertext()).strip() # Strip whitespace
-
-                row_values.append(cell_value)
-                current_cell_index += 1
-
-            # Check if this row contains enough of the expected header keywords
-            found_header_keywords = 0
-            row_string_lower = " ".join(str(v).lower() for v in row_values if v is not None) # Combine row values into a single lowercase string
-
-            for expected_header in EXPECTED_SPREADSHEETML_HEADERS:
-                # Use regex word boundaries to match whole words, not substrings within words
-                if re.search(r'\b' + re.escape(expected_header.lower()) + r'\b', row_string_lower):
-                    found_header_keywords += 1
-
-            # We'll consider it the header row if at least 3 of the expected keywords are found
-            header_match_threshold = 3
-            is_header_row = found_header_keywords >= header_match_threshold
-
-            if is_header_row:
-                header_list = EXPECTED_SPREADSHEETML_HEADERS
-                header_row_index = i # Store the index of the header row
-                logger.debug(f"Debug in xml_to_csv_spreadsheetml: Identified header row at index {header_row_index}.")
-                break # Stop searching for header once found
-
-
-        # If header was not found, we cannot proceed
-        if not header_list or header_row_index is None:
-            logger.debug("Debug in xml_to_csv_spreadsheetml: Header row not found.")
-            return "" # Return empty CSV if header not found
-
-        # --- Phase 2: Extract data rows after the header ---
-        # Start processing rows immediately after the identified header row
-        first_data_row_actual_index = header_row_index + 1
-        logger.debug(f"Debug in xml_to_csv_spreadsheetml: Starting data row extraction from index {first_data_row_actual_index}...")
-
-        for i in range(first_data_row_actual_index, len(rows)):
-            row = rows[i]
-            row_values = []
-            current_cell_index = 1
-
-            # Extract cell values for the current data row
-            for cell in row.findall('.//ss:Cell', namespaces):
-                index_attr = cell.get(f'{{{SS_NAMESPACE}}}Index')
-                if index_attr:
-                    cell_index = int(index_attr)
-                    while current_cell_index < cell_index:
-                        row_values.append("")
-                        current_cell_index += 1
-                    current_cell_index = cell_index
-
-                data_element = cell.find('.//ss:Data', namespaces)
-                cell_value = ""
-                if data_element is not None:
-                    cell_value = ''.join(data_element.itertext()).strip() # Strip whitespace
-
-                row_values.append(cell_value)
-                current_cell_index += 1
-
-            # Check if the row is not empty and the first column looks like a date
-            # This helps filter out summary rows or other non-data rows that might appear after the header
-            is_potential_data_row = row_values and len(row_values) > 0 and row_values[0] and isinstance(row_values[0], str) and (re.match(r'\d{4}-\d{2}-\d{2}T', row_values[0]) or re.match(r'\d{2}/\d{2}/\d{4}', row_values[0])) # Basic date pattern check
-
-            if is_potential_data_row:
-                # Add the data row values
-                # Ensure the row has enough columns to match the header, pad with None if not
-                padded_row = row_values + [None] * (len(header_list) - len(row_values))
-                data_rows.append(padded_row)
-                # logger.debug(f"Debug in xml_to_csv_spreadsheetml: Added row {i} to data_rows.") # Keep minimized
-            # else:
-                # logger.debug(f"Debug in xml_to_csv_spreadsheetml: Skipping potential non-data row at index {i}.") # Keep minimized
-
-
-        # --- Write headers and data rows to CSV ---
-        if header_list and data_rows:
-            csv_writer.writerow(header_list) # Write the extracted headers
-            csv_writer.writerows(data_rows) # Write the extracted data rows
-            csv_string = csv_output.getvalue()
-            logger.debug(f"Debug in xml_to_csv_spreadsheetml: Successfully extracted {len(data_rows)} data rows from SpreadsheetML. Converted to CSV string.")
-            return csv_string
-        else:
+        if not row_count:
             logger.debug("Debug in xml_to_csv_spreadsheetml: No data rows found after header in SpreadsheetML.")
             return "" # Return empty CSV if no data rows found after header
+        logger.debug(f"Debug in xml_to_csv_spreadsheetml: Successfully extracted {row_count} data rows from SpreadsheetML. Converted to CSV string.")
+        return csv_output.getvalue()
 
     except ET.ParseError as e:
         logger.error(f"Debug in xml_to_csv_spreadsheetml: Error parsing XML as SpreadsheetML: {e}", exc_info=True)
@@ -182,22 +255,103 @@ def xml_to_csv_spreadsheetml(xml_content: bytes) -> str:
         return ""
 
 
-# Add a new function to parse the generic XML format
-def generic_xml_to_list_of_dicts(xml_content: bytes):
+# --- Streaming generic XML (<record> elements) ---
+GENERIC_RECORD_TAG = 'record'
+
+
+def _iter_record_elements(xml_source, record_tag=GENERIC_RECORD_TAG):
+    """
+    Yields every <record> element of the document as soon as its end tag has been parsed.
+    Elements are detached from the tree once the caller has moved on, so memory stays
+    bounded by the size of one record regardless of the size of the document.
+
+    Args:
+        xml_source: Raw bytes or a binary file-like object.
+        record_tag (str): Tag name of the record elements (matched at any depth).
+    """
+    if isinstance(xml_source, (bytes, bytearray)):
+        xml_source = io.BytesIO(xml_source)
+
+    open_elements = [] # Ancestors of the element being parsed, outermost first
+    records_open = 0   # Number of currently open record elements (children of a record must be kept)
+    for event, element in ET.iterparse(xml_source, events=('start', 'end')):
+        if event == 'start':
+            open_elements.append(element)
+            if element.tag == record_tag:
+                records_open += 1
+            continue
+
+        open_elements.pop()
+        if element.tag == record_tag:
+            records_open -= 1
+            yield element
+        if records_open == 0 and open_elements:
+            # Done with this element (a whole record, or anything outside records): drop it
+            open_elements[-1].remove(element)
+
+
+def _record_to_row(record, header_set):
+    """Maps the children of one record to a {tag: text} dictionary in a single pass."""
+    row_dict = {}
+    for child in record:
+        tag = child.tag
+        # Like record.find(tag): the first child with a given tag wins
+        if tag in header_set and tag not in row_dict:
+            row_dict[tag] = ''.join(child.itertext()).strip() # Extract text and strip whitespace
+    return row_dict
+
+
+def stream_generic_xml_rows(xml_source):
+    """
+    Reads the first <record> of a generic XML document and returns a lazy iterator over all records.
+    Headers are the tag names of the first record's children.
+
+    Args:
+        xml_source: Raw bytes or a binary file-like object.
+
+    Returns:
+        A tuple containing:
+        - header_list (list): List of column headers.
+        - row_iterator (iterator): Generator yielding one dictionary (raw text values) per non-empty record.
+        - error_message (str or None): An error message if no record was found.
+    """
+    records = _iter_record_elements(xml_source)
+    first_record = next(records, None)
+    if first_record is None:
+        error_message = "No <record> elements found in the XML."
+        logger.debug(f"Debug in stream_generic_xml_rows: {error_message}")
+        return [], iter(()), error_message
+
+    # Determine headers from the tags in the first record (assuming consistent structure)
+    header_list = list(dict.fromkeys(child.tag for child in first_record if isinstance(child.tag, str)))
+    logger.debug(f"Debug in stream_generic_xml_rows: Identified {len(header_list)} headers from first record.")
+
+    def iter_rows():
+        header_set = set(header_list)
+        for record in itertools.chain((first_record,), records):
+            row_dict = _record_to_row(record, header_set)
+            if any(row_dict.values()):
+                yield {header: row_dict.get(header) for header in header_list}
+
+    return header_list, iter_rows(), None
+
+
+def generic_xml_to_list_of_dicts(xml_content):
     """
     Converts a generic XML format (like the one generated by the user's converter)
     to a list of dictionaries.
     Looks for <record> elements and extracts data from nested tags.
-    Attempts to convert 'Amount' column to float and date strings to datetime objects.
+    The document is parsed incrementally (ET.iterparse), one record at a time.
+    Attempts to convert 'Amount' column to float and 'Date' column to dates.
     Includes debug logging.
 
     Args:
-        xml_content: The raw byte content of the generic XML file.
+        xml_content: The raw byte content of the generic XML file, or a binary file-like object.
 
     Returns:
         A tuple containing:
         - header_list (list): List of column headers (tag names found in records).
-        - list_of_dicts (list): List of dictionaries, each representing a record.
+        - list_of_dicts (Dataset): Columnar dataset; iterating it yields one dictionary per record.
         - error_message (str or None): An error message if conversion failed.
     """
     header_list = []
@@ -205,64 +359,25 @@ def generic_xml_to_list_of_dicts(xml_content: bytes):
     error_message = None
 
     try:
-        root = ET.fromstring(xml_content)
-        logger.debug("Debug in generic_xml_to_list_of_dicts: Successfully parsed XML.")
-
-        records = root.findall('.//record') # Find all <record> elements
-        logger.debug(f"Debug in generic_xml_to_list_of_dicts: Found {len(records)} <record> elements.")
-
-        if not records:
-            error_message = "No <record> elements found in the XML."
-            logger.debug(f"Debug in generic_xml_to_list_of_dicts: {error_message}")
+        header_list, row_iterator, error_message = stream_generic_xml_rows(xml_content)
+        if error_message:
             return [], [], error_message
 
-        # Determine headers from the tags in the first record (assuming consistent structure)
-        if records[0] is not None:
-            header_list = [elem.tag for elem in records[0] if elem.tag is not ET.Comment and elem.tag is not ET.ProcessingInstruction]
-            logger.debug(f"Debug in generic_xml_to_list_of_dicts: Identified {len(header_list)} headers from first record.")
-        else:
-            logger.debug("Debug in generic_xml_to_list_of_dicts: First record element is None.")
-
-
-        # Process each record
-        for record in records:
-            row_dict = {}
-            # Extract data from each expected header tag within the record
-            for header in header_list:
-                element = record.find(header) # Find the element with the tag name matching the header
-                cell_value = None
-                if element is not None:
-                    cell_value = ''.join(element.itertext()).strip() # Extract text and strip whitespace
-
-                # --- Data Type Conversion Logic for Generic XML ---
-                if isinstance(header, str):
-                    if header.lower() == 'amount':
-                        try:
-                            # Use the helper function for amount parsing
-                            amount_value = clean_and_parse_amount(cell_value)
-                            row_dict[header] = amount_value
-
-                        except (ValueError, TypeError) as e:
-                            logger.debug(f"Debug in generic_xml_to_list_of_dicts: Could not convert Amount value '{cell_value}' to float for column '{header}': {e}")
-                            row_dict[header] = None # Set to None if conversion fails
-
-                    elif header.lower() == 'date':
-                         # Use the helper function for date parsing
-                         cleaned_date = clean_and_format_date(cell_value)
-                         row_dict[header] = cleaned_date
-
-
-                    else:
-                        # For other headers, just store the extracted string value
-                        row_dict[header] = cell_value
-
-                else:
-                    # If header is not a string (unexpected), just store the value
-                    row_dict[header] = cell_value
-
-
-            if row_dict and any(row_dict.values()):
-                list_of_dicts.append(row_dict)
+        # Process records straight into typed columns (no DOM, no intermediate list of dicts)
+        list_of_dicts = Dataset.from_rows(header_list, row_iterator)
+        logger.debug(f"Debug in generic_xml_to_list_of_dicts: Read {len(list_of_dicts)} non-empty <record> elements.")
+
+        # --- Data Type Conversion Logic for Generic XML (whole columns at once) ---
+        for header in header_list:
+            column = list_of_dicts.column(header)
+            if header.lower() == 'amount':
+                # Unparseable amounts become missing cells
+                amount_values, amount_valid = column.to_float_array(parse_amount_column)
+                list_of_dicts.columns[header] = Column(header, FLOAT, amount_values, amount_valid)
+            elif header.lower() == 'date':
+                # Unparseable dates become missing cells
+                date_days, date_valid = column.to_day_array(parse_date_column)
+                list_of_dicts.columns[header] = Column(header, DATE, date_days, date_valid)
 
         if not list_of_dicts:
              error_message = error_message if error_message else "No data rows extracted from <record> elements."
@@ -284,4 +399,4 @@ def generic_xml_to_list_of_dicts(xml_content: bytes):
         list_of_dicts = []
 
 
-    return header_list, list_of_dicts, error_message
\ No newline at end of file
+    return header_list, list_of_dicts, error_message
@@ -0,0 +1,449 @@
+# In file_handlers/dataset.py
+
+import datetime
+import logging
+import contextlib
+import contextvars
+from array import array
+
+import numpy as np
+import pandas as pd
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Column kinds stored by the Dataset
+INTEGER = 'integer' # int64 values
+FLOAT = 'float'     # float64 values
+DATE = 'date'       # int64 days since 1970-01-01
+STRING = 'string'   # int32 codes into a list of distinct strings (dictionary encoding)
+
+EPOCH_DATE = datetime.date(1970, 1, 1)
+
+ROW_PROGRESS_INTERVAL = 10000
+# Callback receiving the number of rows read so far while from_rows/from_records build a
+# Dataset. Set per thread by report_row_progress (e.g. by background conversion jobs).
+# When the rows are read in a converter pool process, the pool relays them as
+# callback(rows_read, bytes_read) (see visualizer/converter_pool.py).
+_row_progress = contextvars.ContextVar('dataset_row_progress', default=None)
+
+
+@contextlib.contextmanager
+def report_row_progress(callback):
+    """Calls callback(rows_read) every ROW_PROGRESS_INTERVAL rows while Datasets are built inside the block."""
+    token = _row_progress.set(callback)
+    try:
+        yield
+    finally:
+        _row_progress.reset(token)
+
+
+def current_row_progress():
+    """Returns the callback set by the enclosing report_row_progress block, or None."""
+    return _row_progress.get()
+
+
+def _is_missing(value):
+    """Returns True for None and NaN/NaT values."""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return False
+    # NaN and NaT are the only values that are not equal to themselves
+    return value != value
+
+
+class Column:
+    """
+    One typed column of a Dataset.
+
+    Attributes:
+        name (str): Column header.
+        kind (str): One of INTEGER, FLOAT, DATE or STRING.
+        values (np.ndarray): int64/float64 values, int64 days since epoch for DATE,
+                             or int32 category codes for STRING.
+        valid (np.ndarray): Boolean mask, False where the cell is missing.
+        categories (list): Distinct values for STRING columns (None for other kinds).
+    """
+    __slots__ = ('name', 'kind', 'values', 'valid', 'categories')
+
+    def __init__(self, name, kind, values, valid, categories=None):
+        self.name = name
+        self.kind = kind
+        self.values = values
+        self.valid = valid
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        """Approximate memory used by the column arrays and string dictionary."""
+        size = self.values.nbytes + self.valid.nbytes
+        if self.categories:
+            size += sum(len(c) for c in self.categories)
+        return size
+
+    def get(self, index):
+        """Returns the cell at index as a plain (JSON-serializable) Python value or None."""
+        if not self.valid[index]:
+            return None
+        value = self.values[index]
+        if self.kind == STRING:
+            return self.categories[value]
+        if self.kind == FLOAT:
+            return float(value)
+        if self.kind == DATE:
+            return (EPOCH_DATE + datetime.timedelta(days=int(value))).isoformat()
+        return int(value)
+
+    def to_list(self):
+        """Returns the whole column as a list of plain Python values (None where missing)."""
+        if self.kind == STRING:
+            lookup = self.categories + [None]
+            codes = np.where(self.valid, self.values, len(self.categories))
+            return [lookup[code] for code in codes.tolist()]
+        if self.kind == DATE:
+            as_strings = self.values.astype('datetime64[D]').astype(str)
+            return [s if ok else None for s, ok in zip(as_strings.tolist(), self.valid.tolist())]
+        return [v if ok else None for v, ok in zip(self.values.tolist(), self.valid.tolist())]
+
+    def map_values(self, func):
+        """
+        Applies func to every cell and returns a numpy object array of the results.
+        For STRING columns func runs once per distinct value instead of once per row.
+        Missing cells are passed to func as None.
+        """
+        if self.kind == STRING:
+            mapped = np.empty(len(self.categories) + 1, dtype=object)
+            mapped[:-1] = [func(category) for category in self.categories]
+            mapped[-1] = func(None)
+            codes = np.where(self.valid, self.values, len(self.categories))
+            return mapped[codes]
+        result = np.empty(len(self), dtype=object)
+        result[:] = [func(value) for value in self.to_list()]
+        return result
+
+    def to_float_array(self, parse_column):
+        """
+        Returns (float64 array, valid mask) for the column.
+        Numeric columns are returned as-is. For other kinds parse_column, a column-level parser
+        such as parse_amount_column, is applied; STRING columns only parse their distinct values.
+        """
+        if self.kind in (INTEGER, FLOAT):
+            return self.values.astype(np.float64), self.valid.copy()
+        if self.kind == STRING:
+            if not self.categories:
+                return np.full(len(self), np.nan), np.zeros(len(self), dtype=bool)
+            parsed, parsed_valid = parse_column(self.categories)
+            codes = np.where(self.valid, self.values, 0)
+            valid = self.valid & parsed_valid[codes]
+            return np.where(valid, parsed[codes], np.nan), valid
+        return parse_column(self.to_list())
+
+    def to_day_array(self, parse_column):
+        """
+        Returns (int64 days since 1970-01-01, valid mask) for the column.
+        DATE columns are returned as-is. For other kinds parse_column, a column-level parser
+        such as parse_date_column, is applied; STRING columns only parse their distinct values.
+        """
+        if self.kind == DATE:
+            return self.values.copy(), self.valid.copy()
+        if self.kind == STRING:
+            if not self.categories:
+                return np.zeros(len(self), dtype=np.int64), np.zeros(len(self), dtype=bool)
+            parsed, parsed_valid = parse_column(self.categories)
+            codes = np.where(self.valid, self.values, 0)
+            valid = self.valid & parsed_valid[codes]
+            return np.where(valid, parsed[codes], 0), valid
+        return parse_column(self.to_list())
+
+    @classmethod
+    def from_values(cls, name, values):
+        """Builds a Column from any sequence of raw cell values, inferring its kind."""
+        builder = _ColumnBuilder(name)
+        for value in values:
+            builder.append(value)
+        return builder.finish()
+
+    @classmethod
+    def from_series(cls, name, series):
+        """Builds a Column from a pandas Series without going through Python objects where possible."""
+        valid = series.notna().to_numpy()
+        if pd.api.types.is_bool_dtype(series.dtype):
+            return cls.from_values(name, series.tolist())
+        if pd.api.types.is_integer_dtype(series.dtype):
+            return cls(name, INTEGER, series.to_numpy(dtype=np.int64), valid)
+        if pd.api.types.is_float_dtype(series.dtype):
+            return cls(name, FLOAT, series.to_numpy(dtype=np.float64, na_value=np.nan), valid)
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            as_ns = series.to_numpy(dtype='datetime64[ns]')
+            days = as_ns.astype('datetime64[D]')
+            if np.all((as_ns == days)[valid]):
+                return cls(name, DATE, np.where(valid, days.astype(np.int64), 0), valid)
+            # Keep a time component by falling back to ISO strings (as the converters used to emit)
+            return cls.from_values(name, [value.isoformat() if ok else None for value, ok in zip(series.tolist(), valid)])
+        return cls.from_values(name, series.tolist())
+
+
+_INTEGER_TYPES = (int, np.integer)
+_NUMBER_TYPES = (int, float, np.integer, np.floating)
+_BOOL_TYPES = (bool, np.bool_)
+
+
+class _ColumnBuilder:
+    """
+    Accumulates cell values for one column.
+    Numbers are packed straight into a typed array (int64, or float64 once a float is seen).
+    Any other value switches the column to dictionary encoding: every distinct value is
+    kept once and only an integer code is stored per row. The final kind is decided from
+    the distinct values only.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.valid = bytearray()
+        self.numbers = None # array('q') or array('d') while every value is a number
+        self.codes = None   # array('i') once the column is dictionary-encoded
+        self.lookup = {}
+        self.distinct = []
+
+    def append_missing(self, count):
+        """Appends count missing cells (e.g. for rows read before the column first appeared)."""
+        self.valid.extend(bytes(count))
+        if self.numbers is not None:
+            self.numbers.extend(array(self.numbers.typecode, bytes(8 * count)))
+        elif self.codes is not None:
+            self.codes.extend(array('i', [-1]) * count)
+
+    def append(self, value):
+        if _is_missing(value):
+            self.valid.append(0)
+            if self.numbers is not None:
+                self.numbers.append(0)
+            elif self.codes is not None:
+                self.codes.append(-1)
+            return
+
+        if self.codes is None and isinstance(value, _NUMBER_TYPES) and not isinstance(value, _BOOL_TYPES):
+            is_integer = isinstance(value, _INTEGER_TYPES)
+            if self.numbers is None:
+                # Zeros for the missing cells seen so far
+                self.numbers = array('q' if is_integer else 'd', bytes(8 * len(self.valid)))
+            elif not is_integer and self.numbers.typecode == 'q':
+                self.numbers = array('d', self.numbers)
+            try:
+                self.numbers.append(value)
+                self.valid.append(1)
+                return
+            except OverflowError:
+                pass # Integers beyond int64 are kept as Python objects
+
+        if self.codes is None:
+            self._switch_to_dictionary()
+        # Non-string values are keyed with their type, so 1, 1.0 and True stay distinct
+        key = value if value.__class__ is str else (value.__class__, value)
+        try:
+            code = self.lookup.get(key)
+        except TypeError:
+            # Unhashable values (lists, dicts) are stored by their string form
+            value = key = str(value)
+            code = self.lookup.get(key)
+        if code is None:
+            code = len(self.distinct)
+            self.lookup[key] = code
+            self.distinct.append(value)
+        self.codes.append(code)
+        self.valid.append(1)
+
+    def _switch_to_dictionary(self):
+        """Re-encodes the numbers collected so far as dictionary codes."""
+        self.codes = array('i')
+        numbers = self.numbers if self.numbers is not None else bytes(len(self.valid))
+        for number, ok in zip(numbers, self.valid):
+            if not ok:
+                self.codes.append(-1)
+                continue
+            key = (number.__class__, number)
+            code = self.lookup.get(key)
+            if code is None:
+                code = len(self.distinct)
+                self.lookup[key] = code
+                self.distinct.append(number)
+            self.codes.append(code)
+        self.numbers = None
+
+    def finish(self):
+        valid = np.frombuffer(bytes(self.valid), dtype=np.uint8).astype(bool)
+
+        if self.numbers is not None:
+            if self.numbers.typecode == 'q':
+                return Column(self.name, INTEGER, np.frombuffer(self.numbers, dtype=np.int64).copy(), valid)
+            values = np.frombuffer(self.numbers, dtype=np.float64)
+            return Column(self.name, FLOAT, np.where(valid, values, np.nan), valid)
+
+        if self.codes is None:
+            # Every cell is missing
+            return Column(self.name, STRING, np.full(len(valid), -1, dtype=np.int32), valid, [])
+
+        codes = np.frombuffer(self.codes, dtype=np.int32) if len(self.codes) else np.zeros(0, dtype=np.int32)
+        distinct = self.distinct
+        safe_codes = np.where(valid, codes, 0)
+
+        if distinct and all(isinstance(v, _NUMBER_TYPES) and not isinstance(v, _BOOL_TYPES) for v in distinct):
+            try:
+                if all(isinstance(v, _INTEGER_TYPES) for v in distinct):
+                    values = np.array(distinct, dtype=np.int64)[safe_codes]
+                    return Column(self.name, INTEGER, np.where(valid, values, 0), valid)
+                values = np.array(distinct, dtype=np.float64)[safe_codes]
+                return Column(self.name, FLOAT, np.where(valid, values, np.nan), valid)
+            except OverflowError:
+                pass # Integers beyond int64 are kept as strings
+
+        if distinct and all(isinstance(v, datetime.date) for v in distinct):
+            if all(not isinstance(v, datetime.datetime) or v.time() == datetime.time(0) for v in distinct):
+                days = np.array([(v if not isinstance(v, datetime.datetime) else v.date()).toordinal() - EPOCH_DATE.toordinal() for v in distinct], dtype=np.int64)
+                return Column(self.name, DATE, np.where(valid, days[safe_codes], 0), valid)
+            distinct = [v.isoformat() for v in distinct]
+
+        categories = [v if isinstance(v, str) else str(v) for v in distinct]
+        return Column(self.name, STRING, codes.copy(), valid, categories)
+
+
+class Dataset:
+    """
+    Columnar, in-memory table produced by the converters and consumed by the chart processors.
+    Stores one typed numpy array per column (dictionary-encoded for strings) instead of
+    one dictionary per row.
+
+    For compatibility with code written against list_of_dicts, a Dataset behaves like a
+    read-only sequence of row dictionaries: len(), truthiness, iteration and indexing
+    all work on row views built on demand.
+    """
+
+    def __init__(self, headers=None, columns=None):
+        self.headers = list(headers) if headers else []
+        self.columns = columns if columns is not None else {}
+        self._length = len(next(iter(self.columns.values()))) if self.columns else 0
+
+    # --- Constructors ---
+    @classmethod
+    def from_rows(cls, headers, rows):
+        """
+        Builds a Dataset from an iterable of row dictionaries (consumed lazily, one row at a time).
+        Columns are created for every header; keys missing from a row become missing cells.
+        """
+        builders = {}
+        for header in headers:
+            if header not in builders:
+                builders[header] = _ColumnBuilder(header)
+        progress = _row_progress.get()
+        row_count = 0
+        for row in rows:
+            for header, builder in builders.items():
+                builder.append(row.get(header))
+            row_count += 1
+            if progress is not None and row_count % ROW_PROGRESS_INTERVAL == 0:
+                progress(row_count)
+        return cls(headers, {name: builder.finish() for name, builder in builders.items()})
+
+    @classmethod
+    def from_records(cls, rows):
+        """
+        Builds a Dataset from an iterable of row dictionaries whose keys are not known up front.
+        Headers are the union of all keys in first-seen order, discovered in the same single pass.
+        """
+        builders = {}
+        progress = _row_progress.get()
+        row_count = 0
+        for row in rows:
+            for key in row:
+                if key not in builders:
+                    builders[key] = _ColumnBuilder(key)
+                    builders[key].append_missing(row_count)
+            for header, builder in builders.items():
+                builder.append(row.get(header))
+            row_count += 1
+            if progress is not None and row_count % ROW_PROGRESS_INTERVAL == 0:
+                progress(row_count)
+        return cls(list(builders), {name: builder.finish() for name, builder in builders.items()})
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Builds a Dataset column by column from a pandas DataFrame."""
+        headers = [str(h) for h in df.columns]
+        columns = {}
+        for header, (_, series) in zip(headers, df.items()):
+            if header not in columns:
+                columns[header] = Column.from_series(header, series)
+        return cls(headers, columns)
+
+    @classmethod
+    def coerce(cls, data, headers=None):
+        """Returns data unchanged if it is a Dataset, otherwise builds one from a list of dicts."""
+        if isinstance(data, cls):
+            return data
+        if not data:
+            return cls(headers)
+        if headers is None:
+            headers = list(dict.fromkeys(key for row in data for key in row))
+        return cls.from_rows(headers, data)
+
+    # --- Column access ---
+    def column(self, name):
+        """Returns the Column for name, or None if the dataset has no such column."""
+        return self.columns.get(name)
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    # --- Row view (list_of_dicts compatibility) ---
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Dataset row index out of range")
+        return self.row(index)
+
+    def __iter__(self):
+        return self.iter_rows()
+
+    def row(self, index):
+        """Returns row index as a dictionary keyed by column name."""
+        return {name: column.get(index) for name, column in self.columns.items()}
+
+    def slice(self, start, stop):
+        """Returns rows start..stop as a Dataset whose columns are views of this one (no copy)."""
+        return Dataset(self.headers, {name: Column(c.name, c.kind, c.values[start:stop], c.valid[start:stop], c.categories)
+                                      for name, c in self.columns.items()})
+
+    def iter_rows(self, start=0, stop=None):
+        """Yields row dictionaries, materializing one slice of column values at a time."""
+        stop = self._length if stop is None else min(stop, self._length)
+        batch_size = 4096
+        names = list(self.columns)
+        for batch_start in range(start, stop, batch_size):
+            sliced = [column.to_list() for column in self.slice(batch_start, min(batch_start + batch_size, stop)).columns.values()]
+            for values in zip(*sliced):
+                yield dict(zip(names, values))
+
+    def to_list_of_dicts(self):
+        """Materializes the dataset as a list of JSON-serializable row dictionaries."""
+        return list(self.iter_rows())
+
+    def to_dataframe(self):
+        """Returns a pandas DataFrame with the columns in header order."""
+        return pd.DataFrame({name: column.to_list() for name, column in self.columns.items()}, columns=list(self.columns))
+
+    def __repr__(self):
+        return f"Dataset({self._length} rows, {len(self.columns)} columns)"
@@ -0,0 +1,170 @@
+# In file_handlers/parse_cache.py
+
+import os
+import re
+import shutil
+import hashlib
+import logging
+import threading
+
+from .store import save_dataset, open_dataset, FILE_EXTENSION
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024 # Read size when hashing file objects that have no chunks() method
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Bump when converter output changes, so entries written by older code are no longer used
+CACHE_FORMAT_VERSION = 2
+_VERSION_DIRECTORY = re.compile(r'^v\d+$')
+
+
+def new_upload_digest():
+    """The hash object behind hash_upload, for code that sees an upload's bytes anyway (see visualizer.upload_handlers)."""
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_upload(file_object):
+    """
+    Returns the BLAKE2b hex digest of an upload, read chunk by chunk (UploadedFile.chunks()
+    when available), and rewinds the file so it can be converted afterwards.
+    Uploads received through visualizer.upload_handlers already carry it as content_hash.
+    """
+    digest = new_upload_digest()
+    if hasattr(file_object, 'chunks'):
+        for chunk in file_object.chunks():
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: file_object.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    file_object.seek(0)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Content-addressed, on-disk cache of converted datasets.
+
+    Each entry is one columnar file (see file_handlers.store) named after the upload hash
+    and the sniffed format. Its manifest also holds the converter's header list. Entries
+    are plain files, so the cache survives process restarts and is shared by every worker
+    using the same directory.
+
+    Recency is tracked through the file modification time, which is refreshed on every hit.
+    When a new entry pushes the cache past max_bytes, the least recently used entries are
+    deleted first. Entries of other CACHE_FORMAT_VERSIONs (sibling v<N> directories) are
+    never read, so they are deleted by the same sweep.
+
+    The hit/miss/eviction counters are kept per process (see stats()).
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.path.join(directory, f"v{CACHE_FORMAT_VERSION}")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _entry_path(self, content_hash, file_type):
+        return os.path.join(self.directory, f"{content_hash}-{file_type}{FILE_EXTENSION}")
+
+    def get(self, content_hash, file_type):
+        """
+        Looks up a converted upload.
+
+        Returns:
+            A tuple (header_list, Dataset) on a hit, or None on a miss.
+        """
+        path = self._entry_path(content_hash, file_type)
+        try:
+            stored = open_dataset(path)
+            dataset = stored.load()
+            os.utime(path) # Mark as most recently used
+        except (OSError, ValueError):
+            # Missing, evicted while being read, or unreadable: convert again
+            with self._lock:
+                self.misses += 1
+            logger.debug(f"Debug in ParseCache.get: Miss for {content_hash[:16]} ({file_type}).")
+            return None
+        with self._lock:
+            self.hits += 1
+        logger.debug(f"Debug in ParseCache.get: Hit for {content_hash[:16]} ({file_type}), {len(dataset)} rows.")
+        return stored.metadata.get('header', list(dataset.headers)), dataset
+
+    def put(self, content_hash, file_type, header_list, dataset):
+        """Stores a converted upload, then evicts least recently used entries beyond the quota."""
+        path = self._entry_path(content_hash, file_type)
+        try:
+            size = save_dataset(dataset, path, metadata={'header': header_list, 'file_type': file_type})
+        except OSError as e:
+            logger.error(f"Debug in ParseCache.put: Could not store cache entry: {e}", exc_info=True)
+            return
+        if size > self.max_bytes:
+            logger.debug(f"Debug in ParseCache.put: Entry of {size} bytes exceeds the quota of {self.max_bytes} bytes.")
+        self.evict(keep=path)
+
+    def _entries(self):
+        """Returns [(mtime, size, path)] for every cache entry, least recently used first."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if not entry.name.endswith(FILE_EXTENSION):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue # Removed by another process
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        entries.sort()
+        return entries
+
+    def _remove_other_versions(self):
+        """Deletes the v<N> directories written by code with another CACHE_FORMAT_VERSION."""
+        parent, current = os.path.split(self.directory)
+        try:
+            with os.scandir(parent) as scan:
+                stale = [entry.path for entry in scan
+                         if entry.name != current and _VERSION_DIRECTORY.match(entry.name) and entry.is_dir(follow_symlinks=False)]
+        except FileNotFoundError:
+            return
+        for path in stale:
+            shutil.rmtree(path, ignore_errors=True)
+            logger.debug(f"Debug in ParseCache.evict: Removed entries of an older cache format ({os.path.basename(path)}).")
+
+    def evict(self, keep=None):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes (keep is deleted
+        last), and the entries of other cache format versions.
+        """
+        self._remove_other_versions()
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        # The entry just written is only removed if it alone is over the quota
+        entries.sort(key=lambda entry: entry[2] == keep)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+            logger.debug(f"Debug in ParseCache.evict: Evicted {os.path.basename(path)} ({size} bytes).")
+
+    def stats(self):
+        """Returns the counters of this process together with the current size of the cache."""
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,263 @@
+# In file_handlers/store.py
+
+import os
+import json
+import mmap
+import struct
+import logging
+import tempfile
+from json.encoder import encode_basestring_ascii
+
+import numpy as np
+
+from .dataset import Column, Dataset, STRING
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# --- Columnar file layout ---
+# MAGIC | manifest size (uint64, little endian) | manifest (UTF-8 JSON) | padding | column buffers
+# Every buffer starts on an ALIGNMENT boundary so it can be memory-mapped as a numpy array.
+# Buffer offsets in the manifest are relative to the end of the padded manifest.
+# A string dictionary is a JSON array of ASCII-escaped strings, followed by an int64 buffer
+# of the offset of each string in it, so a few rows can be loaded without parsing the
+# whole dictionary (files written before the offsets were added are read in full).
+MAGIC = b'DVCOLS1\n'
+ALIGNMENT = 64
+FILE_EXTENSION = '.dvcols'
+
+_MANIFEST_SIZE = struct.Struct('<Q')
+_VALUE_DTYPES = {'integer': '<i8', 'float': '<f8', 'date': '<i8', 'string': '<i4'}
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_dataset(dataset, path, metadata=None):
+    """
+    Writes a Dataset to path as one columnar file: the values and validity mask of every
+    column are stored as raw little-endian arrays, string dictionaries as JSON blobs.
+    The file is written next to path and renamed into place, so readers never see a partial file.
+
+    Args:
+        dataset (Dataset): The dataset to store.
+        path (str): Destination file path (parent directories are created).
+        metadata (dict): Optional JSON-serializable values stored in the manifest (see StoredDataset.metadata).
+
+    Returns:
+        int: Size of the written file in bytes.
+    """
+    buffers = []
+    manifest_columns = []
+    offset = 0
+
+    def add_buffer(data):
+        nonlocal offset
+        offset = _aligned(offset)
+        buffers.append((offset, data))
+        entry = {'offset': offset, 'size': len(data)}
+        offset += len(data)
+        return entry
+
+    for name, column in dataset.columns.items():
+        dtype = _VALUE_DTYPES[column.kind]
+        entry = {
+            'name': name,
+            'kind': column.kind,
+            'dtype': dtype,
+            'values': add_buffer(np.ascontiguousarray(column.values, dtype=dtype).tobytes()),
+            'valid': add_buffer(np.ascontiguousarray(column.valid, dtype=np.bool_).tobytes()),
+            'categories': None,
+        }
+        if column.kind == STRING:
+            strings = [encode_basestring_ascii(category) for category in column.categories or []]
+            entry['categories'] = add_buffer(('[' + ','.join(strings) + ']').encode('ascii'))
+            # String i is blob[offsets[i]:offsets[i + 1] - 1] (each is followed by ',' or ']')
+            lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings)) + 1
+            entry['category_offsets'] = add_buffer(np.concatenate(([1], 1 + np.cumsum(lengths))).astype('<i8').tobytes())
+        manifest_columns.append(entry)
+
+    manifest = json.dumps({
+        'headers': dataset.headers,
+        'length': len(dataset),
+        'columns': manifest_columns,
+        'metadata': metadata or {},
+    }).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + _MANIFEST_SIZE.size + len(manifest))
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # A unique temporary name: concurrent writers of the same path (threads included) never share a file
+    descriptor, temporary_path = tempfile.mkstemp(suffix=f"{FILE_EXTENSION}.tmp", dir=directory)
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_MANIFEST_SIZE.pack(len(manifest)))
+            f.write(manifest)
+            for buffer_offset, data in buffers:
+                f.seek(data_start + buffer_offset)
+                f.write(data)
+            f.truncate(data_start + offset)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+    file_size = data_start + offset
+    logger.debug(f"Debug in save_dataset: Stored {len(dataset)} rows and {len(manifest_columns)} columns in {path} ({file_size} bytes).")
+    return file_size
+
+
+class StoredDataset:
+    """
+    Read access to a dataset written by save_dataset.
+    Opening only reads the manifest; load() memory-maps the requested columns and copies
+    only the requested row range, so the rest of the file is never read.
+
+    Attributes:
+        path (str): Path of the columnar file.
+        headers (list): Column headers in their original order.
+        length (int): Number of rows.
+        metadata (dict): Values passed to save_dataset(metadata=...).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a columnar dataset file.")
+            (manifest_size,) = _MANIFEST_SIZE.unpack(f.read(_MANIFEST_SIZE.size))
+            manifest = json.loads(f.read(manifest_size).decode('utf-8'))
+        self.data_start = _aligned(len(MAGIC) + _MANIFEST_SIZE.size + manifest_size)
+        self.headers = manifest['headers']
+        self.length = manifest['length']
+        self.columns = {entry['name']: entry for entry in manifest['columns']}
+        self.metadata = manifest.get('metadata') or {}
+
+    def __len__(self):
+        return self.length
+
+    def _read_array(self, buffer, dtype, rows):
+        # rows is a slice or an array of row indices
+        if self.length == 0 or (isinstance(rows, slice) and rows.stop <= rows.start):
+            return np.zeros(0, dtype=dtype)
+        mapped = np.memmap(self.path, dtype=dtype, mode='r', offset=self.data_start + buffer['offset'], shape=(self.length,))
+        # Copy the rows so the mapping is released once the arrays are built
+        return np.array(mapped[rows])
+
+    def column_array(self, name):
+        """
+        Returns (values, valid) of a whole column as read-only memory-mapped arrays, e.g. to
+        evaluate a filter or compute a sort order without building a Column.
+        """
+        entry = self.columns[name]
+        if self.length == 0:
+            return np.zeros(0, dtype=entry['dtype']), np.zeros(0, dtype=np.bool_)
+        return tuple(np.memmap(self.path, dtype=dtype, mode='r', offset=self.data_start + entry[buffer]['offset'], shape=(self.length,))
+                     for buffer, dtype in (('values', entry['dtype']), ('valid', np.bool_)))
+
+    def column_categories(self, name):
+        """Returns the whole string dictionary of a STRING column (None for other kinds)."""
+        entry = self.columns[name]
+        return self._read_categories(entry['categories']) if entry['categories'] else None
+
+    def _read_categories(self, buffer):
+        with open(self.path, 'rb') as f:
+            f.seek(self.data_start + buffer['offset'])
+            return json.loads(f.read(buffer['size']).decode('utf-8'))
+
+    def _category_count(self, entry):
+        offsets = entry.get('category_offsets')
+        return offsets['size'] // 8 - 1 if offsets else None
+
+    def _read_category_subset(self, entry, codes):
+        """Reads only the dictionary strings with the given (sorted, distinct) codes."""
+        if len(codes) == 0:
+            return []
+        offsets = np.memmap(self.path, dtype='<i8', mode='r', offset=self.data_start + entry['category_offsets']['offset'],
+                            shape=(self._category_count(entry) + 1,))
+        blob_start = self.data_start + entry['categories']['offset']
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            strings = [mapped[blob_start + begin:blob_start + end - 1]
+                       for begin, end in zip(offsets[codes].tolist(), offsets[codes + 1].tolist())]
+        return json.loads(b'[' + b','.join(strings) + b']')
+
+    def load(self, columns=None, start=0, stop=None):
+        """
+        Loads a Dataset holding only the given columns and rows.
+        A string column loaded for fewer rows than its dictionary has entries only gets the
+        strings those rows use, so loading a page of rows does not depend on the dataset size.
+
+        Args:
+            columns (list): Column names to load (names not in the file are ignored). None loads every column.
+            start (int): First row to load.
+            stop (int): Row after the last one to load. None loads up to the end.
+
+        Returns:
+            Dataset: The selected part of the stored dataset.
+        """
+        stop = self.length if stop is None else max(0, min(stop, self.length))
+        start = max(0, min(start, stop))
+        names = self._column_names(columns)
+        dataset = self._load_rows(names, self._load_categories(self._full_dictionaries(names, stop - start)), slice(start, stop))
+        logger.debug(f"Debug in StoredDataset.load: Loaded rows {start}-{stop} of {len(names)} columns from {self.path}.")
+        return dataset
+
+    def take(self, indices, columns=None):
+        """
+        Loads the rows at the given indices, in that order (e.g. a page of a sorted view).
+        Like load(), only the requested cells and the strings they use are read.
+
+        Args:
+            indices (np.ndarray): Row indices.
+            columns (list): Column names to load. None loads every column.
+
+        Returns:
+            Dataset: The selected rows.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        names = self._column_names(columns)
+        return self._load_rows(names, self._load_categories(self._full_dictionaries(names, len(indices))), indices)
+
+    def iter_chunks(self, chunk_size, columns=None):
+        """
+        Yields the stored rows as consecutive Datasets of at most chunk_size rows, so a whole
+        dataset can be processed in memory bounded by the chunk size. String dictionaries are
+        read once and shared by every chunk.
+        """
+        names = self._column_names(columns)
+        categories = self._load_categories(names)
+        for start in range(0, self.length, chunk_size):
+            yield self._load_rows(names, categories, slice(start, min(start + chunk_size, self.length)))
+
+    def _column_names(self, columns):
+        return [name for name in (self.columns if columns is None else columns) if name in self.columns]
+
+    def _load_categories(self, names):
+        return {name: self._read_categories(self.columns[name]['categories']) for name in names if self.columns[name]['categories']}
+
+    def _full_dictionaries(self, names, row_count):
+        # Dictionaries with more entries than the rows loaded are read partially by _load_rows
+        return [name for name in names if (self._category_count(self.columns[name]) or 0) <= row_count]
+
+    def _load_rows(self, names, categories, rows):
+        loaded = {}
+        for name in names:
+            entry = self.columns[name]
+            values = self._read_array(entry['values'], entry['dtype'], rows)
+            valid = self._read_array(entry['valid'], np.bool_, rows)
+            column_categories = categories.get(name)
+            if entry['categories'] and column_categories is None:
+                # Partial dictionary: keep the strings used by these rows and renumber the codes
+                used_codes = np.unique(values[valid])
+                column_categories = self._read_category_subset(entry, used_codes)
+                values = np.where(valid, np.searchsorted(used_codes, values), 0).astype(values.dtype)
+            loaded[name] = Column(name, entry['kind'], values, valid, column_categories)
+        headers = [header for header in self.headers if header in loaded]
+        return Dataset(headers, loaded)
+
+
+def open_dataset(path):
+    """Opens a columnar dataset file written by save_dataset (see StoredDataset)."""
+    return StoredDataset(path)
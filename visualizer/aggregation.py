@@ -0,0 +1,110 @@
+# In visualizer/aggregation.py
+
+import logging
+
+from django.db.models import Avg, Count, DateTimeField, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Trunc
+
+from .models import Transaction
+from .search import build_match_query, match_subquery
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+BUCKETS = ('day', 'week', 'month', 'quarter', 'year')
+
+# SQLite has no date_trunc: Django's Trunc* call back into Python for every row there.
+# These strftime() forms truncate in SQL and return the same 'YYYY-MM-DD HH:MM:SS' text
+# Django stores, so the DateTimeField converters still apply. Buckets are computed in UTC.
+_SQLITE_BUCKET_SQL = {
+    'day': ("strftime(%s, {expression})", ['%Y-%m-%d 00:00:00']),
+    # Back 6 days, then forward to the next Monday: the Monday of the ISO week
+    'week': ("strftime(%s, {expression}, '-6 days', 'weekday 1')", ['%Y-%m-%d 00:00:00']),
+    'month': ("strftime(%s, {expression})", ['%Y-%m-01 00:00:00']),
+    'quarter': ("printf(%s, strftime('%%Y', {expression}), (CAST(strftime('%%m', {expression}) AS INTEGER) - 1) / 3 * 3 + 1)",
+                ['%s-%02d-01 00:00:00']),
+    'year': ("strftime(%s, {expression})", ['%Y-01-01 00:00:00']),
+}
+
+
+class TruncBucket(Trunc):
+    """Trunc on a DateTimeField that runs natively on SQLite (see _SQLITE_BUCKET_SQL)."""
+
+    def __init__(self, expression, kind, **extra):
+        super().__init__(expression, kind, output_field=DateTimeField(), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        expression_sql, expression_params = compiler.compile(self.lhs)
+        template, format_params = _SQLITE_BUCKET_SQL[self.kind]
+        sql = template.format(expression=expression_sql)
+        # The expression appears once per {expression} placeholder, after the format argument
+        params = list(format_params) + list(expression_params) * template.count('{expression}')
+        return sql, params
+
+
+def aggregate_transactions(dataset_id, bucket='month', by_type=False, date_from=None, date_to=None, search=None):
+    """
+    Sums, counts and averages the amounts of a dataset's transactions per time bucket
+    (and per type) in a single GROUP BY query.
+
+    Args:
+        dataset_id (int): ID of the visualizer.models.Dataset.
+        bucket (str): One of BUCKETS.
+        by_type (bool): Also group by Transaction.type (one series per type).
+        date_from, date_to (datetime): Optional inclusive/exclusive posting date bounds;
+                                       they are answered from the (dataset, posting_date) index.
+        search (str): Optional description search (see visualizer.search.build_match_query);
+                      only matching transactions are aggregated.
+
+    Returns:
+        dict: Chart-ready arrays. 'labels' holds the ISO bucket start dates. Without by_type,
+        'sum', 'count' and 'avg' are aligned with labels; with by_type, 'series' holds one
+        {'type', 'sum', 'count', 'avg'} entry per type, with None for empty buckets.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'. Expected one of: {', '.join(BUCKETS)}.")
+
+    transactions = Transaction.objects.filter(dataset_id=dataset_id)
+    if date_from is not None:
+        transactions = transactions.filter(posting_date__gte=date_from)
+    if date_to is not None:
+        transactions = transactions.filter(posting_date__lt=date_to)
+    if search:
+        match = build_match_query(search)
+        if match is None:
+            raise ValueError("The search query has no searchable terms.")
+        transactions = transactions.filter(id__in=RawSQL(*match_subquery(match)))
+
+    group_fields = ['bucket', 'type'] if by_type else ['bucket']
+    rows = (transactions
+            .annotate(bucket=TruncBucket('posting_date', bucket))
+            .values(*group_fields)
+            .annotate(total=Sum('amount'), count=Count('id'), average=Avg('amount'))
+            .order_by(*group_fields))
+
+    labels = []
+    label_index = {}
+    series = {}
+    for row in rows:
+        if row['bucket'] is None:
+            continue # Transactions without a posting date
+        label = row['bucket'].date().isoformat()
+        if label not in label_index:
+            label_index[label] = len(labels)
+            labels.append(label)
+        series.setdefault(row['type'] if by_type else None, []).append((label_index[label], row))
+
+    def arrays(entries):
+        result = {'sum': [None] * len(labels), 'count': [0] * len(labels), 'avg': [None] * len(labels)}
+        for index, row in entries:
+            result['sum'][index] = round(float(row['total']), 2) if row['total'] is not None else None
+            result['count'][index] = row['count']
+            result['avg'][index] = round(float(row['average']), 2) if row['average'] is not None else None
+        return result
+
+    logger.debug(f"Debug in aggregate_transactions: Dataset {dataset_id}, {len(labels)} {bucket} buckets, {len(series)} series.")
+    if not by_type:
+        return {'bucket': bucket, 'labels': labels, **arrays(series.get(None, []))}
+    return {'bucket': bucket, 'labels': labels,
+            'series': [{'type': transaction_type, **arrays(entries)} for transaction_type, entries in series.items()]}
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class VisualizerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'visualizer'
+
+    def ready(self):
+        # Apply the SQLite performance profile (settings.SQLITE_PRAGMAS) to every new connection
+        from datavis_project.sqlite import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='datavis_sqlite_pragmas')
+        # Delete a dataset's stored columns and XLSX export with it
+        from . import signals # noqa: F401
@@ -1,15 +1,18 @@
 # In visualizer/chart_processors/bank_processor.py
 
 import logging
+import numpy as np
 # Import necessary helpers from the utils file
-from file_handlers.converters.utils import clean_and_parse_amount, clean_and_format_date, find_matching_header, find_numeric_header
+from file_handlers.converters.utils import find_matching_header, find_numeric_header, parse_amount_column, parse_date_column, format_date_days
+from file_handlers.dataset import Dataset
 
 logger = logging.getLogger(__name__)
 
 # This function will contain the bank chart data processing logic
-def process_bank_chart_data(data_list: list[dict], headers: list[str], selected_xaxis: str = None, selected_yaxis: str = None):
+def process_bank_chart_data(data_list: Dataset | list[dict], headers: list[str], selected_xaxis: str = None, selected_yaxis: str = None):
     """
     Processes data specifically for bank statement chart visualization.
+    data_list may be a columnar Dataset or a list of dictionaries (converted once to a Dataset).
     Returns: (chart_data_dict, error_message, label_col_name, amount_col_name, numeric_headers, label_headers)
     """
     logger.info("Using bank chart processor.")
@@ -96,44 +99,35 @@ def process_bank_chart_data(data_list: list[dict], headers: list[str], selected_
 
 
     # --- Extract and Clean Data using Determined Columns (Bank) ---
+    # Work on whole columns: the cleaners run once per distinct value, not once per row
+    dataset = Dataset.coerce(data_list, headers)
+    label_column = dataset.column(label_col_name)
+    amount_column = dataset.column(amount_col_name)
+
     extracted_labels = []
     extracted_amounts = []
 
-    for i, row_dict in enumerate(data_list):
-        if not isinstance(row_dict, dict):
-            if error_message is None: error_message = f"Data structure error: Expected list of dictionaries, found {type(row_dict)} in row {i+1}."
-            continue
+    if label_column is not None and amount_column is not None:
+        # For bank data, the Y-axis should be numeric, use the column-level amount parser
+        amount_values, amount_valid = amount_column.to_float_array(parse_amount_column)
 
-        raw_label_value = row_dict.get(label_col_name, None)
-        raw_amount_value = row_dict.get(amount_col_name, None)
+        raw_labels = label_column.map_values(lambda value: str(value) if value is not None else '')
 
         # For bank data, the X-axis is often a Date, so use the date cleaner if applicable
         if label_col_name and label_col_name.lower() in bank_label_names and 'date' in label_col_name.lower():
-            cleaned_label = clean_and_format_date(raw_label_value)
-             # Decide how to handle date parsing failure for bank - maybe skip the row or use raw string?
-            if cleaned_label is None:
-                logger.warning(f"Processing row {i+1} in bank processing: Date parsing failure for column '{label_col_name}'. Using raw value or skipping.")
-                 # Option 1: Skip the row if date is essential
-                 # continue
-                 # Option 2: Use raw string as label
-                cleaned_label = str(raw_label_value) if raw_label_value is not None else ''
-
-
+            label_days, label_is_date = label_column.to_day_array(parse_date_column)
+            cleaned_labels = format_date_days(label_days, label_is_date)
+            date_failures = ~label_is_date
+            if date_failures.any():
+                logger.warning(f"Bank processing: Date parsing failure for {int(date_failures.sum())} rows in column '{label_col_name}'. Using raw values.")
+            # Use the raw string as label where date parsing failed
+            cleaned_labels = np.where(date_failures, raw_labels, cleaned_labels)
         else: # If label is not a date or bank label, treat as generic string label
-            cleaned_label = str(raw_label_value) if raw_label_value is not None else ''
-
-
-        # For bank data, the Y-axis should be numeric, use the amount cleaner
-        cleaned_amount = clean_and_parse_amount(raw_amount_value)
+            cleaned_labels = raw_labels
 
-        # Only add if cleaned amount is valid
-        if cleaned_amount is not None:
-             # If date cleaning was required AND it succeeded, OR if date cleaning was not required
-            if not (label_col_name and label_col_name.lower() in bank_label_names and 'date' in label_col_name.lower() and cleaned_label is None):
-                extracted_labels.append(cleaned_label)
-                extracted_amounts.append(cleaned_amount)
-             # else: # Log if skipped due to date cleaning failure (handled above if skipping)
-                 # pass
+        # Only add rows where the cleaned amount is valid
+        extracted_labels = cleaned_labels[amount_valid].tolist()
+        extracted_amounts = amount_values[amount_valid].tolist()
 
 
     labels = extracted_labels
@@ -2,14 +2,16 @@
 
 import logging
 # Import necessary helpers from the utils file
-from file_handlers.converters.utils import clean_and_parse_amount, clean_and_format_date, find_matching_header, find_numeric_header
+from file_handlers.converters.utils import clean_and_format_date, find_matching_header, find_numeric_header, parse_amount_column
+from file_handlers.dataset import Dataset
 
 logger = logging.getLogger(__name__)
 
 # This function will contain the generic chart data processing logic
-def process_generic_chart_data(data_list: list[dict], headers: list[str], selected_xaxis: str = None, selected_yaxis: str = None):
+def process_generic_chart_data(data_list: Dataset | list[dict], headers: list[str], selected_xaxis: str = None, selected_yaxis: str = None):
     """
     Processes data for generic chart visualization.
+    data_list may be a columnar Dataset or a list of dictionaries (converted once to a Dataset).
     Returns: (chart_data_dict, error_message, label_col_name, amount_col_name, numeric_headers, label_headers)
     """
     logger.info("Using generic chart processor.")
@@ -70,31 +72,23 @@ def process_generic_chart_data(data_list: list[dict], headers: list[str], select
 
 
     # --- Extract and Clean Data using Determined Columns (Generic) ---
+    # Work on whole columns: the cleaners run once per distinct value, not once per row
+    dataset = Dataset.coerce(data_list, headers)
+    label_column = dataset.column(label_col_name)
+    amount_column = dataset.column(amount_col_name)
+
     extracted_labels = []
     extracted_amounts = []
 
-    for i, row_dict in enumerate(data_list):
-        if not isinstance(row_dict, dict):
-            if error_message is None: error_message = f"Data structure error: Expected list of dictionaries, found {type(row_dict)} in row {i+1}."
-            continue
-
-        raw_label_value = row_dict.get(label_col_name, None)
-        raw_amount_value = row_dict.get(amount_col_name, None)
-
-        cleaned_label = str(raw_label_value) if raw_label_value is not None else ''
+    if label_column is not None and amount_column is not None:
+        amount_values, amount_valid = amount_column.to_float_array(parse_amount_column)
+        cleaned_labels = label_column.map_values(lambda value: str(value) if value is not None else '')
         # Optional: Use clean_and_format_date here if the selected label column is likely a date
         # if label_col_name and label_col_name.lower() == 'date': # Basic check, could be more sophisticated
-        #     cleaned_label = clean_and_format_date(raw_label_value)
-        #     if cleaned_label is None:
-        #          # Decide how to handle date parsing failure in generic case
-        #          cleaned_label = str(raw_label_value) if raw_label_value is not None else '' # Fallback to string
-
-
-        cleaned_amount = clean_and_parse_amount(raw_amount_value)
+        #     cleaned_labels = label_column.map_values(clean_and_format_date)
 
-        if cleaned_amount is not None:
-            extracted_labels.append(cleaned_label)
-            extracted_amounts.append(cleaned_amount)
+        extracted_labels = cleaned_labels[amount_valid].tolist()
+        extracted_amounts = amount_values[amount_valid].tolist()
 
 
     labels = extracted_labels
@@ -2,14 +2,16 @@
 
 import logging
 # Import necessary helpers from the utils file
-from file_handlers.converters.utils import clean_and_parse_amount, clean_and_format_date, find_matching_header, find_numeric_header
+from file_handlers.converters.utils import find_matching_header, find_numeric_header, parse_amount_column, parse_date_column, format_date_days
+from file_handlers.dataset import Dataset
 
 logger = logging.getLogger(__name__)
 
 # This function will contain the stock chart data processing logic
-def process_stock_chart_data(data_list: list[dict], headers: list[str], selected_xaxis: str = None, selected_yaxis: str = None):
+def process_stock_chart_data(data_list: Dataset | list[dict], headers: list[str], selected_xaxis: str = None, selected_yaxis: str = None):
     """
     Processes data specifically for stock chart visualization.
+    data_list may be a columnar Dataset or a list of dictionaries (converted once to a Dataset).
     Returns: (chart_data_dict, error_message, label_col_name, amount_col_name, numeric_headers, label_headers)
     """
     logger.info("Using stock chart processor.")
@@ -88,40 +90,33 @@ def process_stock_chart_data(data_list: list[dict], headers: list[str], selected
 
 
     # --- Extract and Clean Data using Determined Columns (Stock) ---
+    # Work on whole columns: the cleaners run once per distinct value, not once per row
+    dataset = Dataset.coerce(data_list, headers)
+    label_column = dataset.column(label_col_name)
+    amount_column = dataset.column(amount_col_name)
+
     extracted_labels = []
     extracted_amounts = []
 
-    for i, row_dict in enumerate(data_list):
-        if not isinstance(row_dict, dict):
-            if error_message is None: error_message = f"Data structure error: Expected list of dictionaries, found {type(row_dict)} in row {i+1}."
-            continue
-
-        raw_label_value = row_dict.get(label_col_name, None)
-        raw_amount_value = row_dict.get(amount_col_name, None)
+    if label_column is not None and amount_column is not None:
+        # For stock data, the Y-axis should be numeric, use the column-level amount parser
+        amount_values, keep_rows = amount_column.to_float_array(parse_amount_column)
 
         # For stock data, the X-axis is often a Date, so use the date cleaner if applicable
         if label_col_name and label_col_name.lower() in stock_label_names and 'date' in label_col_name.lower():
-            cleaned_label = clean_and_format_date(raw_label_value)
-             # Decide how to handle date parsing failure for stock - maybe skip the row?
-            if cleaned_label is None:
-                logger.warning(f"Skipping row {i+1} in stock processing due to date parsing failure for column '{label_col_name}'. Raw Value='{raw_label_value}'")
-                continue # Skip row if date cannot be parsed as requested
-
+            label_days, label_is_date = label_column.to_day_array(parse_date_column)
+            cleaned_labels = format_date_days(label_days, label_is_date)
+            date_failures = ~label_is_date
+            if date_failures.any():
+                logger.warning(f"Skipping {int(date_failures.sum())} rows in stock processing due to date parsing failure for column '{label_col_name}'.")
+            # Skip rows if date cannot be parsed as requested
+            keep_rows &= ~date_failures
         else: # If label is not a date or stock label, treat as generic string label
-            cleaned_label = str(raw_label_value) if raw_label_value is not None else ''
-
-
-        # For stock data, the Y-axis should be numeric, use the amount cleaner
-        cleaned_amount = clean_and_parse_amount(raw_amount_value)
+            cleaned_labels = label_column.map_values(lambda value: str(value) if value is not None else '')
 
-        # Only add if both label (if date cleaning was required and succeeded) and cleaned amount are valid
-        if cleaned_amount is not None:
-             # If date cleaning was not required OR date cleaning was required and succeeded (cleaned_label is not None)
-            if not (label_col_name and label_col_name.lower() in stock_label_names and 'date' in label_col_name.lower()) or (cleaned_label is not None):
-                extracted_labels.append(cleaned_label)
-                extracted_amounts.append(cleaned_amount)
-            # else: # Log if skipped due to date cleaning failure (handled above)
-                # pass
+        # Only add rows where both label (if date cleaning was required) and cleaned amount are valid
+        extracted_labels = cleaned_labels[keep_rows].tolist()
+        extracted_amounts = amount_values[keep_rows].tolist()
 
 
     labels = extracted_labels
@@ -0,0 +1,137 @@
+# In visualizer/conversion.py
+
+import os
+import logging
+
+from django.conf import settings
+
+from file_handlers.converters.detect import sniff_upload
+from file_handlers.converters.registry import get_converter
+from file_handlers.dataset import Dataset
+from file_handlers.store import save_dataset, FILE_EXTENSION
+from file_handlers.parse_cache import CACHE_FORMAT_VERSION, ParseCache, hash_upload
+from .models import Dataset as DatasetRecord # Model row tying an upload to its stored columns
+from .ingest import ingest_transactions
+from .converter_pool import convert_in_pool
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+_parse_cache = None
+
+
+def get_parse_cache():
+    """Returns the process-wide ParseCache configured by PARSE_CACHE_DIR and PARSE_CACHE_MAX_BYTES."""
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = ParseCache(
+            getattr(settings, 'PARSE_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'parse_cache')),
+            max_bytes=getattr(settings, 'PARSE_CACHE_MAX_BYTES', 512 * 1024 * 1024),
+        )
+    return _parse_cache
+
+
+# Parsed datasets are written once per upload to MEDIA_ROOT/datasets/columns/<id>.dvcols
+# and tied to a visualizer.models.Dataset row. The session only holds that row's ID.
+def store_dataset(dataset, header_list, uploaded_filename, content_hash='', file_type=''):
+    """
+    Creates the Dataset model row for an upload and writes its columns to disk.
+    content_hash is the upload's hash_upload digest ('' if it was not computed) and
+    file_type the sniffed format the converter was chosen for.
+
+    Returns:
+        The saved visualizer.models.Dataset instance.
+    """
+    dataset_record = DatasetRecord.objects.create(name=uploaded_filename, header=header_list, row_count=len(dataset),
+                                                   content_hash=content_hash, file_type=file_type,
+                                                   parse_format_version=CACHE_FORMAT_VERSION)
+    relative_path = f"datasets/columns/{dataset_record.pk}{FILE_EXTENSION}"
+    save_dataset(dataset, os.path.join(settings.MEDIA_ROOT, relative_path))
+    dataset_record.columns_file.name = relative_path
+    dataset_record.save(update_fields=['columns_file'])
+    return dataset_record
+
+
+def convert_upload(uploaded_file, uploaded_filename, progress=None, content_hash=None):
+    """
+    Converts an uploaded file and stores the result: detects the format, runs the matching
+    converter (or reuses the parse cache), writes the columnar file and ingests bank rows
+    into the Transaction table. Used by upload_file_view and by background conversion jobs.
+
+    Args:
+        uploaded_file: Binary file object (an UploadedFile or a django.core.files.File).
+        uploaded_filename (str): Original file name; its extension is a format hint.
+        progress (callable): Optional progress(stage, rows) callback, called when the 'storing'
+                             and 'ingesting' stages start and after every ingested batch.
+        content_hash (str): hash_upload digest of the upload if it is already known; uploads
+                            received through visualizer.upload_handlers carry it as content_hash.
+                            Otherwise the upload is read once more to hash it.
+
+    Returns:
+        A tuple (dataset_record, header_list, error_message): the saved visualizer.models.Dataset
+        (None if nothing was stored), the converter's headers and an error message (None on success).
+    """
+    header_list = []
+    list_of_dicts = []
+    error_message = None
+    dataset_record = None
+    content_hash = content_hash or getattr(uploaded_file, 'content_hash', '')
+    file_type = ''
+
+    # --- Determine file type and call appropriate converter ---
+    base_name, extension_with_dot = os.path.splitext(uploaded_filename or '')
+    file_extension = str(extension_with_dot).lower()
+    logger.debug(f"Debug in convert_upload: File extension: {file_extension}")
+
+    try:
+        # --- Detect the format from the first bytes and call the matching converter ---
+        # The extension is only a hint; the registry is keyed by the sniffed format,
+        # so each upload is parsed exactly once.
+        file_type = sniff_upload(uploaded_file, file_extension)
+        converter = get_converter(file_type)
+
+        if converter is not None:
+            # An identical upload (same bytes, same format) reuses the cached conversion
+            parse_cache = get_parse_cache()
+            if not content_hash:
+                content_hash = hash_upload(uploaded_file)
+            cached = parse_cache.get(content_hash, file_type)
+            if cached is not None:
+                logger.debug(f"Debug in convert_upload: Using cached conversion of {file_type} upload.")
+                header_list, list_of_dicts = cached
+            else:
+                logger.debug(f"Debug in convert_upload: Handling {file_type}.")
+                # Large uploads on disk are parsed in the converter pool, the rest in this thread
+                converted = convert_in_pool(file_type, uploaded_file)
+                header_list, list_of_dicts, error_message = converted if converted is not None else converter(uploaded_file)
+                if list_of_dicts and not error_message:
+                    parse_cache.put(content_hash, file_type, header_list, Dataset.coerce(list_of_dicts, header_list))
+        else:
+            error_message = f"Unsupported file type: {file_extension}"
+            logger.debug(f"Debug in convert_upload: {error_message}")
+
+    except Exception as e:
+        logger.error(f"Error reading uploaded file: {e}", exc_info=True)
+        error_message = f"Error processing file: {e}"
+
+    # --- Store the standardized data on disk; the session only keeps the dataset ID ---
+    # Converters return a columnar Dataset, which is written once to a columnar file
+    # under MEDIA_ROOT. The views load just the columns and rows they display from it.
+    dataset = Dataset.coerce(list_of_dicts, header_list)
+    if dataset.columns:
+        try:
+            if progress is not None:
+                progress('storing', len(dataset))
+            dataset_record = store_dataset(dataset, header_list, uploaded_filename, content_hash, file_type)
+            # Bank statements (posting date + amount columns) are also written to the Transaction table
+            if progress is not None:
+                progress('ingesting', 0)
+            ingest_transactions(dataset_record, dataset,
+                                progress=(lambda rows: progress('ingesting', rows)) if progress is not None else None)
+        except Exception as e:
+            logger.error(f"Error storing converted dataset: {e}", exc_info=True)
+            error_message = error_message or f"Error storing converted data: {e}"
+
+    if not error_message:
+        logger.debug(f"Debug in convert_upload: Successfully converted {len(dataset)} rows and {len(header_list) if header_list else 0} headers.")
+    return dataset_record, header_list, error_message
@@ -0,0 +1,173 @@
+# In visualizer/converter_pool.py
+
+import os
+import uuid
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from file_handlers.converters import worker
+from file_handlers.dataset import current_row_progress
+from file_handlers.store import open_dataset, FILE_EXTENSION
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_DEPTH = 8
+DEFAULT_QUEUE_TIMEOUT = 60 # Seconds a conversion waits for a free queue slot
+DEFAULT_MIN_BYTES = 256 * 1024
+DEFAULT_START_METHOD = 'forkserver'
+PROGRESS_POLL_INTERVAL = 0.5 # Seconds between two reads of a worker's progress file
+WORKER_MODULE = 'file_handlers.converters.worker'
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def pool_workers():
+    """Number of converter processes (CONVERTER_POOL_WORKERS); 0 converts in the calling thread."""
+    return getattr(settings, 'CONVERTER_POOL_WORKERS', 0)
+
+
+def result_directory():
+    return getattr(settings, 'CONVERTER_POOL_RESULT_DIR', os.path.join(settings.MEDIA_ROOT, 'converter_results'))
+
+
+def get_converter_pool():
+    """
+    Returns the process-wide converter pool, creating it on first use. Each server process
+    has its own pool of CONVERTER_POOL_WORKERS processes.
+
+    Workers are started from a 'forkserver' process that imported the converter worker
+    module (pandas, numpy, openpyxl and the converters) once, so each new worker starts
+    with them loaded instead of importing them itself, and workers never inherit the
+    server's threads or database connections as a plain fork would.
+    At most CONVERTER_POOL_WORKERS conversions run at a time and CONVERTER_POOL_QUEUE_DEPTH
+    more wait in the pool's queue; further conversions wait for a slot (see convert_in_pool).
+    """
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            workers = pool_workers()
+            start_method = getattr(settings, 'CONVERTER_POOL_START_METHOD', DEFAULT_START_METHOD)
+            if start_method not in multiprocessing.get_all_start_methods():
+                start_method = 'spawn'
+            context = multiprocessing.get_context(start_method)
+            if start_method == 'forkserver':
+                context.set_forkserver_preload([WORKER_MODULE])
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=worker.warm_up)
+            _slots = threading.BoundedSemaphore(workers + getattr(settings, 'CONVERTER_POOL_QUEUE_DEPTH', DEFAULT_QUEUE_DEPTH))
+            logger.debug(f"Debug in get_converter_pool: Created a pool of {workers} '{start_method}' converter processes.")
+    return _pool
+
+
+def warm_converter_pool():
+    """
+    Starts every converter process of this server process now rather than on the first uploads
+    (called from datavis_project/wsgi.py when CONVERTER_POOL_WARM_UP is set). Does nothing if the
+    pool is disabled.
+    """
+    workers = pool_workers()
+    if workers <= 0:
+        return
+    pool = get_converter_pool()
+    # One no-op task per worker; the pool starts a new process for each task no idle worker picks up
+    pids = {future.result() for future in wait([pool.submit(worker.ping) for _ in range(workers)]).done}
+    logger.debug(f"Debug in warm_converter_pool: Converter processes {sorted(pids)} are ready.")
+
+
+def shutdown_converter_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _discard_broken_pool(pool):
+    # A worker died (e.g. killed for using too much memory): the next conversion starts a new pool
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _upload_path(uploaded_file):
+    """Returns the path of an upload stored on disk, or None if it only exists in memory."""
+    try:
+        if hasattr(uploaded_file, 'temporary_file_path'):
+            path = uploaded_file.temporary_file_path() # TemporaryUploadedFile
+        else:
+            path = getattr(uploaded_file, 'path', None) # FieldFile, e.g. a conversion job's saved upload
+        if path is None and os.path.isabs(str(getattr(uploaded_file, 'name', ''))):
+            path = uploaded_file.name # django.core.files.File around an open file
+    except (NotImplementedError, ValueError):
+        return None # Storage without local paths
+    return path if path and os.path.isfile(path) else None
+
+
+def _relay_progress(progress_path, last):
+    """Passes a worker's progress to the row progress callback of this thread (see report_row_progress)."""
+    callback = current_row_progress()
+    progress = worker.read_progress(progress_path)
+    if callback is not None and progress is not None and progress != last:
+        callback(*progress)
+    return progress or last
+
+
+def convert_in_pool(file_type, uploaded_file):
+    """
+    Converts an upload in the converter pool. Only uploads stored on disk of at least
+    CONVERTER_POOL_MIN_BYTES are sent to the pool: the worker opens the file by path, so
+    the upload is never copied between processes, and the result comes back as a columnar
+    file written by the worker (see file_handlers.converters.worker.convert_file).
+
+    Returns:
+        A tuple (header_list, Dataset, error_message) like a converter's, or None if the
+        upload should be converted in the calling thread (pool disabled, small or in-memory upload).
+    """
+    source_path = _upload_path(uploaded_file)
+    min_bytes = getattr(settings, 'CONVERTER_POOL_MIN_BYTES', DEFAULT_MIN_BYTES)
+    if pool_workers() <= 0 or source_path is None or os.path.getsize(source_path) < min_bytes:
+        return None
+
+    pool = get_converter_pool()
+    slots = _slots
+    if not slots.acquire(timeout=getattr(settings, 'CONVERTER_POOL_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT)):
+        logger.debug("Debug in convert_in_pool: All converter queue slots are taken.")
+        return [], [], "The server is busy converting other files. Please try again in a moment."
+
+    os.makedirs(result_directory(), exist_ok=True)
+    result_path = os.path.join(result_directory(), f"{uuid.uuid4().hex}{FILE_EXTENSION}")
+    progress_path = result_path + worker.PROGRESS_SUFFIX
+    try:
+        future = pool.submit(worker.convert_file, file_type, source_path, result_path)
+        last = None
+        while True:
+            try:
+                header_list, error_message = future.result(timeout=PROGRESS_POLL_INTERVAL)
+                break
+            except TimeoutError:
+                last = _relay_progress(progress_path, last)
+        if not os.path.exists(result_path):
+            return header_list, [], error_message
+        dataset = open_dataset(result_path).load()
+        logger.debug(f"Debug in convert_in_pool: Loaded {len(dataset)} rows converted by the pool.")
+        return header_list, dataset, error_message
+    except BrokenProcessPool as e:
+        logger.error(f"Converter process stopped unexpectedly: {e}", exc_info=True)
+        _discard_broken_pool(pool)
+        return [], [], "Error processing file: the converter process stopped unexpectedly."
+    finally:
+        slots.release()
+        for path in (result_path, progress_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
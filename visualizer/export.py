@@ -0,0 +1,176 @@
+# In visualizer/export.py
+
+import os
+import logging
+import datetime
+import tempfile
+
+import xlsxwriter # Used for saving XLSX
+from django.conf import settings
+
+from file_handlers.converters.utils import parse_amount_column, parse_date_column
+from file_handlers.dataset import DATE, EPOCH_DATE, FLOAT, INTEGER
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Bump when the exported workbook changes, so files written by older code are regenerated
+EXPORT_FORMAT_VERSION = 2
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+EXCEL_MAX_ROWS = 1048576 # Rows per worksheet, including the header row
+EXPORT_CHUNK_ROWS = 16384 # Rows read from the columnar store at a time
+# Excel stores dates as days since 1899-12-30
+EXCEL_DATE_OFFSET = (EPOCH_DATE - datetime.date(1899, 12, 30)).days
+# Headers (lowercase) whose cells are written as dates / amounts, even when they were stored as text
+DATE_HEADER_NAMES = ('date', 'posting date', 'transaction date')
+AMOUNT_HEADER_NAMES = ('amount', 'balance', 'credit', 'debit')
+DATE_FORMAT = 'yyyy-mm-dd'
+AMOUNT_FORMAT = '#,##0.00'
+
+
+def export_directory():
+    return getattr(settings, 'XLSX_EXPORT_DIR', os.path.join(settings.MEDIA_ROOT, 'exports'))
+
+
+def export_key(dataset_record):
+    """
+    Cache key of a dataset's XLSX export: the dataset's content_key (upload hash, format and
+    converter output version), so datasets converted from identical files share one export.
+    """
+    return f"{dataset_record.content_key()}-v{EXPORT_FORMAT_VERSION}"
+
+
+def export_path(dataset_record):
+    return os.path.join(export_directory(), f"{export_key(dataset_record)}.xlsx")
+
+
+def download_filename(dataset_record):
+    """The name offered to the browser, e.g. 'statement_converted.xlsx' for 'statement.csv'."""
+    filename_base = os.path.splitext(dataset_record.name or f"dataset_{dataset_record.pk}")[0].replace(' ', '_')
+    return f"{filename_base}_converted.xlsx"
+
+
+def _cell_values(column):
+    """
+    Returns (cells, kind) for one chunk of a column: a list with one value per row
+    (None for missing cells) and 'date', 'amount' or None for the number format.
+    Numbers are floats/ints (date serials for dates); text that did not parse stays a str.
+    """
+    name = column.name.strip().lower() if isinstance(column.name, str) else ''
+    if column.kind == DATE:
+        numbers, valid, kind = column.values + EXCEL_DATE_OFFSET, column.valid, 'date'
+    elif column.kind in (INTEGER, FLOAT):
+        numbers, valid, kind = column.values, column.valid, 'amount' if name in AMOUNT_HEADER_NAMES else None
+    elif name in DATE_HEADER_NAMES:
+        days, valid = column.to_day_array(parse_date_column)
+        numbers, kind = days + EXCEL_DATE_OFFSET, 'date'
+    elif name in AMOUNT_HEADER_NAMES:
+        (numbers, valid), kind = column.to_float_array(parse_amount_column), 'amount'
+    else:
+        return column.to_list(), None
+
+    if column.kind in (DATE, INTEGER, FLOAT):
+        return [number if ok else None for number, ok in zip(numbers.tolist(), valid.tolist())], kind
+    # Text columns keep the cells that are not dates/amounts as they were
+    return [number if ok else text for text, number, ok in zip(column.to_list(), numbers.tolist(), valid.tolist())], kind
+
+
+def write_xlsx(stored, path, rows_per_sheet=EXCEL_MAX_ROWS - 1):
+    """
+    Streams a stored dataset into an XLSX file with xlsxwriter in constant_memory mode:
+    rows are read EXPORT_CHUNK_ROWS at a time and each row is flushed to disk as soon as
+    the next one starts, so memory does not grow with the dataset. Datasets longer than
+    rows_per_sheet continue on Sheet2, Sheet3, ..., each with the header row.
+
+    Args:
+        stored (file_handlers.store.StoredDataset): The dataset to export.
+        path (str): Output file.
+        rows_per_sheet (int): Data rows per worksheet (Excel allows 1,048,576 rows including the header).
+
+    Returns:
+        int: Number of worksheets written.
+    """
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True,
+                                          'tmpdir': os.path.dirname(path) or None})
+    header_format = workbook.add_format({'bold': True})
+    number_formats = {'date': workbook.add_format({'num_format': DATE_FORMAT}),
+                      'amount': workbook.add_format({'num_format': AMOUNT_FORMAT}), None: None}
+    headers = [name for name in stored.headers if name in stored.columns]
+    worksheet = None
+    sheet_count = 0
+    sheet_row = rows_per_sheet + 1
+
+    def add_sheet(kinds):
+        sheet = workbook.add_worksheet(f"Sheet{sheet_count + 1}")
+        for col, header in enumerate(headers):
+            sheet.write_string(0, col, str(header), header_format)
+            if kinds[col] == 'date':
+                sheet.set_column(col, col, 12)
+        return sheet
+
+    for chunk in stored.iter_chunks(EXPORT_CHUNK_ROWS, columns=headers):
+        cells, kinds = zip(*(_cell_values(chunk.column(header)) for header in headers))
+        formats = [number_formats[kind] for kind in kinds]
+        for values in zip(*cells):
+            if sheet_row > rows_per_sheet:
+                worksheet = add_sheet(kinds)
+                sheet_count += 1
+                sheet_row = 1
+            for col, value in enumerate(values):
+                if value is None or value == '':
+                    continue # Blank cell
+                if type(value) is str:
+                    worksheet.write_string(sheet_row, col, value)
+                else:
+                    worksheet.write_number(sheet_row, col, value, formats[col])
+            sheet_row += 1
+
+    if worksheet is None: # No rows: a sheet with just the header
+        add_sheet([None] * len(headers))
+        sheet_count = 1
+    workbook.close()
+    return sheet_count
+
+
+def get_xlsx_export(dataset_record):
+    """
+    Returns the path of the dataset's XLSX export, writing it from the stored columns on
+    the first request (see write_xlsx). The file is written under a temporary name and
+    renamed into place, so concurrent requests never serve a partial workbook.
+
+    Returns:
+        str: Path of the XLSX file, or None if the dataset has no stored columns.
+    """
+    path = export_path(dataset_record)
+    if os.path.exists(path):
+        logger.debug(f"Debug in get_xlsx_export: Serving cached export {os.path.basename(path)}.")
+        return path
+
+    stored = dataset_record.open_columns()
+    if stored is None:
+        return None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(suffix='.xlsx.tmp', dir=os.path.dirname(path))
+    os.close(descriptor)
+    try:
+        sheet_count = write_xlsx(stored, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    logger.debug(f"Debug in get_xlsx_export: Wrote {len(stored)} rows on {sheet_count} sheets to {path}.")
+    return path
+
+
+def delete_xlsx_export(dataset_record):
+    """Deletes a dataset's export unless another dataset (same content_key) still uses it."""
+    if dataset_record.shares_content():
+        return
+    try:
+        os.remove(export_path(dataset_record))
+        logger.debug(f"Debug in delete_xlsx_export: Deleted the export of dataset {dataset_record.pk}.")
+    except FileNotFoundError:
+        pass
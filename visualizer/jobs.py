@@ -0,0 +1,167 @@
+# In visualizer/jobs.py
+
+import os
+import time
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from file_handlers.dataset import report_row_progress
+from .conversion import convert_upload
+from .models import ConversionJob
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+PROGRESS_WRITE_INTERVAL = 0.5 # Seconds between two progress writes of a running job
+# A running job whose progress has not changed for this long is reported as failed
+# (e.g. the process running it was restarted)
+DEFAULT_STALE_SECONDS = 300
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Returns the process-wide pool running conversion jobs (CONVERSION_JOB_WORKERS threads)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'CONVERSION_JOB_WORKERS', DEFAULT_WORKERS),
+                                           thread_name_prefix='conversion-job')
+    return _executor
+
+
+def submit_conversion(uploaded_file):
+    """
+    Saves an upload under MEDIA_ROOT/jobs/uploads/ (the request's temporary file does not
+    outlive the request), creates its ConversionJob and queues it.
+
+    Returns:
+        The queued visualizer.models.ConversionJob.
+    """
+    job = ConversionJob(original_name=uploaded_file.name, bytes_total=uploaded_file.size or 0,
+                        content_hash=getattr(uploaded_file, 'content_hash', ''))
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    job.upload.save(f"{job.id}{extension}", uploaded_file, save=False)
+    job.save()
+    get_executor().submit(run_conversion_job, job.pk)
+    logger.debug(f"Debug in submit_conversion: Queued job {job.pk} for {uploaded_file.name} ({job.bytes_total} bytes).")
+    return job
+
+
+class _JobProgress(threading.Thread):
+    """
+    Records a running job's progress. The converter and ingest callbacks only update
+    counters in memory; this thread writes them to the job row every PROGRESS_WRITE_INTERVAL
+    seconds, which also serves as the job's heartbeat during long parsing steps.
+    Bytes consumed are read from the upload's file descriptor offset, which works whatever
+    library the converter hands the file to (a converter pool worker reports its own offset).
+    """
+
+    def __init__(self, job_id, upload_file):
+        super().__init__(name=f"conversion-job-progress-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.upload_file = upload_file
+        self.stage_name = 'converting'
+        self.rows_processed = 0
+        self.rows_total = 0
+        self.pool_bytes_read = None
+        self.finished = threading.Event()
+
+    def rows_read(self, rows, bytes_read=None):
+        # Called by Dataset.from_rows/from_records while the converter runs, or with the
+        # bytes read as well when the upload is converted in the converter pool
+        self.rows_processed = rows
+        if bytes_read is not None:
+            self.pool_bytes_read = bytes_read
+
+    def stage(self, stage, rows):
+        # Called by convert_upload: 'storing' (rows = total rows), then 'ingesting' (rows written)
+        if stage == 'storing':
+            self.rows_total = rows
+        self.stage_name = stage
+        self.rows_processed = rows
+
+    def _bytes_read(self):
+        if self.pool_bytes_read is not None:
+            return self.pool_bytes_read
+        try:
+            return os.lseek(self.upload_file.fileno(), 0, os.SEEK_CUR)
+        except (AttributeError, OSError, ValueError):
+            return 0
+
+    def run(self):
+        try:
+            while not self.finished.wait(PROGRESS_WRITE_INTERVAL):
+                converting = self.stage_name == 'converting'
+                ConversionJob.objects.filter(pk=self.job_id).update(
+                    stage=self.stage_name, rows_processed=self.rows_processed, rows_total=self.rows_total,
+                    bytes_read=self._bytes_read() if converting else F('bytes_total'), updated_at=timezone.now())
+        except Exception as e:
+            logger.error(f"Error writing progress of conversion job {self.job_id}: {e}", exc_info=True)
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+
+def run_conversion_job(job_id):
+    """Runs one queued job in a pool thread: converts and stores the upload, then records the outcome."""
+    try:
+        job = ConversionJob.objects.get(pk=job_id)
+        ConversionJob.objects.filter(pk=job_id).update(status=ConversionJob.RUNNING, stage='converting', updated_at=timezone.now())
+        started = time.perf_counter()
+        dataset_record = None
+        try:
+            with job.upload.open('rb') as upload_file:
+                progress = _JobProgress(job_id, upload_file)
+                progress.start()
+                try:
+                    with report_row_progress(progress.rows_read):
+                        dataset_record, _, error_message = convert_upload(upload_file, job.original_name, progress=progress.stage,
+                                                                         content_hash=job.content_hash)
+                finally:
+                    progress.stop()
+        except Exception as e:
+            logger.error(f"Error running conversion job {job_id}: {e}", exc_info=True)
+            error_message = f"Error processing file: {e}"
+
+        # A stored dataset is a success even if a later step (e.g. ingest) reported an error
+        status = ConversionJob.SUCCEEDED if dataset_record is not None else ConversionJob.FAILED
+        job.upload.delete(save=False)
+        ConversionJob.objects.filter(pk=job_id).update(
+            status=status, stage='', upload='', dataset=dataset_record, error=error_message or '',
+            rows_processed=F('rows_total'), bytes_read=F('bytes_total'), updated_at=timezone.now())
+        logger.debug(f"Debug in run_conversion_job: Job {job_id} {status} in {time.perf_counter() - started:.2f}s.")
+    except Exception as e:
+        logger.error(f"Error finishing conversion job {job_id}: {e}", exc_info=True)
+    finally:
+        # Pool threads are reused: release this thread's database connections
+        connections.close_all()
+
+
+def expire_if_stale(job):
+    """
+    Marks a running job that stopped reporting progress as failed. Returns the (updated) job.
+    Running jobs write their progress every PROGRESS_WRITE_INTERVAL seconds, so the time since
+    updated_at is the time since their last progress update. Queued jobs are never expired:
+    they may wait for a free worker for any length of time.
+    """
+    stale_after = getattr(settings, 'CONVERSION_JOB_STALE_SECONDS', DEFAULT_STALE_SECONDS)
+    if job.status != ConversionJob.RUNNING or job.updated_at > timezone.now() - datetime.timedelta(seconds=stale_after):
+        return job
+    job.status = ConversionJob.FAILED
+    job.error = "The conversion was interrupted. Please upload the file again."
+    job.save(update_fields=['status', 'error', 'updated_at'])
+    logger.debug(f"Debug in expire_if_stale: Job {job.pk} had no progress for {stale_after}s.")
+    return job
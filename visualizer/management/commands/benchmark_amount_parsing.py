@@ -0,0 +1,66 @@
+# In visualizer/management/commands/benchmark_amount_parsing.py
+
+import time
+import logging
+import statistics
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from file_handlers.converters.utils import clean_and_parse_amount, parse_amount_column
+
+
+def _amount_strings(rows, spelling, seed=0):
+    """Synthetic amount cells as bank exports write them."""
+    amounts = np.round(np.random.default_rng(seed).normal(0, 5000, rows), 2).tolist()
+    if spelling == 'plain':
+        return [f"{amount:.2f}" for amount in amounts]
+    if spelling == 'currency':
+        return [f"${amount:,.2f}" for amount in amounts]
+    if spelling == 'accounting':
+        return [f"(£{-amount:,.2f})" if amount < 0 else f"£{amount:,.2f}" for amount in amounts]
+    # 'comma': decimal comma with space thousands separators
+    return [f"{amount:,.2f}".replace(',', ' ').replace('.', ',') for amount in amounts]
+
+
+def _scalar(values, decimal_separator):
+    """The per-cell loop parse_amount_column replaces (with the same normalization for ',' locales)."""
+    if decimal_separator == ',':
+        values = [value.replace('.', '').replace(' ', '').replace(',', '.') for value in values]
+    return [clean_and_parse_amount(value) for value in values]
+
+
+def _timed(func, repeat):
+    """Returns (result of the last call, median seconds)."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return result, statistics.median(times)
+
+
+class Command(BaseCommand):
+    help = ("Compares parse_amount_column with calling clean_and_parse_amount on every cell, "
+            "on synthetic amount columns in several spellings, and checks that both agree.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Cells per column.")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (the median is reported).")
+
+    def handle(self, *args, **options):
+        # Debug logging (one line per scalar call) would dominate the timings
+        logging.disable(logging.CRITICAL)
+        try:
+            for spelling in ('plain', 'currency', 'accounting', 'comma'):
+                values = _amount_strings(options['rows'], spelling)
+                decimal_separator = ',' if spelling == 'comma' else '.'
+                (amounts, valid), column_seconds = _timed(lambda: parse_amount_column(values, decimal_separator=decimal_separator), options['repeat'])
+                expected, scalar_seconds = _timed(lambda: _scalar(values, decimal_separator), options['repeat'])
+                expected = np.array([np.nan if amount is None else amount for amount in expected])
+                agree = np.array_equal(amounts, expected, equal_nan=True) and valid.all()
+                self.stdout.write(f"{spelling:10s} ({values[0]!r}): column {column_seconds * 1000:7.1f} ms, "
+                                  f"per cell {scalar_seconds * 1000:7.1f} ms, {scalar_seconds / column_seconds:4.1f}x"
+                                  f"{'' if agree else ', RESULTS DIFFER'}")
+        finally:
+            logging.disable(logging.NOTSET)
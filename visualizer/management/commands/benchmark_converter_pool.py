@@ -0,0 +1,82 @@
+# In visualizer/management/commands/benchmark_converter_pool.py
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from file_handlers.converters.detect import sniff_upload
+from file_handlers.converters.registry import get_converter
+from visualizer import converter_pool
+from .benchmark_sqlite_concurrency import _bank_csv
+
+
+def _convert(path, inline):
+    """Converts one upload the way convert_upload does (without storing it). Returns the row count."""
+    with open(path, 'rb') as f:
+        upload = File(f, name=path)
+        file_type = sniff_upload(upload, '.csv')
+        if inline:
+            _, dataset, error_message = get_converter(file_type)(upload)
+        else:
+            _, dataset, error_message = converter_pool.convert_in_pool(file_type, upload)
+    if error_message:
+        raise RuntimeError(error_message)
+    return len(dataset)
+
+
+class Command(BaseCommand):
+    help = ("Measures upload conversion throughput (uploads/sec) with N uploads converted at the same time, "
+            "in the calling threads and with converter pools of increasing size.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=16, help="Number of uploads converted concurrently.")
+        parser.add_argument('--rows', type=int, default=50000, help="Rows per uploaded bank statement (CSV).")
+        parser.add_argument('--workers', type=int, nargs='+', default=None,
+                            help="Pool sizes to measure (default: 1, 2, 4, ... up to the CPU count).")
+
+    def handle(self, *args, **options):
+        cpu_count = os.cpu_count() or 1
+        pool_sizes = options['workers'] or sorted({min(2 ** i, cpu_count) for i in range(cpu_count.bit_length() + 1)})
+        upload_count = options['uploads']
+        scratch = tempfile.mkdtemp(prefix='datavis_bench_')
+        # Per-row debug logging would dominate the timings
+        logging.disable(logging.CRITICAL)
+        try:
+            paths = []
+            for i in range(upload_count):
+                paths.append(os.path.join(scratch, f"statement_{i}.csv"))
+                with open(paths[-1], 'wb') as f:
+                    f.write(_bank_csv(options['rows'], seed=i))
+            self.stdout.write(f"{upload_count} uploads of {options['rows']} rows ({os.path.getsize(paths[0]) / 1e6:.1f} MB each), {cpu_count} CPUs")
+
+            baseline = self.run_round(paths, inline=True)
+            self.stdout.write(f"  calling threads:   {upload_count / baseline:6.2f} uploads/sec ({baseline:.2f}s)")
+            for workers in pool_sizes:
+                with override_settings(CONVERTER_POOL_WORKERS=workers, CONVERTER_POOL_MIN_BYTES=0,
+                                       CONVERTER_POOL_QUEUE_DEPTH=upload_count,
+                                       CONVERTER_POOL_RESULT_DIR=os.path.join(scratch, 'results')):
+                    converter_pool.shutdown_converter_pool()
+                    converter_pool.warm_converter_pool() # Startup is not part of the measurement
+                    try:
+                        seconds = self.run_round(paths, inline=False)
+                    finally:
+                        converter_pool.shutdown_converter_pool()
+                self.stdout.write(f"  pool of {workers:2d} workers: {upload_count / seconds:6.2f} uploads/sec ({seconds:.2f}s, "
+                                  f"{baseline / seconds:.2f}x)")
+        finally:
+            logging.disable(logging.NOTSET)
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def run_round(self, paths, inline):
+        # One thread per upload, like concurrent requests or conversion jobs
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(paths)) as threads:
+            list(threads.map(lambda path: _convert(path, inline), paths))
+        return time.perf_counter() - started
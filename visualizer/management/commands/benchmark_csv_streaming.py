@@ -0,0 +1,93 @@
+# In visualizer/management/commands/benchmark_csv_streaming.py
+
+import os
+import time
+import shutil
+import logging
+import resource
+import tempfile
+import multiprocessing
+
+from django.core.files import File
+from django.core.files.uploadedfile import UploadedFile
+from django.core.management.base import BaseCommand, CommandError
+
+from file_handlers.converters.csv import csv_chunks_to_list_of_dicts, stream_csv_rows
+from file_handlers.converters.utils import iter_decoded_lines
+
+BLOCK_ROWS = 100_000 # Rows generated at a time while writing an input file
+
+
+def _write_csv(path, size_mb):
+    """Writes a bank statement CSV of about size_mb megabytes, one block of rows at a time."""
+    # Imported here: it loads the models, which the measuring processes (no django.setup()) cannot
+    from .benchmark_sqlite_concurrency import _bank_csv
+    with open(path, 'wb') as f:
+        seed = 0
+        while f.tell() < size_mb * 1_000_000:
+            block = _bank_csv(BLOCK_ROWS, seed)
+            f.write(block if seed == 0 else block.split(b'\n', 1)[1]) # One header row
+            seed += 1
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # Kilobytes on Linux
+
+
+def _measure(path, chunk_size, mode, results):
+    """
+    Runs in a fresh process (so its peak RSS belongs to this input alone): reads the file
+    through File.chunks() like an upload and sends (rows, seconds, RSS before, peak RSS) back.
+    """
+    logging.disable(logging.CRITICAL) # Per-row debug logging would dominate the timings
+    rss_before = _peak_rss_mb()
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        chunks = File(f).chunks(chunk_size)
+        if mode == 'stream':
+            # Rows as the upload path sees them, consumed one by one
+            _, rows, error_message = stream_csv_rows(iter_decoded_lines(chunks))
+            row_count = sum(1 for _ in rows)
+        else:
+            # The whole converter, which keeps every row in the columnar Dataset it returns
+            _, dataset, error_message = csv_chunks_to_list_of_dicts(chunks)
+            row_count = len(dataset)
+    if error_message:
+        raise RuntimeError(error_message)
+    results.put((row_count, time.perf_counter() - started, rss_before, _peak_rss_mb()))
+
+
+class Command(BaseCommand):
+    help = ("Reads CSV files of increasing size through the streaming upload path (incremental decoder and "
+            "csv.reader over File.chunks()) and reports the peak RSS of each run, measured in its own process.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help="Input sizes in MB.")
+        parser.add_argument('--chunk-size', type=int, default=UploadedFile.DEFAULT_CHUNK_SIZE,
+                            help="Bytes per chunk (Django's upload chunk size by default).")
+        parser.add_argument('--convert', action='store_true',
+                            help="Also run the whole converter, whose Dataset grows with the row count.")
+
+    def handle(self, *args, **options):
+        scratch = tempfile.mkdtemp(prefix='datavis_bench_')
+        # A new interpreter per run: a forked child would start from this process's peak RSS
+        context = multiprocessing.get_context('spawn')
+        modes = ['stream', 'convert'] if options['convert'] else ['stream']
+        try:
+            for size_mb in options['sizes']:
+                path = os.path.join(scratch, f"statement_{size_mb}mb.csv")
+                _write_csv(path, size_mb)
+                for mode in modes:
+                    results = context.Queue()
+                    process = context.Process(target=_measure, args=(path, options['chunk_size'], mode, results))
+                    process.start()
+                    process.join()
+                    if process.exitcode != 0:
+                        raise CommandError(f"Measuring {mode} on {size_mb} MB failed (exit code {process.exitcode}).")
+                    row_count, seconds, rss_before, peak_rss = results.get()
+                    self.stdout.write(f"{os.path.getsize(path) / 1e6:7.0f} MB, {mode:7s}: {row_count} rows in {seconds:6.1f}s "
+                                      f"({os.path.getsize(path) / 1e6 / seconds:5.1f} MB/s), peak RSS {peak_rss:6.1f} MB "
+                                      f"({peak_rss - rss_before:+6.1f} MB over the process before reading)")
+                os.remove(path)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
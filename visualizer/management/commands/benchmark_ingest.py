@@ -0,0 +1,41 @@
+# In visualizer/management/commands/benchmark_ingest.py
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from file_handlers.dataset import Column, Dataset, DATE, FLOAT, STRING
+from visualizer.ingest import ingest_transactions
+from visualizer.models import Dataset as DatasetRecord
+
+
+class Command(BaseCommand):
+    help = "Measures Transaction ingest throughput (rows/sec) on synthetic bank rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Number of synthetic bank rows to ingest.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Rows per executemany INSERT batch (default: TRANSACTION_INGEST_BATCH_SIZE).")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark dataset and its transactions.")
+
+    def handle(self, *args, **options):
+        row_count = options['rows']
+        rng = np.random.default_rng(0)
+        all_valid = np.ones(row_count, dtype=bool)
+        # Same columns as the SpreadsheetML bank converter produces
+        dataset = Dataset(['Posting date', 'Description', 'Type', 'Amount', 'Reconcile'], {
+            'Posting date': Column('Posting date', DATE, rng.integers(19000, 20000, row_count), all_valid),
+            'Description': Column('Description', STRING, rng.integers(0, 1000, row_count).astype(np.int32), all_valid,
+                                  [f"Payee {i}" for i in range(1000)]),
+            'Type': Column('Type', STRING, rng.integers(0, 3, row_count).astype(np.int32), all_valid, ['DEBIT', 'CREDIT', 'CHECK']),
+            'Amount': Column('Amount', FLOAT, np.round(rng.normal(0, 500, row_count), 2), all_valid),
+            'Reconcile': Column('Reconcile', STRING, np.zeros(row_count, dtype=np.int32), all_valid, ['']),
+        })
+
+        dataset_record = DatasetRecord.objects.create(name=f"benchmark_ingest ({row_count} rows)")
+        try:
+            rows_written, seconds = ingest_transactions(dataset_record, dataset, batch_size=options['batch_size'])
+        finally:
+            if not options['keep']:
+                dataset_record.delete()
+
+        rate = rows_written / seconds if seconds else 0
+        self.stdout.write(f"Ingested {rows_written} transactions in {seconds:.2f}s ({rate:,.0f} rows/sec).")
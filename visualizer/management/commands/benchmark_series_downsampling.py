@@ -0,0 +1,62 @@
+# In visualizer/management/commands/benchmark_series_downsampling.py
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from file_handlers.store import open_dataset, save_dataset
+from visualizer.series import DEFAULT_MAX_POINTS, DOWNSAMPLE_METHODS, MS_PER_DAY, downsample_rows
+from .benchmark_series_formats import _statement
+
+
+class Command(BaseCommand):
+    help = ("Measures the time of a chart zoom step (series API with x_min/x_max/max_points) on synthetic "
+            "datasets of increasing size, from the whole range down to a few days, for each downsampling method.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000],
+                            help="Dataset sizes to measure.")
+        parser.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS, help="Points per zoom step.")
+        parser.add_argument('--shuffle', action='store_true', help="Store the rows out of date order.")
+
+    def handle(self, *args, **options):
+        scratch = tempfile.mkdtemp(prefix='datavis_bench_')
+        # Debug logging would dominate the timings
+        logging.disable(logging.CRITICAL)
+        try:
+            for rows in options['rows']:
+                dataset = _statement(rows)
+                if options['shuffle']:
+                    order = np.random.default_rng(1).permutation(rows)
+                    for column in dataset.columns.values():
+                        column.values, column.valid = column.values[order], column.valid[order]
+                path = os.path.join(scratch, f"statement_{rows}.dvcols")
+                save_dataset(dataset, path)
+                stored = open_dataset(path)
+                dates = stored.column_array('Date')[0]
+                first, last = int(dates.min()) * MS_PER_DAY, int(dates.max()) * MS_PER_DAY
+
+                started = time.perf_counter()
+                downsample_rows(stored, 'Date', ['Amount'], max_points=options['max_points'])
+                self.stdout.write(f"{rows} points: sort order and extremes built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+                for method in DOWNSAMPLE_METHODS:
+                    steps = []
+                    # Zoom in 4x per step, centered, down to a viewport of a few days
+                    for step in range(8):
+                        half_width = (last - first) / 2 / 4 ** step
+                        center = (first + last) / 2
+                        started = time.perf_counter()
+                        selected, total = downsample_rows(stored, 'Date', ['Amount'], x_min=center - half_width, x_max=center + half_width,
+                                                          max_points=options['max_points'], method=method)
+                        steps.append((total, len(selected), time.perf_counter() - started))
+                    self.stdout.write(f"  {method}: " + ", ".join(f"{total} -> {kept} in {seconds * 1000:.1f} ms" for total, kept, seconds in steps))
+                    self.stdout.write(f"  {method}: slowest step {max(seconds for _, _, seconds in steps) * 1000:.1f} ms")
+        finally:
+            logging.disable(logging.NOTSET)
+            shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,144 @@
+# In visualizer/management/commands/benchmark_series_formats.py
+
+import os
+import json
+import gzip
+import time
+import shutil
+import logging
+import tempfile
+import statistics
+import subprocess
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from file_handlers.dataset import Column, Dataset, DATE, FLOAT
+from file_handlers.store import open_dataset, save_dataset
+from visualizer.series import GZIP_LEVEL, build_series, encode_series_arrow, encode_series_binary
+
+CHART_LOGIC_JS = os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'js', 'chart_logic.js')
+
+# Decodes the payloads in V8 (the engine of Chrome and Node.js) with the decoder of chart_logic.js.
+# The JSON payload is decoded the way chart_only.html does: JSON.parse, then the values into a Float64Array.
+NODE_DECODE_SCRIPT = """
+const fs = require('fs');
+const vm = require('vm');
+const [chartLogicPath, jsonPath, binaryPath, repeat] = process.argv.slice(1);
+const context = vm.createContext({ window: {}, console: { log() {}, warn() {}, error() {} }, TextDecoder, performance });
+vm.runInContext(fs.readFileSync(chartLogicPath, 'utf8'), context);
+
+function median(run) {
+    const times = [];
+    for (let i = 0; i < Number(repeat); i++) {
+        const started = performance.now();
+        run();
+        times.push(performance.now() - started);
+    }
+    return times.sort((a, b) => a - b)[Math.floor(times.length / 2)];
+}
+
+const jsonText = fs.readFileSync(jsonPath, 'utf8');
+const binary = fs.readFileSync(binaryPath);
+const buffer = binary.buffer.slice(binary.byteOffset, binary.byteOffset + binary.byteLength);
+console.log(JSON.stringify({
+    json: median(() => {
+        const series = JSON.parse(jsonText);
+        series.y.forEach(column => Float64Array.from(column.values, value => value === null ? NaN : value));
+    }),
+    binary: median(() => { context.buffer = buffer.slice(0); vm.runInContext('decodeSeries(buffer)', context); }),
+}));
+"""
+
+
+def _statement(rows, seed=0):
+    """A synthetic bank statement: one row per day with a float amount, a few missing."""
+    rng = np.random.default_rng(seed)
+    amounts = np.round(rng.normal(0, 250, rows), 2)
+    amounts_valid = rng.random(rows) > 0.001
+    return Dataset(['Date', 'Amount'], {
+        'Date': Column('Date', DATE, np.arange(rows, dtype=np.int64) % 20000 + 7305, np.ones(rows, dtype=bool)),
+        'Amount': Column('Amount', FLOAT, np.where(amounts_valid, amounts, np.nan), amounts_valid),
+    })
+
+
+def _timed(func, repeat):
+    """Returns (result of the last call, median seconds)."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return result, statistics.median(times)
+
+
+class Command(BaseCommand):
+    help = ("Compares the chart series formats (JSON, binary, Arrow IPC) on a synthetic dataset: "
+            "encode time, bytes on the wire and decode time, in Python and, when Node.js is "
+            "installed, in V8 with the decoder of chart_logic.js.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000],
+                            help="Dataset sizes to measure.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement (the median is reported).")
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        node = shutil.which('node')
+        scratch = tempfile.mkdtemp(prefix='datavis_bench_')
+        # Debug logging would dominate the timings
+        logging.disable(logging.CRITICAL)
+        try:
+            for rows in options['rows']:
+                path = os.path.join(scratch, f"statement_{rows}.dvcols")
+                save_dataset(_statement(rows), path)
+                stored = open_dataset(path)
+                self.stdout.write(f"{rows} points (Date, Amount):")
+
+                body, encode_seconds = _timed(lambda: json.dumps(build_series(stored, 'Date', ['Amount']), separators=(',', ':')).encode('utf-8'), repeat)
+                compressed, gzip_seconds = _timed(lambda: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), repeat)
+                _, decode_seconds = _timed(lambda: json.loads(body), repeat)
+                self.report('json', encode_seconds, len(body), decode_seconds, f", {len(compressed) / 1e6:.2f} MB gzipped in {gzip_seconds * 1000:.0f} ms")
+                json_path = os.path.join(scratch, 'series.json')
+                with open(json_path, 'wb') as f:
+                    f.write(body)
+
+                # Joined, as the server copies every chunk once to send it
+                binary, encode_seconds = _timed(lambda: b''.join(encode_series_binary(stored, 'Date', ['Amount'])), repeat)
+                _, decode_seconds = _timed(lambda: self.decode_binary(binary), repeat)
+                self.report('binary', encode_seconds, len(binary), decode_seconds)
+                binary_path = os.path.join(scratch, 'series.bin')
+                with open(binary_path, 'wb') as f:
+                    f.write(binary)
+
+                try:
+                    import pyarrow as pa
+                    stream, encode_seconds = _timed(lambda: encode_series_arrow(stored, 'Date', ['Amount']), repeat)
+                    _, decode_seconds = _timed(lambda: pa.ipc.open_stream(stream).read_all(), repeat)
+                    self.report('arrow', encode_seconds, stream.size, decode_seconds)
+                except ImportError:
+                    self.stdout.write("  arrow:  skipped (pyarrow is not installed)")
+
+                if node:
+                    result = subprocess.run([node, '-e', NODE_DECODE_SCRIPT, os.path.abspath(CHART_LOGIC_JS), json_path, binary_path, str(repeat)],
+                                            capture_output=True, text=True, check=True)
+                    timings = json.loads(result.stdout)
+                    self.stdout.write(f"  V8 decode: json {timings['json']:.1f} ms, binary {timings['binary']:.1f} ms "
+                                      f"({timings['json'] / max(timings['binary'], 1e-3):.0f}x)")
+                else:
+                    self.stdout.write("  V8 decode: skipped (Node.js is not installed)")
+        finally:
+            logging.disable(logging.NOTSET)
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def decode_binary(self, body):
+        # What a Python client does with the binary format: read the header, view the buffers
+        header_length = int.from_bytes(body[4:8], 'little')
+        header = json.loads(body[8:8 + header_length])
+        data_start = 8 + header_length
+        return [np.frombuffer(body, dtype=column['values']['dtype'], count=header['length'], offset=data_start + column['values']['offset'])
+                for column in [header['x'], *header['y']]]
+
+    def report(self, name, encode_seconds, size, decode_seconds, extra=''):
+        self.stdout.write(f"  {name + ':':7s} encode {encode_seconds * 1000:7.1f} ms, {size / 1e6:6.2f} MB, "
+                          f"Python decode {decode_seconds * 1000:7.1f} ms{extra}")
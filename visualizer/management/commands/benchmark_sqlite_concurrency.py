@@ -0,0 +1,169 @@
+# In visualizer/management/commands/benchmark_sqlite_concurrency.py
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+import multiprocessing
+
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test import Client, override_settings
+
+from visualizer import conversion
+
+
+def _bank_csv(row_count, seed):
+    """Returns a bank statement CSV (Date, Description, Type, Amount) with distinct content per seed."""
+    rng = np.random.default_rng(seed)
+    days = np.datetime64('2022-01-01') + rng.integers(0, 1000, row_count)
+    amounts = np.round(rng.normal(0, 500, row_count), 2)
+    lines = ["Date,Description,Type,Amount"]
+    lines += [f"{day},Payee {payee},{kind},{amount}" for day, payee, kind, amount in
+              zip(days.astype(str), rng.integers(0, 500, row_count), rng.choice(['DEBIT', 'CREDIT'], row_count), amounts)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+class _SQLTimer:
+    """execute_wrapper measuring time inside SQL statements (including lock waits) and counting lock errors."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.locked = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as e:
+            if 'locked' in str(e):
+                self.locked += 1
+            raise
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def _timed(latencies, request):
+    started = time.perf_counter()
+    try:
+        request()
+    except OperationalError:
+        pass # Counted by _SQLTimer; the views catch most of these themselves
+    latencies.append(time.perf_counter() - started)
+
+
+def _uploader(index, row_count, results):
+    """Worker process: uploads one bank statement."""
+    client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+    data = _bank_csv(row_count, seed=index + 1)
+    latencies = []
+    timer = _SQLTimer()
+    with connection.execute_wrapper(timer):
+        _timed(latencies, lambda: client.post('/', {'xml_file': SimpleUploadedFile(f'statement_{index}.csv', data)}))
+    connection.close()
+    results.put(('upload', latencies, timer.seconds, timer.locked))
+
+
+def _reader(session_cookie, dataset_id, uploads_done, results):
+    """Worker process: reads the seeded dataset (aggregation API and chart page) until the uploads finish."""
+    client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+    client.cookies[settings.SESSION_COOKIE_NAME] = session_cookie
+    latencies = []
+    timer = _SQLTimer()
+    with connection.execute_wrapper(timer):
+        while not uploads_done.is_set():
+            _timed(latencies, lambda: client.get(f'/api/datasets/{dataset_id}/aggregate/?bucket=month'))
+            _timed(latencies, lambda: client.get('/chart'))
+    connection.close()
+    results.put(('read', latencies, timer.seconds, timer.locked))
+
+
+class Command(BaseCommand):
+    help = ("Runs N parallel uploads and M concurrent readers (one process each) against a scratch SQLite "
+            "database, once with SQLite defaults and once with settings.SQLITE_PRAGMAS, and reports lock waits.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=8, help="Number of parallel upload processes.")
+        parser.add_argument('--readers', type=int, default=4, help="Number of processes reading while the uploads run.")
+        parser.add_argument('--rows', type=int, default=20000, help="Rows per uploaded bank statement.")
+
+    def handle(self, *args, **options):
+        profiles = [('SQLite defaults', {}), ('SQLITE_PRAGMAS', dict(getattr(settings, 'SQLITE_PRAGMAS', {})))]
+        database_settings = connections.settings['default']
+        original_name = database_settings['NAME']
+
+        # Per-request debug logging would dominate the timings, and the views log every lock error
+        logging.disable(logging.CRITICAL)
+        try:
+            for label, pragmas in profiles:
+                scratch = tempfile.mkdtemp(prefix='datavis_bench_')
+                scratch_settings = override_settings(
+                    MEDIA_ROOT=os.path.join(scratch, 'media'),
+                    PARSE_CACHE_DIR=os.path.join(scratch, 'parse_cache'),
+                    SQLITE_PRAGMAS=pragmas,
+                    CONVERSION_JOBS_ENABLED=False, # Each upload process converts within its request
+                    CONVERTER_POOL_WORKERS=0, # ... in its own thread; this measures the database, not parsing
+                )
+                try:
+                    connections.close_all()
+                    # Every connection wrapper shares this settings dict, so new connections open the scratch file
+                    database_settings['NAME'] = os.path.join(scratch, 'db.sqlite3')
+                    conversion._parse_cache = None
+                    with scratch_settings:
+                        call_command('migrate', verbosity=0)
+                        self.report(label, self.run_round(options['uploads'], options['readers'], options['rows']))
+                finally:
+                    connections.close_all()
+                    shutil.rmtree(scratch, ignore_errors=True)
+        finally:
+            database_settings['NAME'] = original_name
+            conversion._parse_cache = None
+            logging.disable(logging.NOTSET)
+
+    def run_round(self, upload_count, reader_count, row_count):
+        # One dataset the readers can query while the uploads write
+        reader_setup = Client(HTTP_HOST='localhost')
+        reader_setup.post('/', {'xml_file': SimpleUploadedFile('seed.csv', _bank_csv(row_count, seed=0))})
+        dataset_id = reader_setup.session['dataset_id']
+        session_cookie = reader_setup.cookies[settings.SESSION_COOKIE_NAME].value
+        connections.close_all() # Forked workers must open their own connections
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        uploads_done = context.Event()
+        readers = [context.Process(target=_reader, args=(session_cookie, dataset_id, uploads_done, results)) for _ in range(reader_count)]
+        uploaders = [context.Process(target=_uploader, args=(i, row_count, results)) for i in range(upload_count)]
+
+        started = time.perf_counter()
+        for process in readers + uploaders:
+            process.start()
+        stats = {'upload': [], 'read': [], 'sql_upload': 0.0, 'sql_read': 0.0, 'locked': 0}
+        uploads_finished = 0
+        for _ in range(upload_count + reader_count):
+            kind, latencies, sql_seconds, locked = results.get()
+            stats[kind].extend(latencies)
+            stats[f'sql_{kind}'] += sql_seconds
+            stats['locked'] += locked
+            if kind == 'upload':
+                uploads_finished += 1
+                if uploads_finished == upload_count:
+                    stats['wall'] = time.perf_counter() - started
+                    uploads_done.set()
+        for process in readers + uploaders:
+            process.join()
+        return stats
+
+    def report(self, label, stats):
+        def summary(latencies):
+            if not latencies:
+                return "no requests"
+            values = np.array(latencies) * 1000
+            return f"{len(values)} requests, median {np.median(values):.0f} ms, p95 {np.percentile(values, 95):.0f} ms, max {values.max():.0f} ms"
+        self.stdout.write(f"{label}: uploads finished in {stats['wall']:.1f}s, 'database is locked' errors: {stats['locked']}")
+        self.stdout.write(f"  uploads: {summary(stats['upload'])}; {stats['sql_upload']:.1f}s in SQL")
+        self.stdout.write(f"  reads:   {summary(stats['read'])}; {stats['sql_read']:.1f}s in SQL")
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visualizer', '0004_remove_dataset_temp_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='columns_file',
+            field=models.FileField(blank=True, upload_to='datasets/columns/'),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='header',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='row_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Full-text index over Transaction.description (SQLite FTS5)
+# The DDL is written out here, not imported from visualizer.search, so the migration
+# keeps creating the same schema whatever the application code becomes.
+
+from django.db import migrations
+
+FTS_TABLE = 'visualizer_transaction_fts'
+
+
+def create_index(apps, schema_editor):
+    """Creates FTS_TABLE and its sync triggers, and indexes the existing transactions."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    table = apps.get_model('visualizer', 'Transaction')._meta.db_table
+    # prefix='2 3' adds prefix indexes so short prefix queries don't scan the whole term list
+    schema_editor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                          f"description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+    schema_editor.execute(f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+                          f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END")
+    schema_editor.execute(f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF description ON {table} BEGIN "
+                          f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; "
+                          f"INSERT INTO {FTS_TABLE}(rowid, description) "
+                          f"SELECT new.id, new.description WHERE new.description IS NOT NULL; END")
+    schema_editor.execute(f"DELETE FROM {FTS_TABLE}")
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE}(rowid, description) SELECT id, description FROM {table} "
+                          f"WHERE description IS NOT NULL")
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad")
+    schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visualizer', '0006_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,17 +1,103 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User  # If you plan to implement user accounts
 
+from file_handlers.store import open_dataset
+
 class Dataset(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)  # Link to user if you have accounts
     name = models.CharField(max_length=255, blank=True, null=True, help_text="Optional name for the dataset")
     uploaded_file = models.FileField(upload_to='datasets/')  # Store the uploaded file
     upload_date = models.DateTimeField(auto_now_add=True)
+    # Parsed data in the columnar format of file_handlers.store, written once per upload
+    columns_file = models.FileField(upload_to='datasets/columns/', blank=True)
+    header = models.JSONField(default=list, blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    # BLAKE2b digest of the uploaded bytes (file_handlers.parse_cache.hash_upload); keys the XLSX export cache
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    # Sniffed upload format and file_handlers.parse_cache.CACHE_FORMAT_VERSION of the converter output;
+    # with content_hash they identify the stored columns (see content_key)
+    file_type = models.CharField(max_length=32, blank=True, default='')
+    parse_format_version = models.PositiveIntegerField(default=0)
         # Temporary field - remove after migrations
     #temp_field = models.BooleanField(default=False)
 
     def __str__(self):
         return f"Dataset object ({self.id})"
 
+    def content_key(self):
+        """
+        Key of the files derived from the stored columns (XLSX export, chart series): datasets
+        converted from identical uploads, as the same format and by the same converter output
+        version, share them. Datasets stored without a content hash use their ID.
+        """
+        if not self.content_hash:
+            return f"dataset-{self.pk}"
+        return f"{self.content_hash}-{self.file_type or 'unknown'}-p{self.parse_format_version}"
+
+    def shares_content(self):
+        """Whether another dataset has the same content_key, and so still uses the derived files."""
+        return bool(self.content_hash) and Dataset.objects.filter(
+            content_hash=self.content_hash, file_type=self.file_type, parse_format_version=self.parse_format_version,
+        ).exclude(pk=self.pk).exists()
+
+    def open_columns(self):
+        """Opens the stored columnar file (a file_handlers.store.StoredDataset), or returns None if there is none."""
+        if not self.columns_file:
+            return None
+        return open_dataset(self.columns_file.path)
+
+class ConversionJob(models.Model):
+    """
+    An upload converted in the background (see visualizer/jobs.py). Progress is written by
+    the worker thread and read by the status and event stream views.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+    FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+    # Random ID: it is the only credential needed to follow a job and claim its dataset
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    stage = models.CharField(max_length=32, blank=True, help_text="converting, storing or ingesting while running")
+    upload = models.FileField(upload_to='jobs/uploads/', blank=True) # Removed once the job has finished
+    original_name = models.CharField(max_length=255, blank=True)
+    bytes_total = models.BigIntegerField(default=0)
+    # hash_upload digest computed while the upload was received (visualizer.upload_handlers), '' if unknown
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    bytes_read = models.BigIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_total = models.PositiveIntegerField(default=0) # Known once the conversion has finished
+    dataset = models.ForeignKey(Dataset, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"ConversionJob {self.id} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    def progress(self):
+        """Returns the job state as a JSON-serializable dictionary."""
+        return {
+            'job_id': str(self.id),
+            'status': self.status,
+            'stage': self.stage,
+            'bytes_read': self.bytes_read,
+            'bytes_total': self.bytes_total,
+            'rows_processed': self.rows_processed,
+            'rows_total': self.rows_total,
+            'dataset_id': self.dataset_id,
+            'error': self.error or None,
+        }
+
 class Transaction(models.Model):
     dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='transactions')
     posting_date = models.DateTimeField(null=True, blank=True)
@@ -20,6 +106,13 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     reconcile = models.CharField(max_length=255, null=True, blank=True)
 
+    class Meta:
+        # Per-dataset queries filter by date range or by transaction type
+        indexes = [
+            models.Index(fields=['dataset', 'posting_date'], name='transaction_dataset_date_idx'),
+            models.Index(fields=['dataset', 'type'], name='transaction_dataset_type_idx'),
+        ]
+
     def __str__(self):
         return self.name if self.name else f"Dataset uploaded on {self.upload_date}"
 
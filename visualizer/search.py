@@ -0,0 +1,109 @@
+# In visualizer/search.py
+
+import re
+import logging
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.expressions import RawSQL
+
+from .models import Transaction
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# FTS5 table over Transaction.description (created in migration 0007); its rowid is
+# Transaction.id. Rows are indexed by ingest_transactions, one INSERT ... SELECT per batch
+# (a per-row insert trigger costs about two thirds of the ingest throughput); triggers keep
+# it in sync when transactions are updated or deleted (e.g. when their dataset is deleted).
+# It keeps its own copy of the text rather than an external-content table, which corrupts
+# its index when asked to delete a row it never indexed.
+FTS_TABLE = 'visualizer_transaction_fts'
+DEFAULT_SEARCH_LIMIT = 1000
+
+# "quoted phrase" or a bare term
+_QUERY_TOKEN = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+def build_match_query(query):
+    """
+    Converts user search text into an FTS5 MATCH expression.
+
+    Quoted text is matched as a phrase; bare terms are prefix matches (a trailing * is
+    optional), so 'amaz "direct debit"' finds 'Amazon ... DIRECT DEBIT'. Every term must
+    match. User text is always quoted, so FTS5 operators and punctuation are matched
+    literally instead of raising syntax errors.
+
+    Returns:
+        str: The MATCH expression, or None if the query has no terms.
+    """
+    terms = []
+    for phrase, bare in _QUERY_TOKEN.findall(query or ''):
+        text = (phrase if phrase else bare.rstrip('*')).strip()
+        if not text or not re.search(r'\w', text):
+            continue
+        quoted = '"' + text.replace('"', '""') + '"'
+        terms.append(quoted if phrase else quoted + '*')
+    return ' '.join(terms) if terms else None
+
+
+def fts_available(connection):
+    return connection.vendor == 'sqlite'
+
+
+def last_transaction_id(cursor):
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {Transaction._meta.db_table}")
+    return cursor.fetchone()[0]
+
+
+def index_new_transactions(cursor, dataset_id, after_id):
+    """
+    Adds the descriptions of a dataset's transactions with id > after_id to the index.
+    Called by ingest_transactions inside each batch's database transaction, so one
+    INSERT ... SELECT indexes the whole batch (a range scan on the rowid).
+    """
+    table = Transaction._meta.db_table
+    cursor.execute(f"INSERT INTO {FTS_TABLE}(rowid, description) SELECT id, description FROM {table} "
+                   f"WHERE id > %s AND dataset_id = %s AND description IS NOT NULL", [after_id, dataset_id])
+
+
+def match_subquery(match):
+    """
+    Returns (sql, params) selecting the ids of all transactions matching an FTS5 expression,
+    for use in Transaction.objects.filter(id__in=RawSQL(sql, params)).
+    """
+    return f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+
+
+def search_transactions(dataset_id, query, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Finds a dataset's transactions whose description matches query (see build_match_query).
+
+    Args:
+        dataset_id (int): ID of the visualizer.models.Dataset.
+        query (str): User search text.
+        limit (int): Maximum number of IDs returned; count always covers every match.
+
+    Returns:
+        dict: 'match' (the FTS5 expression), 'count' and 'ids' (ascending Transaction IDs).
+
+    Raises:
+        ValueError: If the query has no searchable terms.
+    """
+    match = build_match_query(query)
+    if match is None:
+        raise ValueError("The search query has no searchable terms.")
+
+    matches = Transaction.objects.filter(dataset_id=dataset_id)
+    if fts_available(connections[DEFAULT_DB_ALIAS]):
+        # IN (subquery) runs the MATCH once; as a JOIN, SQLite may probe the index once per dataset row instead
+        matches = matches.filter(id__in=RawSQL(*match_subquery(match)))
+    else:
+        # No FTS5 outside SQLite: fall back to a substring scan
+        for phrase, bare in _QUERY_TOKEN.findall(query):
+            matches = matches.filter(description__icontains=phrase or bare.rstrip('*'))
+
+    ids = list(matches.order_by('id').values_list('id', flat=True)[:limit])
+    count = len(ids) if len(ids) < limit else matches.count()
+
+    logger.debug(f"Debug in search_transactions: '{match}' matched {count} transactions of dataset {dataset_id}.")
+    return {'match': match, 'count': count, 'ids': ids}
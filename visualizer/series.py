@@ -0,0 +1,511 @@
+# In visualizer/series.py
+
+import os
+import json
+import gzip
+import bisect
+import shutil
+import struct
+import hashlib
+import logging
+import tempfile
+
+import numpy as np
+from django.conf import settings
+
+from file_handlers.converters.utils import parse_amount_column
+from file_handlers.dataset import Column, DATE, FLOAT, INTEGER, STRING
+from .table import sort_directory, sort_permutation
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Bump when the payload changes, so series written by older code are regenerated
+SERIES_FORMAT_VERSION = 1
+MS_PER_DAY = 86400000
+GZIP_LEVEL = 6
+
+SERIES_FORMATS = ('json', 'binary', 'arrow')
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'binary': 'application/octet-stream',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+BINARY_MAGIC = b'DVSR'
+BINARY_ALIGNMENT = 8 # Float64Array and BigInt64Array views must start at a multiple of 8 bytes
+_BINARY_PREFIX = struct.Struct('<4sI') # Magic, length of the JSON header
+_BINARY_DTYPES = {'<f8': 'float64', '<i8': 'int64', '<i4': 'int32', '|b1': 'uint8'}
+
+DEFAULT_MAX_POINTS = 2000
+MAX_POINTS_LIMIT = 20000
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+LTTB_CANDIDATES_PER_POINT = 4 # Min/max pairs kept per output point before LTTB picks one
+PYRAMID_BLOCK_ROWS = 16
+PYRAMID_FANOUT = 8
+
+
+def series_directory():
+    return getattr(settings, 'SERIES_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'series'))
+
+
+def _dataset_key(dataset_record):
+    # Datasets converted from identical files share their series (as they share XLSX exports)
+    return dataset_record.content_key()
+
+
+def series_etag(dataset_record, x, y_columns, series_format='json', window=None):
+    """
+    Strong ETag of a series: a digest of the dataset's content hash, the requested columns,
+    the format (see SERIES_FORMATS), the downsampling parameters (window, see downsample_rows)
+    and SERIES_FORMAT_VERSION. It is known without reading the dataset, so conditional
+    requests are answered before any work is done.
+    """
+    key = json.dumps([_dataset_key(dataset_record), x, list(y_columns), series_format, window, SERIES_FORMAT_VERSION])
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def series_path(dataset_record, x, y_columns):
+    return os.path.join(series_directory(), _dataset_key(dataset_record), f"{series_etag(dataset_record, x, y_columns)}.json.gz")
+
+
+def _number_list(values, valid):
+    """Plain Python numbers with None for missing and non-finite values."""
+    if values.dtype.kind == 'f':
+        valid = valid & np.isfinite(values)
+    if valid.all():
+        return values.tolist()
+    return [value if ok else None for value, ok in zip(values.tolist(), valid.tolist())]
+
+
+def _series_column(column, numeric):
+    """
+    Encodes one column: numbers as numbers, dates as epoch milliseconds. Text columns are
+    parsed as amounts when a numeric series is needed (y), otherwise sent dictionary-encoded
+    as 'categories' plus one 'codes' entry per row (-1 where missing).
+    """
+    encoded = {'name': column.name, 'kind': column.kind}
+    if column.kind == DATE:
+        encoded['unit'] = 'ms'
+        encoded['values'] = _number_list(column.values * MS_PER_DAY, column.valid)
+    elif column.kind in (INTEGER, FLOAT):
+        encoded['values'] = _number_list(column.values, column.valid)
+    elif numeric:
+        values, valid = column.to_float_array(parse_amount_column)
+        encoded['kind'] = FLOAT
+        encoded['values'] = _number_list(values, valid)
+    else:
+        encoded['categories'] = column.categories
+        encoded['codes'] = np.where(column.valid, column.values, -1).tolist()
+    return encoded
+
+
+def build_series(stored, x, y_columns, rows=None):
+    """
+    Builds the chart payload of the x column and the y columns as typed columnar arrays.
+
+    Args:
+        stored (file_handlers.store.StoredDataset): The dataset.
+        x (str): Column on the x axis.
+        y_columns (list): Columns plotted against it.
+        rows (np.ndarray): Only these rows, in this order (see downsample_rows). None sends every row.
+
+    Returns:
+        dict: 'length', 'x' and 'y' (a list), each column encoded by _series_column.
+
+    Raises:
+        ValueError: If a column does not exist.
+    """
+    _check_columns(stored, x, y_columns)
+    columns = list(dict.fromkeys([x, *y_columns]))
+    dataset = stored.load(columns=columns) if rows is None else stored.take(rows, columns=columns)
+    return {
+        'length': len(dataset),
+        'x': _series_column(dataset.column(x), numeric=False),
+        'y': [_series_column(dataset.column(name), numeric=True) for name in y_columns],
+    }
+
+
+def _binary_column(stored, name, numeric, rows=None):
+    """
+    Returns (description, values, valid) of one column for the binary and Arrow formats.
+    Numeric and date columns are the stored arrays themselves (memory-mapped, not copied)
+    unless only some rows are sent; dates stay int64 days since 1970-01-01 ('unit': 'day').
+    Text columns are parsed as amounts when numeric (a new float64 array), otherwise sent
+    as their int32 codes with the dictionary in the description.
+    """
+    if rows is None:
+        values, valid = stored.column_array(name)
+    else:
+        column = stored.take(rows, columns=[name]).column(name)
+        values, valid = column.values, column.valid
+    description = {'name': name, 'kind': stored.columns[name]['kind']}
+    if description['kind'] == DATE:
+        description['unit'] = 'day'
+    elif description['kind'] == STRING:
+        # take() keeps only the strings the rows use
+        categories = stored.column_categories(name) if rows is None else column.categories
+        if numeric:
+            values, valid = Column(name, STRING, values, valid, categories).to_float_array(parse_amount_column)
+            values = values.astype('<f8', copy=False)
+            description['kind'] = FLOAT
+        else:
+            description['categories'] = categories
+    return description, values, valid
+
+
+def _check_columns(stored, x, y_columns):
+    unknown = [name for name in [x, *y_columns] if name not in stored.columns]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}.")
+
+
+def encode_series_binary(stored, x, y_columns, dataset_id=None, rows=None, window=None):
+    """
+    Encodes a series in the binary format read by chart_logic.js (loadSeries): BINARY_MAGIC,
+    the uint32 length of a JSON header padded to BINARY_ALIGNMENT, then the little-endian
+    column buffers, each starting at a multiple of BINARY_ALIGNMENT so the client views them
+    as typed arrays without copying.
+    The header has 'dataset', 'length', 'x' and 'y' like the JSON series. Each column has
+    'values', and 'valid' (a uint8 mask, only when some rows are missing): the 'dtype',
+    'offset' (from the first buffer) and 'size' of a buffer.
+    rows and window are those of a downsampled series (see downsample_rows); window is
+    added to the header.
+
+    Returns:
+        list: The body as chunks: the header, then memoryviews of the column arrays.
+
+    Raises:
+        ValueError: If a column does not exist.
+    """
+    _check_columns(stored, x, y_columns)
+    buffers = []
+    offset = 0
+
+    def add_buffer(array):
+        nonlocal offset
+        padding = -offset % BINARY_ALIGNMENT
+        if padding:
+            buffers.append(bytes(padding))
+        offset += padding
+        buffers.append(memoryview(np.ascontiguousarray(array)).cast('B'))
+        entry = {'dtype': _BINARY_DTYPES[array.dtype.str], 'offset': offset, 'size': array.nbytes}
+        offset += array.nbytes
+        return entry
+
+    def add_column(name, numeric):
+        description, values, valid = _binary_column(stored, name, numeric, rows)
+        description['values'] = add_buffer(values)
+        if not valid.all():
+            description['valid'] = add_buffer(valid)
+        return description
+
+    header = {'dataset': dataset_id, 'length': stored.length if rows is None else len(rows),
+              'x': add_column(x, numeric=False), 'y': [add_column(name, numeric=True) for name in y_columns]}
+    if window is not None:
+        header['window'] = window
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-(_BINARY_PREFIX.size + len(header)) % BINARY_ALIGNMENT)
+    return [_BINARY_PREFIX.pack(BINARY_MAGIC, len(header)) + header, *buffers]
+
+
+def encode_series_arrow(stored, x, y_columns, rows=None, window=None):
+    """
+    Encodes a series as an Arrow IPC stream of one record batch, the x column first.
+    Columns keep their stored types (int64, float64, date32 and dictionary-encoded strings),
+    and missing values become nulls. rows and window are those of a downsampled series
+    (see downsample_rows); window is stored as JSON in the schema metadata.
+    pyarrow is optional and imported here, so only this format needs it.
+
+    Returns:
+        pyarrow.Buffer: The stream (supports the buffer protocol).
+
+    Raises:
+        ValueError: If a column does not exist.
+        ImportError: If pyarrow is not installed.
+    """
+    import pyarrow as pa
+
+    _check_columns(stored, x, y_columns)
+    arrays = []
+    for name, numeric in [(x, False), *((name, True) for name in y_columns)]:
+        description, values, valid = _binary_column(stored, name, numeric, rows)
+        mask = None if valid.all() else ~valid
+        if description['kind'] == DATE:
+            array = pa.array(values.view('datetime64[D]'), mask=mask)
+        elif 'categories' in description:
+            array = pa.DictionaryArray.from_arrays(pa.array(values, mask=mask), pa.array(description['categories'], type=pa.string()))
+        else:
+            array = pa.array(values, mask=mask)
+        arrays.append(array)
+
+    # Repeated names (e.g. the x column also plotted on y) are allowed in Arrow schemas
+    batch = pa.RecordBatch.from_arrays(arrays, names=[x, *y_columns])
+    if window is not None:
+        batch = batch.replace_schema_metadata({'window': json.dumps(window)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
+
+
+# --- Downsampling ---
+# A viewport is the rows whose x is within [x_min, x_max], in x order (the column's saved sort
+# order, see table.sort_permutation; a text x keeps the row order). When it has more rows than
+# the chart can show, each y column keeps candidates from the minimum and maximum of buckets of
+# rows, then one point per bucket chosen by Largest-Triangle-Three-Buckets (MinMaxLTTB).
+# So that the cost follows the number of points returned rather than the viewport, the min/max
+# positions of blocks of PYRAMID_BLOCK_ROWS rows, PYRAMID_FANOUT times more per level, are
+# computed once per (x, y) pair and saved next to the sort orders (<id>.sort/extremes-*.npy).
+# A wide viewport reads the block extremes of the finest level with enough blocks instead of its rows.
+def _sorted_positions(positions):
+    """Sorted distinct positions (np.unique hashes integer arrays, which is several times slower here)."""
+    positions = np.sort(positions)
+    return positions[np.concatenate(([True], positions[1:] != positions[:-1]))] if len(positions) else positions
+
+
+def _minmax_positions(y, buckets):
+    """
+    Positions of the minimum and the maximum of y in each of `buckets` buckets of equal row
+    count, sorted. y is padded with its last value to a multiple of the bucket width and
+    reshaped, so every bucket is reduced in one vectorized call.
+    """
+    width = -(-len(y) // buckets)
+    padded = np.pad(y, (0, width * buckets - len(y)), mode='edge').reshape(buckets, width)
+    starts = np.arange(buckets) * width
+    positions = np.concatenate((starts + padded.argmin(axis=1), starts + padded.argmax(axis=1)))
+    return _sorted_positions(np.minimum(positions, len(y) - 1))
+
+
+def _lttb_positions(x, y, points):
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013): keeps the first and last point and,
+    in each of points - 2 buckets of equal count, the point forming the largest triangle
+    with the point kept in the previous bucket and the average of the next bucket.
+    Called on min/max candidates, so the loop only sees a few candidates per bucket.
+    """
+    count = len(x)
+    if points < 3 or count <= points:
+        return np.arange(count)
+    edges = np.linspace(1, count - 1, points - 1).astype(np.int64) # Bucket i is edges[i]:edges[i + 1]
+    sizes = np.diff(edges)
+    next_x = np.append((np.add.reduceat(x[:count - 1], edges[:-1]) / sizes)[1:], x[-1]).tolist()
+    next_y = np.append((np.add.reduceat(y[:count - 1], edges[:-1]) / sizes)[1:], y[-1]).tolist()
+    xs, ys = x.tolist(), y.tolist()
+
+    selected = [0]
+    previous_x, previous_y = xs[0], ys[0]
+    for bucket, (start, stop) in enumerate(zip(edges[:-1].tolist(), edges[1:].tolist())):
+        average_x, average_y = next_x[bucket], next_y[bucket]
+        best, best_area = start, -1.0
+        for i in range(start, stop):
+            area = abs((previous_x - average_x) * (ys[i] - previous_y) - (previous_x - xs[i]) * (average_y - previous_y))
+            if area > best_area:
+                best, best_area = i, area
+        selected.append(best)
+        previous_x, previous_y = xs[best], ys[best]
+    selected.append(count - 1)
+    return np.array(selected, dtype=np.int64)
+
+
+def _numeric_values(stored, name, rows):
+    """(float64 values, valid mask) of a y column at the given rows; text is parsed as amounts."""
+    values, valid = stored.column_array(name)
+    values, valid = values[rows], valid[rows]
+    if stored.columns[name]['kind'] == STRING:
+        return Column(name, STRING, values, valid, stored.column_categories(name)).to_float_array(parse_amount_column)
+    values = values.astype(np.float64)
+    return values, valid & np.isfinite(values)
+
+
+def _x_order(stored, x):
+    """(row order, rows with an x value) of a viewport's x column; text columns keep the row order."""
+    if stored.columns[x]['kind'] == STRING:
+        return np.arange(stored.length), stored.length
+    return sort_permutation(stored, x)
+
+
+def _extremes_pyramid(stored, x, name, order, ordered_count):
+    """
+    Returns the levels of block extremes of y column `name` in x order: level k is a pair
+    (min positions, max positions) of its blocks of PYRAMID_BLOCK_ROWS * PYRAMID_FANOUT ** k
+    rows (positions in x order; only whole blocks). Built on the first call, memory-mapped after.
+    Saved as one int64 array: the number of levels, the block count of each level, then the
+    min and max positions of each level.
+    """
+    digest = hashlib.blake2b(json.dumps([x, name]).encode('utf-8'), digest_size=16).hexdigest()
+    path = os.path.join(sort_directory(stored), f"extremes-{digest}.npy")
+    try:
+        saved = np.load(path, mmap_mode='r')
+        counts = saved[1:1 + int(saved[0])].tolist()
+        levels, offset = [], 1 + len(counts)
+        for count in counts:
+            levels.append((saved[offset:offset + count], saved[offset + count:offset + 2 * count]))
+            offset += 2 * count
+        return levels
+    except FileNotFoundError:
+        pass
+
+    y, valid = _numeric_values(stored, name, order[:ordered_count])
+    # Missing values never win: +inf for the minimum, -inf for the maximum
+    low, high = np.where(valid, y, np.inf), np.where(valid, y, -np.inf)
+    levels = []
+    blocks = ordered_count // PYRAMID_BLOCK_ROWS
+    if blocks:
+        starts = np.arange(blocks) * PYRAMID_BLOCK_ROWS
+        shape = (blocks, PYRAMID_BLOCK_ROWS)
+        levels.append((starts + low[:blocks * PYRAMID_BLOCK_ROWS].reshape(shape).argmin(axis=1),
+                       starts + high[:blocks * PYRAMID_BLOCK_ROWS].reshape(shape).argmax(axis=1)))
+    while levels and len(levels[-1][0]) >= PYRAMID_FANOUT:
+        blocks = len(levels[-1][0]) // PYRAMID_FANOUT
+        minimums, maximums = (positions[:blocks * PYRAMID_FANOUT].reshape(blocks, PYRAMID_FANOUT) for positions in levels[-1])
+        levels.append((minimums[np.arange(blocks), low[minimums].argmin(axis=1)],
+                       maximums[np.arange(blocks), high[maximums].argmax(axis=1)]))
+
+    os.makedirs(sort_directory(stored), exist_ok=True)
+    # Written under a temporary name and renamed, like the sort orders
+    descriptor, temporary_path = tempfile.mkstemp(suffix='.npy.tmp', dir=sort_directory(stored))
+    with os.fdopen(descriptor, 'wb') as f:
+        np.save(f, np.concatenate(([len(levels)], [len(minimums) for minimums, _ in levels],
+                                   *(positions for pair in levels for positions in pair))).astype(np.int64))
+    os.replace(temporary_path, path)
+    logger.debug(f"Debug in _extremes_pyramid: Saved {len(levels)} levels of extremes of {name} by {x} for {stored.path}.")
+    return levels
+
+
+def _viewport_candidates(levels, start, stop, buckets):
+    """
+    Positions (in x order) that contain the minimum and maximum of any bucket of the viewport
+    start:stop when it is cut into `buckets` buckets: the extremes of the whole blocks of the
+    coarsest pyramid level with at least `buckets` blocks in the viewport, and every row of
+    the partial blocks at its ends. The rows themselves when no level is coarse enough.
+    """
+    for level in range(len(levels) - 1, -1, -1):
+        block = PYRAMID_BLOCK_ROWS * PYRAMID_FANOUT ** level
+        first, last = -(-start // block), stop // block
+        if last - first >= buckets:
+            minimums, maximums = levels[level]
+            return _sorted_positions(np.concatenate((np.arange(start, first * block), minimums[first:last],
+                                                     maximums[first:last], np.arange(last * block, stop))))
+    return np.arange(start, stop)
+
+
+def downsample_rows(stored, x, y_columns, x_min=None, x_max=None, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """
+    Selects the rows of a series shown in one chart viewport (see above), at most max_points.
+
+    Each y column gets an equal share of max_points, and rows are kept if any y column keeps
+    them. 'minmax' keeps the minimum and maximum of each bucket; 'lttb' keeps one point per
+    bucket, chosen by LTTB among LTTB_CANDIDATES_PER_POINT min/max pairs, which follows the
+    shape of the series and keeps its spikes.
+
+    Args:
+        stored (file_handlers.store.StoredDataset): The dataset.
+        x (str): Column on the x axis. A text x column has no range; its rows keep their order.
+        y_columns (list): Columns plotted against it.
+        x_min, x_max (float): Optional bounds in the units of the series values (epoch
+                              milliseconds for dates).
+        max_points (int): Upper bound on the rows returned.
+        method (str): One of DOWNSAMPLE_METHODS.
+
+    Returns:
+        A tuple (rows, total): the selected row indices in x order, and the number of rows
+        in the viewport.
+
+    Raises:
+        ValueError: If a column does not exist, for bounds on a text x column, or if
+        max_points is less than 3 per y column.
+    """
+    _check_columns(stored, x, y_columns)
+    y_names = list(dict.fromkeys(y_columns))
+    if max_points < 3 * len(y_names):
+        raise ValueError(f"'max_points' must be at least 3 per y column ({3 * len(y_names)} for {len(y_names)} columns).")
+    kind = stored.columns[x]['kind']
+    if kind == STRING and (x_min is not None or x_max is not None):
+        raise ValueError(f"x_min and x_max need a numeric or date x column; '{x}' is text.")
+    order, ordered_count = _x_order(stored, x)
+    start, stop = 0, ordered_count
+    if kind != STRING:
+        x_values = stored.column_array(x)[0]
+        scale = MS_PER_DAY if kind == DATE else 1
+
+        def x_at(position):
+            return x_values[order[position]] * scale
+
+        # Binary searches on the x order: the viewport is found without reading the column
+        if x_min is not None:
+            start = bisect.bisect_left(range(ordered_count), x_min, key=x_at)
+        if x_max is not None:
+            stop = max(start, bisect.bisect_right(range(ordered_count), x_max, key=x_at))
+
+    total = stop - start
+    if total <= max_points:
+        return np.asarray(order[start:stop]), total
+
+    share = max_points // len(y_names)
+    buckets = share * LTTB_CANDIDATES_PER_POINT if method == 'lttb' else max(1, (share - 2) // 2)
+    kept = []
+    for name in y_names:
+        levels = _extremes_pyramid(stored, x, name, order, ordered_count)
+        positions = _viewport_candidates(levels, start, stop, buckets)
+        rows = np.asarray(order[positions])
+        y, valid = _numeric_values(stored, name, rows)
+        positions, rows, y = positions[valid], rows[valid], y[valid]
+        if len(positions) <= share:
+            kept.append(positions)
+            continue
+        extremes = _minmax_positions(y, min(len(y), buckets))
+        candidates = _sorted_positions(np.append(extremes, [0, len(y) - 1]))
+        if len(candidates) > share:
+            candidates = extremes # share 3 with 'minmax': one bucket, no room for the end points
+        if method == 'lttb':
+            x_positions = positions[candidates].astype(np.float64) if kind == STRING else x_values[rows[candidates]].astype(np.float64)
+            candidates = candidates[_lttb_positions(x_positions, y[candidates], share)]
+        kept.append(positions[candidates])
+
+    positions = _sorted_positions(np.concatenate(kept))
+    logger.debug(f"Debug in downsample_rows: Kept {len(positions)} of {total} rows of {x} / {', '.join(y_columns)} ({method}).")
+    return np.asarray(order[positions]), total
+
+
+def get_series_file(dataset_record, x, y_columns):
+    """
+    Returns the path of the gzip-compressed JSON series, building it on the first request.
+    Written under a temporary name and renamed into place, like the XLSX exports.
+
+    Returns:
+        str: Path of the .json.gz file, or None if the dataset has no stored columns.
+
+    Raises:
+        ValueError: If a column does not exist.
+    """
+    path = series_path(dataset_record, x, y_columns)
+    if os.path.exists(path):
+        return path
+
+    stored = dataset_record.open_columns()
+    if stored is None:
+        return None
+    payload = build_series(stored, x, y_columns)
+    # No dataset ID: the file is shared by every dataset with the same content_key
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(suffix='.json.gz.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    logger.debug(f"Debug in get_series_file: Wrote {payload['length']} points of {x} / {', '.join(y_columns)} "
+                 f"({len(body)} bytes, {os.path.getsize(path)} gzipped).")
+    return path
+
+
+def delete_series_cache(dataset_record):
+    """Deletes a dataset's cached series unless another dataset (same content_key) still uses them."""
+    if dataset_record.shares_content():
+        return
+    shutil.rmtree(os.path.join(series_directory(), _dataset_key(dataset_record)), ignore_errors=True)
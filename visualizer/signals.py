@@ -0,0 +1,25 @@
+# In visualizer/signals.py
+
+import logging
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .export import delete_xlsx_export
+from .series import delete_series_cache
+from .table import delete_sort_cache
+from .models import Dataset
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=Dataset, dispatch_uid='visualizer_delete_dataset_files')
+def delete_dataset_files(sender, instance, **kwargs):
+    """Removes the stored columns, saved sort orders, cached chart series and the XLSX export of a deleted dataset."""
+    delete_sort_cache(instance)
+    delete_series_cache(instance)
+    if instance.columns_file:
+        instance.columns_file.delete(save=False)
+    delete_xlsx_export(instance)
+    logger.debug(f"Debug in delete_dataset_files: Removed the files of dataset {instance.pk}.")
@@ -39,6 +39,13 @@ let lastPanMouseX; // To store the mouse X position during canvas pan
 let dataUnitsPerPixel = 0;
 let panSpeedFactor = 1; // Adjust this value to control the overall pan speed
 
+// Chart series API URL of the current chart (set in window.onload when the page has one)
+let seriesUrl = null;
+let seriesRefreshTimer = null;
+let seriesRequestCount = 0; // Responses to older requests than the latest are dropped
+const SERIES_MAX_POINTS = 2000; // Points requested per viewport, downsampled by the server
+const SERIES_REFRESH_DELAY = 150; // Milliseconds without zoom or pan before the visible range is requested
+
 // Function to destroy the existing chart instance
 function destroyChart() {
 	if (myChart) {
@@ -168,6 +175,7 @@ function onMouseUpPanHandle() { // Renamed
     // Fix the ReferenceError in this log by removing the reference to chartPanDeltaX
     // console.log(`Debug: onMouseMovePanHandle - Calculated chartPanDeltaX: ${chartPanDeltaX}`); // <--- REMOVE OR FIX THIS LINE
     console.log("Debug: Pan handle drag ended."); // <--- Replace with a safe log
+    scheduleSeriesRefresh();
 }
 
 
@@ -259,6 +267,7 @@ function onMouseUpZoomHandle() { // Added for zoom bar
 
 	// Ensure the handle position is finalized after drag
 	updateZoomHandle(); // This updates the zoom handle
+	scheduleSeriesRefresh();
 }
 // --- End Function for Custom Scrollbar Handle Dragging (Zoom Bar) ---
 
@@ -460,10 +469,195 @@ function onCanvasMouseUp(e) {
         // Prevent default behavior
         e.preventDefault();
         e.stopPropagation();
+        scheduleSeriesRefresh();
     }
 }
 
 
+// --- Binary chart series (format=binary of the chart series API, see visualizer/series.py) ---
+// The response is 'DVSR', the uint32 length of a JSON header, then the column buffers,
+// each at a multiple of 8 bytes so they can be viewed as typed arrays without copying.
+const SERIES_MAGIC = 'DVSR';
+const MS_PER_DAY = 86400000;
+
+// Typed arrays use the platform's byte order; the buffers are little-endian (as every browser is)
+const IS_LITTLE_ENDIAN = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+
+// Decodes one column of a binary series: numbers and dates become a Float64Array (NaN where
+// missing, dates in epoch milliseconds), text columns keep their Int32Array codes (-1 where
+// missing) and their categories.
+function decodeSeriesColumn(buffer, dataStart, length, column) {
+    const entry = column.values;
+    let values;
+    if (entry.dtype === 'float64') {
+        values = new Float64Array(buffer, dataStart + entry.offset, length); // A view of the response, not a copy
+    } else if (entry.dtype === 'int32') {
+        values = new Int32Array(buffer, dataStart + entry.offset, length);
+    } else {
+        // int64 (integers, and dates as days): high * 2^32 + low, exact up to 2^53, without BigInt
+        const words = new Int32Array(buffer, dataStart + entry.offset, length * 2);
+        const scale = column.unit === 'day' ? MS_PER_DAY : 1;
+        values = new Float64Array(length);
+        for (let i = 0; i < length; i++) {
+            values[i] = (words[2 * i + 1] * 4294967296 + (words[2 * i] >>> 0)) * scale;
+        }
+    }
+
+    if (column.valid) {
+        const valid = new Uint8Array(buffer, dataStart + column.valid.offset, length);
+        const missing = column.categories ? -1 : NaN;
+        for (let i = 0; i < length; i++) {
+            if (valid[i] === 0) {
+                values[i] = missing;
+            }
+        }
+    }
+    return {
+        name: column.name,
+        kind: column.kind,
+        unit: column.unit === 'day' ? 'ms' : column.unit,
+        values: values,
+        categories: column.categories || null,
+    };
+}
+
+// Decodes a whole binary series (an ArrayBuffer) into { dataset, length, window, x, y: [...] }
+function decodeSeries(buffer) {
+    if (!IS_LITTLE_ENDIAN) {
+        throw new Error("Binary chart series need a little-endian platform.");
+    }
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+    if (magic !== SERIES_MAGIC) {
+        throw new Error("The response is not a binary chart series.");
+    }
+    const headerLength = view.getUint32(4, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+    const dataStart = 8 + headerLength;
+
+    return {
+        dataset: header.dataset,
+        length: header.length,
+        window: header.window || null,
+        x: decodeSeriesColumn(buffer, dataStart, header.length, header.x),
+        y: header.y.map(column => decodeSeriesColumn(buffer, dataStart, header.length, column)),
+    };
+}
+
+// Fetches a series from the chart series API in the binary format and decodes it.
+// params are downsampling parameters (x_min, x_max, max_points, method); the server then
+// returns only the rows in [x_min, x_max], at most max_points of them.
+async function loadSeries(seriesUrl, params = {}) {
+    const url = new URL(seriesUrl, window.location.href);
+    url.searchParams.set('format', 'binary');
+    for (const [name, value] of Object.entries(params)) {
+        if (value !== undefined && value !== null) {
+            url.searchParams.set(name, value);
+        }
+    }
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+    }
+    const buffer = await response.arrayBuffer();
+
+    const started = performance.now();
+    const series = decodeSeries(buffer);
+    console.log(`Debug in chart_logic.js: Decoded ${series.length} points (${buffer.byteLength} bytes) in ${(performance.now() - started).toFixed(1)} ms.`);
+    return series;
+}
+
+// Formats a value of a linear x axis: dates (epoch milliseconds) as YYYY-MM-DD
+function formatXValue(value, unit) {
+    return unit === 'ms' ? new Date(value).toISOString().slice(0, 10) : value;
+}
+
+// Builds Chart.js data from a decoded series. Numeric and date x columns are plotted on a
+// linear x axis ({x, y} points, so zooming gives data bounds to request); text x columns
+// become labels, with one dataset per y column with its Float64Array as data.
+function seriesChartData(series) {
+    const x = series.x;
+    if (!x.categories) {
+        return {
+            xScale: 'linear',
+            xUnit: x.unit || null,
+            datasets: series.y.map(column => ({ label: column.name, data: seriesPoints(x.values, column.values) })),
+        };
+    }
+    // Text x values arrive as category codes (-1 where missing)
+    const labels = new Array(series.length);
+    for (let i = 0; i < series.length; i++) {
+        const value = x.values[i];
+        labels[i] = value < 0 ? null : x.categories[value];
+    }
+    return {
+        labels: labels,
+        datasets: series.y.map(column => ({ label: column.name, data: column.values })),
+    };
+}
+
+// Pairs x and y values into {x, y} points, skipping points without an x value
+function seriesPoints(xValues, yValues) {
+    const points = [];
+    for (let i = 0; i < xValues.length; i++) {
+        if (!Number.isNaN(xValues[i])) {
+            points.push({ x: xValues[i], y: yValues[i] });
+        }
+    }
+    return points;
+}
+
+// Requests the visible x range once zooming or panning has stopped for SERIES_REFRESH_DELAY
+function scheduleSeriesRefresh() {
+    if (!seriesUrl || !myChart || myChart.data.xScale !== 'linear') {
+        return; // Only charts loaded from the chart series API with a numeric or date x axis
+    }
+    clearTimeout(seriesRefreshTimer);
+    seriesRefreshTimer = setTimeout(refreshVisibleSeries, SERIES_REFRESH_DELAY);
+}
+
+// Replaces the chart's points with the server's downsampled points of the visible x range,
+// so each zoom step shows up to SERIES_MAX_POINTS points of that range whatever the dataset size
+async function refreshVisibleSeries() {
+    const xScale = myChart ? myChart.scales['x'] : null;
+    if (!xScale) {
+        return;
+    }
+    const request = ++seriesRequestCount;
+    try {
+        const series = await loadSeries(seriesUrl, { x_min: xScale.min, x_max: xScale.max, max_points: SERIES_MAX_POINTS });
+        if (request !== seriesRequestCount || !myChart) {
+            return; // A newer viewport was requested meanwhile
+        }
+        const chartData = seriesChartData(series);
+        myChart.data.datasets.forEach((dataset, i) => {
+            dataset.data = chartData.datasets[i].data;
+        });
+        myChart.update('none'); // Keeps the zoomed scale limits
+        console.log(`Debug in chart_logic.js: Showing ${series.length} of ${series.window.total} points between ${xScale.min} and ${xScale.max}.`);
+    } catch (error) {
+        console.error("Error loading the visible range of the chart series:", error);
+    }
+}
+
+
+// Returns { min, max } of the finite numbers in data (an array, a Float64Array or {x, y} points),
+// or null if there are none.
+// A loop rather than Math.max(...data), which exceeds the call stack size on large datasets.
+function dataBounds(data) {
+    let min = Infinity;
+    let max = -Infinity;
+    for (let i = 0; i < data.length; i++) {
+        const value = data[i] !== null && typeof data[i] === 'object' ? data[i].y : data[i];
+        if (typeof value === 'number' && Number.isFinite(value)) {
+            if (value < min) min = value;
+            if (value > max) max = value;
+        }
+    }
+    return min <= max ? { min: min, max: max } : null;
+}
+
+
 // Function to create and render a Chart.js chart
 function createChart(chartType, chartData, xAxisLabel = 'X-Axis', yAxisLabel = 'Y-Axis') {
     console.log(`Debug in chart_logic.js: Attempting to create chart of type: ${chartType}`);
@@ -476,7 +670,7 @@ function createChart(chartType, chartData, xAxisLabel = 'X-Axis', yAxisLabel = '
         console.error("Error in chart_logic.js: Canvas element with ID 'myChart' not found for creation.");
         return null; // Exit and return null if canvas not found
     }
-    if (!chartData || !chartData.labels || !chartData.datasets || chartData.datasets.length === 0) {
+    if (!chartData || (!chartData.labels && chartData.xScale !== 'linear') || !chartData.datasets || chartData.datasets.length === 0) {
         console.warn("Debug in chart_logic.js: Provided chartData is invalid or empty for creation.");
         // Optionally display a message to the user indicating no data to chart for selected axes
         return null; // Return null if data is invalid
@@ -529,11 +723,13 @@ function createChart(chartType, chartData, xAxisLabel = 'X-Axis', yAxisLabel = '
                     // console.log("Debug: Chart zoom complete. Updating scrollbar handles."); // Keep commented unless debugging hook
                     updateScrollbarHandle(); // Update pan handle (bottom)
                     updateZoomHandle(); // Update zoom handle (side)
+                    scheduleSeriesRefresh(); // Load the visible range at full detail
                 },
                 onPanComplete: function({chart}) {
                     // console.log("Debug: Chart pan complete. Updating scrollbar handles."); // Keep commented unless debugging hook
                     updateScrollbarHandle(); // Update pan handle (bottom)
                     updateZoomHandle(); // Update zoom handle (side)
+                    scheduleSeriesRefresh(); // Load the visible range at full detail
                 },
             },
             // Your tooltip configuration should also be inside 'plugins'
@@ -544,7 +740,7 @@ function createChart(chartType, chartData, xAxisLabel = 'X-Axis', yAxisLabel = '
                         if (label) {
                             label += ': ';
                         }
-                        let value = context.raw;
+                        let value = context.raw !== null && typeof context.raw === 'object' ? context.raw.y : context.raw; // {x, y} points on a linear x axis
                         if (typeof value === 'number') {
                             label += value.toFixed(2);
                         } else {
@@ -553,6 +749,9 @@ function createChart(chartType, chartData, xAxisLabel = 'X-Axis', yAxisLabel = '
                         return label;
                     },
                     title: function(context) {
+                        if (chartData.xScale === 'linear') {
+                            return String(formatXValue(context[0].parsed.x, chartData.xUnit));
+                        }
                         return context[0].label;
                     }
                 }
@@ -564,12 +763,13 @@ function createChart(chartType, chartData, xAxisLabel = 'X-Axis', yAxisLabel = '
 
     // Customize scales based on chart type (only apply scales to bar/line charts)
     if (chartType === 'bar' || chartType === 'line') {
+        const yBounds = dataBounds(chartData.datasets[0].data);
         chartOptions.scales = { // <--- Ensure this is assigned to chartOptions.scales
             y: {
                 title: { display: true, text: yAxisLabel },
                 // Calculate suggestedMax/Min based on data, ensuring numbers are filtered
-                suggestedMax: chartData.datasets[0].data.filter(v => typeof v === 'number').length > 0 ? Math.max(0, ...chartData.datasets[0].data.filter(v => typeof v === 'number')) * 1.1 : 10,
-                suggestedMin: chartData.datasets[0].data.filter(v => typeof v === 'number').length > 0 ? Math.min(0, ...chartData.datasets[0].data.filter(v => typeof v === 'number')) * 1.1 : 0,
+                suggestedMax: yBounds ? Math.max(0, yBounds.max) * 1.1 : 10,
+                suggestedMin: yBounds ? Math.min(0, yBounds.min) * 1.1 : 0,
                 // Allow Y-axis scale to be controlled by zoom (don't limit to 'original' here)
             },
             x: {
@@ -578,6 +778,11 @@ function createChart(chartType, chartData, xAxisLabel = 'X-Axis', yAxisLabel = '
                 // Allow X-axis scale to be controlled by pan (don't limit to 'original' here)
             }
         };
+        if (chartData.xScale === 'linear') {
+            // Points of the chart series API: the x axis is in data units, which a zoom or pan turns into x_min/x_max
+            chartOptions.scales.x.type = 'linear';
+            chartOptions.scales.x.ticks.callback = value => formatXValue(value, chartData.xUnit);
+        }
     } else {
         // For chart types without standard x/y scales (like pie/doughnut), ensure scales object is still present but empty
         chartOptions.scales = {};
@@ -620,11 +825,23 @@ window.onload = async function() {
     const fetchUrlElement = document.getElementById('fetch-data-url');
     const csrfTokenElement = document.querySelector('[name=csrfmiddlewaretoken]');
 
+    const seriesUrlElement = document.getElementById('chart-series-url');
+
     let initialChartData = null;
     let fetchUrl = null;
     let csrfToken = null;
 
-    if (dataElement) {
+    if (seriesUrlElement) {
+        // Load the chart data from the chart series API (binary format) rather than embedded JSON:
+        // the whole x range, downsampled by the server; zooming and panning request the visible range
+        try {
+            seriesUrl = JSON.parse(seriesUrlElement.textContent);
+            initialChartData = seriesChartData(await loadSeries(seriesUrl, { max_points: SERIES_MAX_POINTS }));
+            console.log("Debug in chart_logic.js: Loaded initial chart data from the chart series API.");
+        } catch (error) {
+            console.error("Error loading chart series:", error);
+        }
+    } else if (dataElement) {
         const jsonText = dataElement.textContent;
         console.log("Debug in chart_logic.js: Found and got text content from 'extracted-data-json' element.");
         try {
@@ -0,0 +1,316 @@
+# In visualizer/table.py
+
+import os
+import re
+import json
+import base64
+import shutil
+import hashlib
+import logging
+import datetime
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from file_handlers.dataset import DATE, EPOCH_DATE, STRING
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+SORT_ORDERS = ('asc', 'desc')
+
+# column:operator[:value], e.g. 'Type:eq:DEBIT', 'Amount:lt:0', 'Date:gte:2024-01-01', 'Description:contains:amazon'
+FILTER_OPERATORS = ('eq', 'ne', 'lt', 'lte', 'gt', 'gte', 'contains', 'empty', 'notempty')
+_FILTER = re.compile(r'^(.+?):(' + '|'.join(FILTER_OPERATORS) + r')(?::(.*))?$', re.DOTALL)
+_COMPARISONS = {'eq': np.equal, 'ne': np.not_equal, 'lt': np.less, 'lte': np.less_equal, 'gt': np.greater, 'gte': np.greater_equal}
+
+# Row selections of filtered views (see _filtered_rows) kept per process, so paging through
+# a filtered view does not evaluate the filters again
+SELECTION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_selections = OrderedDict()
+_selections_lock = threading.Lock()
+
+
+def encode_cursor(state):
+    """Encodes the position of the next page as an opaque URL-safe token."""
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a token returned by encode_cursor.
+
+    Raises:
+        ValueError: If the token is not a valid cursor.
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("'cursor' is not a valid cursor.") from e
+    if not isinstance(state, dict) or not isinstance(state.get('offset'), int) or state['offset'] < 0:
+        raise ValueError("'cursor' is not a valid cursor.")
+    filters = state.get('filters', [])
+    if (not isinstance(state.get('sort'), (str, type(None))) or state.get('order', 'asc') not in SORT_ORDERS
+            or not isinstance(filters, list)
+            or not all(isinstance(f, list) and len(f) == 3 and all(isinstance(part, str) for part in f)
+                       and f[1] in FILTER_OPERATORS for f in filters)):
+        raise ValueError("'cursor' is not a valid cursor.")
+    return {'offset': state['offset'], 'sort': state.get('sort'), 'order': state.get('order', 'asc'), 'filters': filters}
+
+
+def table_columns(stored, requested=None):
+    """
+    Returns the columns a page shows: the requested ones in the requested order, or every
+    stored column in header order.
+
+    Raises:
+        ValueError: If a requested column does not exist.
+    """
+    if not requested:
+        return [header for header in dict.fromkeys(stored.headers) if header in stored.columns]
+    unknown = [name for name in requested if name not in stored.columns]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}.")
+    return list(dict.fromkeys(requested))
+
+
+def parse_filter(text):
+    """
+    Parses a filter parameter of the form column:operator[:value] (see FILTER_OPERATORS).
+
+    Returns:
+        A tuple (column, operator, value); value is '' for 'empty' and 'notempty'.
+
+    Raises:
+        ValueError: If the filter is malformed.
+    """
+    match = _FILTER.match(text or '')
+    if match is None:
+        raise ValueError(f"'filter' must look like column:operator:value with an operator among {', '.join(FILTER_OPERATORS)}.")
+    column, operator, value = match.group(1), match.group(2), match.group(3) or ''
+    if operator not in ('empty', 'notempty') and not value:
+        raise ValueError(f"The '{operator}' filter on {column} needs a value.")
+    return column, operator, value
+
+
+# --- Sort orders ---
+# The ascending order of each sorted column is computed once and saved next to the columnar
+# file (<id>.sort/<column digest>.npy). Its first element is the number of rows with a value,
+# followed by their indices in ascending order and then the indices of the missing cells,
+# which stay last in both orders. The files are deleted with the dataset (visualizer.signals).
+def sort_directory(stored):
+    return f"{os.path.splitext(stored.path)[0]}.sort"
+
+
+def _sort_path(stored, column):
+    digest = hashlib.blake2b(column.encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(sort_directory(stored), f"{digest}.npy")
+
+
+def _sort_keys(stored, column):
+    """Returns an array ordering the column's values: the values, or each string's rank in its dictionary."""
+    values, valid = stored.column_array(column)
+    if stored.columns[column]['kind'] != STRING:
+        return values
+    categories = stored.column_categories(column)
+    ranks = np.zeros(max(len(categories), 1), dtype=np.int64)
+    ranks[np.array(sorted(range(len(categories)), key=categories.__getitem__), dtype=np.int64)] = np.arange(len(categories))
+    return ranks[np.where(valid, values, 0)]
+
+
+def sort_permutation(stored, column):
+    """
+    Returns (permutation, valid_count) for a column: the memory-mapped row order described
+    above, computed with a stable argsort on the first call.
+    """
+    path = _sort_path(stored, column)
+    try:
+        saved = np.load(path, mmap_mode='r')
+        return saved[1:], int(saved[0])
+    except FileNotFoundError:
+        pass
+
+    keys = _sort_keys(stored, column)
+    valid = stored.column_array(column)[1]
+    valid_rows = np.flatnonzero(valid)
+    ascending = valid_rows[np.argsort(keys[valid_rows], kind='stable')]
+    saved = np.concatenate(([len(ascending)], ascending, np.flatnonzero(~valid))).astype(np.int64)
+
+    # Written under a temporary name and renamed, so concurrent requests never read a partial file
+    os.makedirs(sort_directory(stored), exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(suffix='.npy.tmp', dir=sort_directory(stored))
+    with os.fdopen(descriptor, 'wb') as f:
+        np.save(f, saved)
+    os.replace(temporary_path, path)
+    logger.debug(f"Debug in sort_permutation: Sorted {len(saved) - 1} rows of column {column} of {stored.path}.")
+    return saved[1:], int(saved[0])
+
+
+def _ordered(permutation, valid_count, descending):
+    """The full row order of a sort: permutation itself, or its sorted part reversed."""
+    if not descending:
+        return permutation
+    return np.concatenate((permutation[:valid_count][::-1], permutation[valid_count:]))
+
+
+def _sorted_page(permutation, valid_count, descending, offset, stop):
+    """Row indices at positions offset..stop of a sorted view, read without materializing the order."""
+    positions = np.arange(offset, stop)
+    if descending:
+        positions = np.where(positions < valid_count, valid_count - 1 - positions, positions)
+    return np.asarray(permutation[positions])
+
+
+def delete_sort_cache(dataset_record):
+    """Deletes a dataset's saved sort orders and this process's cached selections of it."""
+    if not dataset_record.columns_file:
+        return
+    prefix = os.path.splitext(dataset_record.columns_file.path)[0]
+    shutil.rmtree(f"{prefix}.sort", ignore_errors=True)
+    with _selections_lock:
+        for key in [key for key in _selections if key[0] == dataset_record.columns_file.path]:
+            del _selections[key]
+
+
+# --- Filters ---
+def _filter_value(kind, column, value):
+    """Converts a filter value to the column's value type."""
+    if kind == DATE:
+        try:
+            return (datetime.date.fromisoformat(value) - EPOCH_DATE).days
+        except ValueError:
+            raise ValueError(f"Filter values on {column} must be dates in YYYY-MM-DD format.") from None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Filter values on {column} must be numbers.") from None
+
+
+def _predicate_mask(stored, column, operator, value):
+    """
+    Evaluates one filter over a whole column. Numbers and dates are compared as arrays;
+    a text predicate is evaluated once per distinct string and mapped to the rows through
+    their dictionary codes. Text comparisons ignore case. Missing cells only match 'empty'.
+    """
+    values, valid = stored.column_array(column)
+    if operator == 'empty':
+        return ~valid
+    if operator == 'notempty':
+        return np.array(valid)
+
+    kind = stored.columns[column]['kind']
+    if kind != STRING:
+        if operator == 'contains':
+            raise ValueError(f"'contains' filters only apply to text columns; {column} is {kind}.")
+        return valid & _COMPARISONS[operator](values, _filter_value(kind, column, value))
+
+    needle = value.casefold()
+    categories = [category.casefold() for category in stored.column_categories(column)]
+    if not categories:
+        return np.zeros(len(values), dtype=bool)
+    if operator == 'contains':
+        matches = np.fromiter((needle in category for category in categories), dtype=bool, count=len(categories))
+    else:
+        matches = _COMPARISONS[operator](np.array(categories, dtype=object), needle).astype(bool)
+    return valid & matches[np.where(valid, values, 0)]
+
+
+def _filtered_rows(stored, sort, descending, filters):
+    """
+    Returns the row indices of a filtered view in display order. Selections are kept in a
+    per-process LRU cache (up to SELECTION_CACHE_MAX_BYTES), so later pages only slice them.
+    """
+    key = (stored.path, sort, descending, tuple(filters))
+    with _selections_lock:
+        if key in _selections:
+            _selections.move_to_end(key)
+            return _selections[key]
+
+    mask = np.ones(len(stored), dtype=bool)
+    for column, operator, value in filters:
+        mask &= _predicate_mask(stored, column, operator, value)
+    if sort is None:
+        rows = np.flatnonzero(mask)
+    else:
+        ordered = _ordered(*sort_permutation(stored, sort), descending)
+        rows = np.asarray(ordered[mask[ordered]])
+
+    with _selections_lock:
+        _selections[key] = rows
+        total = sum(selection.nbytes for selection in _selections.values())
+        while total > SELECTION_CACHE_MAX_BYTES and len(_selections) > 1:
+            total -= _selections.popitem(last=False)[1].nbytes
+    logger.debug(f"Debug in _filtered_rows: {len(rows)} of {len(stored)} rows match {len(filters)} filter(s).")
+    return rows
+
+
+def table_page(stored, columns=None, offset=0, limit=DEFAULT_PAGE_SIZE, sort=None, order='asc', filters=()):
+    """
+    Reads one page of a stored dataset for the data table, optionally sorted by one column
+    and filtered across the whole dataset. Only the page's rows of the selected columns are
+    read from the columnar file (see StoredDataset.load and take):
+    - unsorted, unfiltered pages are a row range;
+    - sorted pages index the column's saved sort order (sort_permutation), so after the
+      first sort a page costs the same at any offset;
+    - filtered pages slice the view's cached selection (_filtered_rows).
+
+    Args:
+        stored (file_handlers.store.StoredDataset): The dataset.
+        columns (list): Columns to return (see table_columns). None returns every column.
+        offset (int): Position of the first row in the (sorted, filtered) view.
+        limit (int): Rows per page, at most MAX_PAGE_SIZE.
+        sort (str): Column to sort by, or None to keep the file order.
+        order (str): 'asc' or 'desc'. Missing cells come last in both orders.
+        filters (list): (column, operator, value) tuples from parse_filter; rows must match all.
+
+    Returns:
+        dict: 'columns', 'rows' (one list of cell values per row, in column order; dates as
+        YYYY-MM-DD strings, missing cells as None), 'offset', 'limit', 'total' (rows in the
+        view), 'dataset_total', 'sort', 'order', 'filters' and 'next_cursor' (None on the
+        last page; it also encodes the sort and filters).
+
+    Raises:
+        ValueError: If a column does not exist, a filter does not apply to its column,
+        or limit/offset/order are out of range.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+    if offset < 0:
+        raise ValueError("'offset' must not be negative.")
+    if order not in SORT_ORDERS:
+        raise ValueError(f"'order' must be one of {', '.join(SORT_ORDERS)}.")
+    names = table_columns(stored, columns)
+    filters = [tuple(f) for f in filters]
+    table_columns(stored, ([sort] if sort else []) + [column for column, _, _ in filters]) # Validates the names
+    descending = order == 'desc'
+
+    if filters:
+        selection = _filtered_rows(stored, sort, descending, filters)
+        total = len(selection)
+        page = stored.take(selection[offset:offset + limit], columns=names)
+    elif sort:
+        permutation, valid_count = sort_permutation(stored, sort)
+        total = len(stored)
+        page = stored.take(_sorted_page(permutation, valid_count, descending, min(offset, total), min(offset + limit, total)), columns=names)
+    else:
+        total = len(stored)
+        page = stored.load(columns=names, start=offset, stop=offset + limit)
+    rows = [list(row) for row in zip(*(page.column(name).to_list() for name in names))] if names else []
+    end = offset + len(rows)
+
+    logger.debug(f"Debug in table_page: Rows {offset}-{end} of {total} (sort={sort} {order}, {len(filters)} filters), {len(names)} columns.")
+    view = {'sort': sort, 'order': order, 'filters': [list(f) for f in filters]}
+    return {
+        'columns': names,
+        'rows': rows,
+        'offset': offset,
+        'limit': limit,
+        'total': total,
+        'dataset_total': len(stored),
+        **view,
+        'next_cursor': encode_cursor({'offset': end, **view}) if end < total else None,
+    }
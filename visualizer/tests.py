@@ -1,3 +1,992 @@
-from django.test import TestCase
+# In visualizer/tests.py
 
-# Create your tests here.
+import io
+import os
+import json
+import shutil
+import struct
+import zipfile
+import datetime
+import tempfile
+import threading
+from unittest import mock
+
+import numpy as np
+import openpyxl
+import xlsxwriter
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from file_handlers.converters.csv import csv_chunks_to_list_of_dicts
+from file_handlers.converters.detect import CSV, GENERIC_XML, JSON, ODS, SNIFF_SIZE, SPREADSHEETML, XLS, XLSX, sniff_format, sniff_upload
+from file_handlers.converters.utils import clean_and_parse_amount, iter_decoded_lines, parse_amount_column
+from file_handlers.converters.json import MAX_NDJSON_PROBE, json_chunks_to_list_of_dicts, json_to_list_of_dicts
+from file_handlers.converters.ods_handler import iter_ods_rows, ods_to_list_of_dicts
+from file_handlers.converters.xml import spreadsheetml_to_list_of_dicts
+from file_handlers.dataset import Column, Dataset, DATE, FLOAT, STRING
+from file_handlers.store import open_dataset, save_dataset
+from file_handlers.parse_cache import CACHE_FORMAT_VERSION, ParseCache, hash_upload
+from .export import AMOUNT_FORMAT, DATE_FORMAT, export_key, write_xlsx
+from .jobs import expire_if_stale
+from .models import ConversionJob, Dataset as DatasetRecord
+from .series import BINARY_ALIGNMENT, BINARY_MAGIC, MS_PER_DAY, downsample_rows, series_etag
+
+STATEMENT_CSV = (
+    "Date,Description,Type,Amount\n"
+    "2024-01-05,Coffee shop,DEBIT,-3.50\n"
+    "2024-01-20,Salary,CREDIT,2500.00\n"
+    "2024-02-03,Amazon order,DEBIT,-42.99\n"
+    "2024-02-14,Refund,CREDIT,12.00\n"
+)
+
+
+class MediaRootTestCase(TestCase):
+    """Runs each test with its own MEDIA_ROOT and parse cache, converting uploads within the request."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='datavis_test_')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PARSE_CACHE_DIR=f"{media_root}/parse_cache",
+                                              CONVERSION_JOBS_ENABLED=False, CONVERTER_POOL_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # The parse cache is created once per process from the settings above
+        import visualizer.conversion
+        visualizer.conversion._parse_cache = None
+        self.addCleanup(setattr, visualizer.conversion, '_parse_cache', None)
+
+    def upload(self, client, content=STATEMENT_CSV, filename='statement.csv'):
+        """Uploads content through the upload form and returns the ID of the stored dataset."""
+        client.post(reverse('visualizer:upload_dataset'), {'xml_file': SimpleUploadedFile(filename, content.encode('utf-8'))})
+        dataset_id = client.session.get('dataset_id')
+        self.assertIsNotNone(dataset_id, client.session.get('conversion_error'))
+        return dataset_id
+
+
+class DatasetOwnershipTests(MediaRootTestCase):
+    """The dataset APIs only serve datasets converted in the requesting session."""
+
+    def dataset_urls(self, dataset_id):
+        return [
+            reverse('visualizer:dataset_rows', args=[dataset_id]),
+            f"{reverse('visualizer:dataset_series', args=[dataset_id])}?x=Date&y=Amount",
+            reverse('visualizer:dataset_export', args=[dataset_id]),
+            reverse('visualizer:transaction_aggregate', args=[dataset_id]),
+            f"{reverse('visualizer:transaction_search', args=[dataset_id])}?q=coffee",
+        ]
+
+    def test_owner_can_read_its_dataset(self):
+        owner = Client()
+        dataset_id = self.upload(owner)
+        for url in self.dataset_urls(dataset_id):
+            with self.subTest(url=url):
+                self.assertEqual(owner.get(url).status_code, 200)
+
+    def test_other_sessions_get_404(self):
+        dataset_id = self.upload(Client())
+        other = Client()
+        self.upload(other) # A session with a dataset of its own
+        for url in self.dataset_urls(dataset_id):
+            with self.subTest(url=url):
+                self.assertEqual(other.get(url).status_code, 404)
+
+    def test_earlier_uploads_stay_readable(self):
+        owner = Client()
+        first_id = self.upload(owner)
+        second_id = self.upload(owner)
+        self.assertNotEqual(first_id, second_id)
+        self.assertEqual(owner.get(reverse('visualizer:dataset_rows', args=[first_id])).status_code, 200)
+
+
+def _chunked(data, size):
+    """Splits bytes into chunks of size bytes, as an upload handler would deliver them."""
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class JSONConverterTests(SimpleTestCase):
+    RECORDS = '[{"Date": "2024-01-05", "Amount": "-3.50"}, {"Date": "2024-01-20", "Amount": "2,500.00"}]'
+
+    def convert(self, text, chunk_size=None):
+        data = text.encode('utf-8')
+        if chunk_size is None:
+            header_list, dataset, error_message = json_to_list_of_dicts(data)
+        else:
+            header_list, dataset, error_message = json_chunks_to_list_of_dicts(_chunked(data, chunk_size))
+        self.assertIsNone(error_message)
+        return header_list, list(dataset)
+
+    def test_envelope_records_are_preferred_to_earlier_lists(self):
+        layouts = {
+            'one line': f'{{"links":[{{"href":"x"}}],"records":{self.RECORDS}}}',
+            'newline after the first member': f'{{"links":[{{"href":"x"}}],\n"records":{self.RECORDS}}}',
+            'pretty-printed': f'{{\n  "links": [{{"href": "x"}}],\n  "records": {self.RECORDS}\n}}\n',
+        }
+        for layout, text in layouts.items():
+            for chunk_size in (None, 5):
+                with self.subTest(layout=layout, chunk_size=chunk_size):
+                    header_list, records = self.convert(text, chunk_size)
+                    self.assertEqual(header_list, ['Date', 'Amount'])
+                    self.assertEqual([record['Amount'] for record in records], [-3.5, 2500.0])
+
+    def test_first_list_of_objects_without_envelope_key(self):
+        text = '{"meta": {"bank": "x"},\n"transactions": [{"Amount": 1}, {"Amount": 2}],\n"links": [{"href": "x"}]}'
+        header_list, records = self.convert(text)
+        self.assertEqual(header_list, ['Amount'])
+        self.assertEqual(len(records), 2)
+
+    def test_object_without_lists_is_one_record(self):
+        header_list, records = self.convert('{\n  "name": "x",\n  "balance": {"amount": 5}\n}')
+        self.assertEqual(header_list, ['name', 'balance.amount'])
+        self.assertEqual(records, [{'name': 'x', 'balance.amount': 5}])
+
+    def test_json_lines(self):
+        text = '{"Date": "2024-01-05", "Amount": 1.5}\n\n{"Date": "2024-01-06", "Amount": 2, "Note": "late"}\n'
+        for chunk_size in (None, 3):
+            with self.subTest(chunk_size=chunk_size):
+                header_list, records = self.convert(text, chunk_size)
+                self.assertEqual(header_list, ['Date', 'Amount', 'Note'])
+                self.assertEqual([record['Amount'] for record in records], [1.5, 2.0])
+                self.assertIsNone(records[0]['Note'])
+
+    def test_json_lines_with_a_first_line_longer_than_the_probe(self):
+        note = 'x' * (MAX_NDJSON_PROBE + 100_000)
+        text = json.dumps({'Date': '2024-01-05', 'Amount': 1.5, 'Note': note}) + '\n\n{"Date": "2024-01-06", "Amount": 2}\n'
+        for chunk_size in (None, 65536):
+            with self.subTest(chunk_size=chunk_size):
+                header_list, records = self.convert(text, chunk_size)
+                self.assertEqual(header_list, ['Date', 'Amount', 'Note'])
+                self.assertEqual([(record['Amount'], record['Note']) for record in records], [(1.5, note), (2.0, None)])
+
+        # Long single-line documents are still one envelope; envelopes on several lines are pages of records
+        envelope = json.dumps({'records': [{'Amount': 1, 'Note': note}, {'Amount': 2}]})
+        self.assertEqual([record['Amount'] for record in self.convert(envelope, 65536)[1]], [1.0, 2.0])
+        pages = envelope + '\n' + json.dumps({'records': [{'Amount': 3}]})
+        self.assertEqual([record['Amount'] for record in self.convert(pages, 65536)[1]], [1.0, 2.0, 3.0])
+
+    def test_large_values_are_not_rescanned_per_chunk(self):
+        text = json.dumps([{'Amount': 1, 'Note': 'x' * 4_000_000}, {'Amount': 2}])
+        with mock.patch.object(json.JSONDecoder, 'raw_decode', autospec=True, side_effect=json.JSONDecoder.raw_decode) as raw_decode:
+            _, records = self.convert(text, 65536)
+        self.assertEqual([record['Amount'] for record in records], [1.0, 2.0])
+        # About 60 chunks hold the first record; reading twice as much per retry needs a handful of attempts
+        self.assertLess(raw_decode.call_count, 20)
+
+    def test_numbers_split_across_chunks(self):
+        text = '[' + ', '.join(f'{{"Amount": {value}}}' for value in (12345.678, 1e10, -0.25)) + ']'
+        for chunk_size in range(1, 8):
+            with self.subTest(chunk_size=chunk_size):
+                _, records = self.convert(text, chunk_size)
+                self.assertEqual([record['Amount'] for record in records], [12345.678, 1e10, -0.25])
+
+
+class DerivedFileKeyTests(MediaRootTestCase):
+    """XLSX exports and chart series are shared by datasets converted the same way from identical uploads."""
+
+    def test_key_includes_format_and_converter_version(self):
+        record = DatasetRecord(pk=1, content_hash='ab' * 32, file_type='csv', parse_format_version=CACHE_FORMAT_VERSION)
+        same = DatasetRecord(pk=2, content_hash='ab' * 32, file_type='csv', parse_format_version=CACHE_FORMAT_VERSION)
+        other_format = DatasetRecord(pk=3, content_hash='ab' * 32, file_type='json', parse_format_version=CACHE_FORMAT_VERSION)
+        older_converter = DatasetRecord(pk=4, content_hash='ab' * 32, file_type='csv', parse_format_version=CACHE_FORMAT_VERSION - 1)
+        self.assertEqual(export_key(record), export_key(same))
+        self.assertEqual(series_etag(record, 'Date', ['Amount']), series_etag(same, 'Date', ['Amount']))
+        for different in (other_format, older_converter):
+            self.assertNotEqual(export_key(record), export_key(different))
+            self.assertNotEqual(series_etag(record, 'Date', ['Amount']), series_etag(different, 'Date', ['Amount']))
+
+    def test_upload_records_format_and_version(self):
+        dataset_id = self.upload(Client())
+        record = DatasetRecord.objects.get(pk=dataset_id)
+        self.assertEqual(record.file_type, 'csv')
+        self.assertEqual(record.parse_format_version, CACHE_FORMAT_VERSION)
+
+    def test_shared_series_file_has_no_dataset_id(self):
+        first, second = Client(), Client()
+        urls = [f"{reverse('visualizer:dataset_series', args=[self.upload(client)])}?x=Date&y=Amount" for client in (first, second)]
+        responses = [client.get(url) for client, url in zip((first, second), urls)]
+        self.assertEqual(responses[0]['ETag'], responses[1]['ETag'])
+        for response in responses:
+            series = json.loads(b''.join(response.streaming_content) if response.streaming else response.content)
+            self.assertNotIn('dataset', series)
+            self.assertEqual(series['length'], 4)
+
+
+class CSVDateSeriesTests(MediaRootTestCase):
+    """CSV date columns are stored as dates, so the chart gets epoch milliseconds and can zoom."""
+
+    def test_csv_dates_are_sent_as_epoch_milliseconds(self):
+        client = Client()
+        url = reverse('visualizer:dataset_series', args=[self.upload(client)])
+        series = client.get(url, {'x': 'Date', 'y': 'Amount'}).json()
+        self.assertEqual(series['x']['unit'], 'ms')
+        self.assertEqual(series['x']['values'][0], 1704412800000) # 2024-01-05
+        self.assertEqual(series['y'][0]['values'], [-3.5, 2500.0, -42.99, 12.0])
+
+        # A zoomed window (2024-01-10 to 2024-02-10) is answered instead of rejected
+        response = client.get(url, {'x': 'Date', 'y': 'Amount', 'x_min': 1704844800000, 'x_max': 1707523200000})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['y'][0]['values'], [2500.0, -42.99])
+
+    def test_text_dates_that_do_not_parse_stay_text(self):
+        client = Client()
+        dataset_id = self.upload(client, "Date,Amount\n2024-01-05,1\nsoon,2\n")
+        series = client.get(reverse('visualizer:dataset_series', args=[dataset_id]), {'x': 'Date', 'y': 'Amount'}).json()
+        self.assertEqual(series['x']['categories'], ['2024-01-05', 'soon'])
+
+
+def _zip(parts, first=None):
+    """A ZIP container with the given {name: text} parts; first is stored uncompressed before them (like ODS mimetype)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        if first is not None:
+            archive.writestr(zipfile.ZipInfo(first[0]), first[1], compress_type=zipfile.ZIP_STORED)
+        for name, text in parts.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+
+def _ooxml(folder, main_part):
+    """An Office Open XML package laid out like Office writes it: [Content_Types].xml, _rels, then the document parts."""
+    return _zip({'[Content_Types].xml': '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>',
+                 '_rels/.rels': '<Relationships/>', 'docProps/app.xml': '<Properties/>', f'{folder}/{main_part}': '<document/>'})
+
+
+def _openpyxl_workbook():
+    buffer = io.BytesIO()
+    workbook = openpyxl.Workbook()
+    workbook.active.append(['Date', 'Amount'])
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _xlsxwriter_workbook():
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {'in_memory': True})
+    workbook.add_worksheet().write_row(0, 0, ['Date', 'Amount'])
+    workbook.close()
+    return buffer.getvalue()
+
+
+class FormatDetectionTests(SimpleTestCase):
+    """Upload format sniffing (file_handlers.converters.detect) over a corpus of small files."""
+
+    SPREADSHEETML_BODY = ('<Workbook xmlns="urn:schemas-microsoft-com:office:spreadsheet">'
+                          '<Worksheet><Table><Row><Cell><Data>Date</Data></Cell></Row></Table></Worksheet></Workbook>')
+    CORPUS = [
+        # (name, content, extension, expected format)
+        ('xlsx (openpyxl)', _openpyxl_workbook(), '.xlsx', XLSX),
+        ('xlsx (xlsxwriter)', _xlsxwriter_workbook(), '.xlsx', XLSX),
+        ('xlsx without extension', _openpyxl_workbook(), None, XLSX),
+        ('xlsx named .bin', _xlsxwriter_workbook(), '.bin', XLSX),
+        ('Office-style xlsx', _ooxml('xl', 'workbook.xml'), None, XLSX),
+        ('docx', _ooxml('word', 'document.xml'), '.docx', None),
+        ('docx named .xlsx', _ooxml('word', 'document.xml'), '.xlsx', None),
+        ('pptx named .xlsx', _ooxml('ppt', 'presentation.xml'), '.xlsx', None),
+        ('ods', _zip({'content.xml': '<office:document-content/>'}, first=('mimetype', 'application/vnd.oasis.opendocument.spreadsheet')), '.ods', ODS),
+        ('ods without extension', _zip({'content.xml': '<x/>'}, first=('mimetype', 'application/vnd.oasis.opendocument.spreadsheet')), None, ODS),
+        ('zip named .xlsx', _zip({'data.txt': 'x'}), '.xlsx', XLSX),
+        ('zip', _zip({'data.txt': 'x'}), '.zip', None),
+        ('xls', b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + bytes(504), '.xls', XLS),
+        ('csv', STATEMENT_CSV.encode('utf-8'), '.csv', CSV),
+        ('csv without extension', STATEMENT_CSV.encode('utf-8'), None, CSV),
+        ('csv with an unknown extension', STATEMENT_CSV.encode('utf-8'), '.txt', CSV),
+        ('json array', b'[{"Date": "2024-01-05"}]', '.json', JSON),
+        ('json envelope without extension', b'  {"records": []}', None, JSON),
+        ('json lines', b'{"a": 1}\n{"a": 2}\n', '.jsonl', JSON),
+        ('json named .csv', b'{"a": 1}', '.csv', CSV),
+        ('spreadsheetml (processing instruction)', ('<?xml version="1.0"?>\n<?mso-application progid="Excel.Sheet"?>\n' + SPREADSHEETML_BODY).encode(), '.xml', SPREADSHEETML),
+        ('spreadsheetml (namespace)', SPREADSHEETML_BODY.encode(), '.xml', SPREADSHEETML),
+        ('spreadsheetml in utf-16', '\ufeff<?xml version="1.0"?>'.encode('utf-16-le') + SPREADSHEETML_BODY.encode('utf-16-le'), '.xml', SPREADSHEETML),
+        ('xml', b'<?xml version="1.0"?>\n<transactions><transaction/></transactions>', '.xml', GENERIC_XML),
+        ('xml without extension', b'<transactions><transaction/></transactions>', None, GENERIC_XML),
+        ('binary', bytes(range(256)), None, None),
+        ('empty', b'', None, None),
+    ]
+
+    def test_corpus(self):
+        for name, content, extension, expected in self.CORPUS:
+            with self.subTest(name):
+                self.assertEqual(sniff_format(content[:SNIFF_SIZE], extension), expected)
+
+    def test_sniff_upload_rewinds(self):
+        upload = io.BytesIO(_openpyxl_workbook())
+        self.assertEqual(sniff_upload(upload, '.xlsx'), XLSX)
+        self.assertEqual(upload.tell(), 0)
+
+
+class AmountParsingTests(SimpleTestCase):
+    """parse_amount_column, the column-level counterpart of clean_and_parse_amount."""
+
+    def test_matches_the_scalar_parser(self):
+        values = ['1,234.56', '$1,234.56', '(1,234.56)', '-€5', '£ 7.10', ' 12 ', '+3', '.5', '5.', '1e5', 'inf', 'nan',
+                  '1_000', '- 5', '1.2.3', '(5', '--5', '', '   ', 'abc', None, 7, 2.5, '1234567890123456789']
+        amounts, valid = parse_amount_column(values)
+        for value, amount, ok in zip(values, amounts.tolist(), valid.tolist()):
+            with self.subTest(value=value):
+                expected = clean_and_parse_amount(value)
+                if expected is None or expected != expected:
+                    self.assertFalse(ok)
+                else:
+                    self.assertTrue(ok)
+                    self.assertEqual(amount, expected)
+
+    def test_decimal_comma(self):
+        values = ['1.234,56', '1 234,56', '1\u00a0234,56', '1\u202f234,56', '(1.234,56)', '€ 1 234', '-1 234 567,8', '12,5', '1,2,3']
+        amounts, valid = parse_amount_column(values, decimal_separator=',')
+        self.assertEqual(valid.tolist(), [True] * 8 + [False])
+        self.assertEqual(amounts[:8].tolist(), [1234.56, 1234.56, 1234.56, 1234.56, -1234.56, 1234.0, -1234567.8, 12.5])
+
+
+class TransactionSearchTests(MediaRootTestCase):
+    """The FTS5 index created by migration 0007 follows ingested and deleted transactions."""
+
+    def test_search_finds_ingested_descriptions(self):
+        client = Client()
+        dataset_id = self.upload(client)
+        url = reverse('visualizer:transaction_search', args=[dataset_id])
+        self.assertEqual(client.get(url, {'q': 'amaz'}).json()['count'], 1)
+        self.assertEqual(client.get(url, {'q': '"coffee shop"'}).json()['count'], 1)
+        self.assertEqual(client.get(url, {'q': 'rent'}).json()['count'], 0)
+
+        DatasetRecord.objects.get(pk=dataset_id).delete()
+        self.upload(client, "Date,Description,Amount\n2024-03-01,Rent,-900\n")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM visualizer_transaction_fts WHERE visualizer_transaction_fts MATCH 'amazon'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class UploadHashingTests(MediaRootTestCase):
+    """Uploads are hashed by the upload handlers while they are received, not read again to be hashed."""
+
+    def test_upload_is_hashed_while_received(self):
+        # In memory, then in a temporary file; distinct contents, so the parse cache is not used
+        for max_memory_size, extra_row in ((2621440, "2024-03-01,Rent,DEBIT,-900\n"), (16, "2024-03-02,Gas,DEBIT,-60\n")):
+            content = STATEMENT_CSV + extra_row
+            with self.subTest(max_memory_size=max_memory_size), override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=max_memory_size):
+                with mock.patch('visualizer.conversion.hash_upload', side_effect=AssertionError("upload read again to hash it")):
+                    dataset_id = self.upload(Client(), content)
+                self.assertEqual(DatasetRecord.objects.get(pk=dataset_id).content_hash, hash_upload(io.BytesIO(content.encode('utf-8'))))
+
+
+@override_settings(CONVERSION_JOB_STALE_SECONDS=60)
+class StaleJobTests(TestCase):
+    """Only running jobs without progress for CONVERSION_JOB_STALE_SECONDS are reported as failed."""
+
+    def job(self, status, idle_seconds):
+        job = ConversionJob.objects.create(status=status)
+        # updated_at is set on every save; backdate it with an update
+        ConversionJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - datetime.timedelta(seconds=idle_seconds))
+        return ConversionJob.objects.get(pk=job.pk)
+
+    def test_running_job_without_progress_expires(self):
+        job = expire_if_stale(self.job(ConversionJob.RUNNING, 61))
+        self.assertEqual(job.status, ConversionJob.FAILED)
+        self.assertEqual(ConversionJob.objects.get(pk=job.pk).status, ConversionJob.FAILED)
+
+    def test_running_job_with_recent_progress_is_kept(self):
+        self.assertEqual(expire_if_stale(self.job(ConversionJob.RUNNING, 30)).status, ConversionJob.RUNNING)
+
+    def test_queued_job_is_never_expired(self):
+        self.assertEqual(expire_if_stale(self.job(ConversionJob.QUEUED, 3600)).status, ConversionJob.QUEUED)
+
+
+class CSVConverterTests(SimpleTestCase):
+    """CSV uploads are decoded incrementally; chunk boundaries must not change the result."""
+
+    CONTENT = ('\ufeffDate,Description,Amount\r\n'
+               '2024-01-05,"Café ""Le Nord"", Paris",-3.50\r\n'
+               '\r\n'
+               '2024-01-06,"two\r\nlines","$1,234.56"\r\n'
+               '2024-01-07,Short row\r\n'
+               '2024-01-08,€ – ünïcödé,(12.00)')
+
+    def test_chunk_boundaries(self):
+        data = self.CONTENT.encode('utf-8')
+        expected = None
+        # Every chunk size up to a few bytes splits BOM, multi-byte characters, CRLF and quoted newlines
+        for chunk_size in [1, 2, 3, 4, 5, 7, 64, len(data)]:
+            with self.subTest(chunk_size=chunk_size):
+                header_list, dataset, error_message = csv_chunks_to_list_of_dicts(_chunked(data, chunk_size))
+                self.assertIsNone(error_message)
+                self.assertEqual(header_list, ['Date', 'Description', 'Amount'])
+                rows = list(dataset)
+                if expected is None:
+                    expected = rows
+                self.assertEqual(rows, expected)
+
+        self.assertEqual([row['Description'] for row in expected],
+                         ['Café "Le Nord", Paris', 'two\r\nlines', 'Short row', '€ – ünïcödé'])
+        self.assertEqual([row['Amount'] for row in expected], [-3.5, 1234.56, None, -12.0])
+        self.assertEqual(dataset.column('Date').kind, 'date')
+
+    def test_long_lines(self):
+        # A line spread over many chunks, and a file that never ends its last line
+        description = 'x' * 200_000
+        data = f"Date,Description\n2024-01-05,{description}\n2024-01-06,{description}".encode('utf-8')
+        lines = list(iter_decoded_lines(_chunked(data, 1000)))
+        self.assertEqual(lines, ['Date,Description\n', f"2024-01-05,{description}\n", f"2024-01-06,{description}"])
+
+    def test_other_encodings(self):
+        data = 'Date,Description\n2024-01-05,Crème brûlée\n'.encode('latin-1')
+        header_list, dataset, error_message = csv_chunks_to_list_of_dicts(_chunked(data, 3), encoding='latin-1')
+        self.assertIsNone(error_message)
+        self.assertEqual(list(dataset)[0]['Description'], 'Crème brûlée')
+
+    def test_empty_upload(self):
+        header_list, dataset, error_message = csv_chunks_to_list_of_dicts([b'\r\n', b'  \n'])
+        self.assertEqual(error_message, "CSV file is empty or contains only empty rows.")
+
+
+def _spreadsheetml(*worksheets):
+    """A SpreadsheetML 2003 document with one worksheet per list of rows (a row is a list of cell XML snippets)."""
+    parts = ['<?xml version="1.0"?>\n<Workbook xmlns="urn:schemas-microsoft-com:office:spreadsheet" '
+             'xmlns:ss="urn:schemas-microsoft-com:office:spreadsheet">']
+    for number, rows in enumerate(worksheets, 1):
+        parts.append(f'<Worksheet ss:Name="Sheet{number}"><Table>')
+        parts.extend('<Row>' + ''.join(cells) + '</Row>' for cells in rows)
+        parts.append('</Table></Worksheet>')
+    parts.append('</Workbook>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+def _ss_cell(value, data_type='String', index=None):
+    index_attribute = f' ss:Index="{index}"' if index else ''
+    return f'<Cell{index_attribute}><Data ss:Type="{data_type}">{value}</Data></Cell>'
+
+
+class SpreadsheetMLConverterTests(SimpleTestCase):
+    """Bank exports in Excel 2003 XML: title rows, ss:Index gaps and summary rows around the data."""
+
+    def test_rows_after_header(self):
+        content = _spreadsheetml([
+            [_ss_cell('Account statement')],
+            [_ss_cell(header) for header in ['Posting date', 'Description', 'Type', 'Amount', 'Reconcile']],
+            [_ss_cell('2024-01-05T00:00:00', 'DateTime'), _ss_cell('Coffee &amp; cake'), _ss_cell('DEBIT'), _ss_cell('-4.5', 'Number')],
+            # ss:Index skips the empty Description and Type cells
+            [_ss_cell('2024-01-06T00:00:00', 'DateTime'), _ss_cell('2500', 'Number', index=4), _ss_cell('Y')],
+            [_ss_cell('Total'), _ss_cell('2495.5', 'Number', index=4)],
+        ], [
+            [_ss_cell(header) for header in ['Posting date', 'Description', 'Type', 'Amount']],
+            [_ss_cell('2024-02-01T00:00:00', 'DateTime'), _ss_cell('Other sheet'), _ss_cell('DEBIT'), _ss_cell('-1', 'Number')],
+        ])
+
+        header_list, dataset, error_message = spreadsheetml_to_list_of_dicts(content)
+        self.assertIsNone(error_message)
+        self.assertEqual(header_list, ['Posting date', 'Description', 'Type', 'Amount', 'Reconcile'])
+        self.assertEqual(list(dataset), [
+            {'Posting date': '2024-01-05', 'Description': 'Coffee & cake', 'Type': 'DEBIT', 'Amount': -4.5, 'Reconcile': ''},
+            {'Posting date': '2024-01-06', 'Description': '', 'Type': '', 'Amount': 2500.0, 'Reconcile': 'Y'},
+        ])
+        # The same result from a file-like object (the upload path)
+        self.assertEqual(list(spreadsheetml_to_list_of_dicts(io.BytesIO(content))[1]), list(dataset))
+
+    def test_errors(self):
+        no_header = _spreadsheetml([[_ss_cell('Date'), _ss_cell('Value')], [_ss_cell('01/05/2024'), _ss_cell('1', 'Number')]])
+        self.assertEqual(spreadsheetml_to_list_of_dicts(no_header)[2], "SpreadsheetML header row not found.")
+
+        no_rows = _spreadsheetml([[_ss_cell(header) for header in ['Posting date', 'Description', 'Amount']]])
+        self.assertEqual(spreadsheetml_to_list_of_dicts(no_rows)[2], "No data rows found after header in SpreadsheetML.")
+
+        # Cut off inside the first data row
+        truncated = no_rows.replace(b'</Table>', b'<Row><Cell><Data ss:Type="String">2024-01-05')
+        with self.assertLogs('file_handlers.converters.xml', 'ERROR'):
+            header_list, dataset, error_message = spreadsheetml_to_list_of_dicts(truncated[:truncated.index(b'2024-01-05') + 10])
+        self.assertTrue(error_message.startswith("Error parsing XML as SpreadsheetML"))
+        self.assertEqual((header_list, dataset), ([], []))
+
+
+def _ods(*tables):
+    """An ODS archive whose content.xml holds one table per string of table:table-row XML."""
+    content = ('<?xml version="1.0" encoding="UTF-8"?>'
+               '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+               'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+               'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"><office:body><office:spreadsheet>'
+               + ''.join(f'<table:table table:name="Sheet{number}">{rows}</table:table>' for number, rows in enumerate(tables, 1))
+               + '</office:spreadsheet></office:body></office:document-content>')
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('mimetype', 'application/vnd.oasis.opendocument.spreadsheet', compress_type=zipfile.ZIP_STORED)
+        archive.writestr('content.xml', content, compress_type=zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+def _ods_text(text, repeat=1):
+    return f'<table:table-cell table:number-columns-repeated="{repeat}" office:value-type="string"><text:p>{text}</text:p></table:table-cell>'
+
+
+def _ods_number(number):
+    return f'<table:table-cell office:value-type="float" office:value="{number}"><text:p>{number}</text:p></table:table-cell>'
+
+
+def _ods_date(date_value):
+    return f'<table:table-cell office:value-type="date" office:date-value="{date_value}"><text:p>{date_value}</text:p></table:table-cell>'
+
+
+# Formatted but empty cells and rows, as spreadsheet applications write them up to the sheet's last column and row
+ODS_EMPTY_CELLS = '<table:table-cell table:number-columns-repeated="16368"/>'
+ODS_EMPTY_ROWS = f'<table:table-row table:number-rows-repeated="1048560">{ODS_EMPTY_CELLS}</table:table-row>'
+
+
+def _ods_row(*cells, repeat=1):
+    return f'<table:table-row table:number-rows-repeated="{repeat}">{"".join(cells)}{ODS_EMPTY_CELLS}</table:table-row>'
+
+
+class ODSConverterTests(SimpleTestCase):
+    """The zip + iterparse ODS reader: repeated cells and rows, merged cells, typed values and sheet selection."""
+
+    STATEMENT = (_ods_row(_ods_text('Posting date'), _ods_text('Description'), _ods_text('Amount'))
+                 + _ods_row(_ods_date('2024-01-05'), _ods_text('Coffee<text:s text:c="2"/>shop'), _ods_number(-3.5))
+                 + _ods_row(_ods_date('2024-01-06T09:30:00'), _ods_text('Standing order'), _ods_number(100), repeat=2)
+                 # A merged cell: the covered cell still takes up a column (no Amount under the header, so not kept)
+                 + _ods_row(_ods_text('01/07/2024'), '<table:table-cell table:number-columns-spanned="2" office:value-type="string">'
+                            '<text:p>Long</text:p><text:p>text</text:p></table:table-cell>', '<table:covered-table-cell/>', _ods_text('£12.00'))
+                 + _ods_row(_ods_text('not a date'), _ods_text('Skipped'), _ods_number(1))
+                 + _ods_row(_ods_date('2024-01-08'))
+                 + ODS_EMPTY_ROWS)
+
+    def test_rows(self):
+        rows = list(iter_ods_rows(_ods(self.STATEMENT)))
+        self.assertEqual(rows[0], ['Posting date', 'Description', 'Amount'])
+        self.assertEqual(rows[1], [datetime.date(2024, 1, 5), 'Coffee  shop', -3.5])
+        self.assertEqual(rows[2], [datetime.datetime(2024, 1, 6, 9, 30), 'Standing order', 100])
+        self.assertEqual(rows[2], rows[3])
+        self.assertEqual(rows[4], ['01/07/2024', 'Long\ntext', None, '£12.00'])
+        # The repeated empty rows and columns are never expanded
+        self.assertEqual(len(rows), 7)
+
+    def test_statement(self):
+        header_list, dataset, error_message = ods_to_list_of_dicts(_ods(self.STATEMENT))
+        self.assertIsNone(error_message)
+        self.assertEqual(header_list, ['Posting date', 'Description', 'Amount'])
+        self.assertEqual(list(dataset), [
+            {'Date': '2024-01-05', 'Amount': -3.5},
+            {'Date': '2024-01-06', 'Amount': 100.0},
+            {'Date': '2024-01-06', 'Amount': 100.0},
+        ])
+
+    def test_typed_cells_without_a_value(self):
+        # Written by some generators: the value type without office:value / office:date-value
+        content = _ods(_ods_row(_ods_text('Date'), _ods_text('Amount'))
+                       + _ods_row('<table:table-cell office:value-type="date"><text:p>2024-01-05</text:p></table:table-cell>',
+                                  '<table:table-cell office:value-type="currency"><text:p>-3.50</text:p></table:table-cell>')
+                       + _ods_row(_ods_date('2024-01-06'), '<table:table-cell office:value-type="float"/>'))
+        self.assertEqual(list(iter_ods_rows(content))[1:], [['2024-01-05', '-3.50'], [datetime.date(2024, 1, 6)]])
+        header_list, dataset, error_message = ods_to_list_of_dicts(content)
+        self.assertIsNone(error_message)
+        self.assertEqual(list(dataset), [{'Date': '2024-01-05', 'Amount': -3.5}])
+
+    def test_sheet_index(self):
+        second = _ods_row(_ods_text('Date'), _ods_text('Value')) + _ods_row(_ods_date('2024-03-01'), _ods_number(7.25))
+        content = _ods(self.STATEMENT, second)
+        self.assertEqual(list(ods_to_list_of_dicts(content, sheet_index=1)[1]), [{'Date': '2024-03-01', 'Amount': 7.25}])
+        self.assertEqual(list(iter_ods_rows(content, sheet_index=2)), [])
+
+    def test_errors(self):
+        self.assertEqual(ods_to_list_of_dicts(_ods(ODS_EMPTY_ROWS))[2], "ODS sheet is empty.")
+        no_amount = _ods(_ods_row(_ods_text('Date'), _ods_text('Description')))
+        self.assertTrue(ods_to_list_of_dicts(no_amount)[2].startswith("Could not find required 'Date' or 'Amount' columns"))
+        with self.assertLogs('file_handlers.converters.ods_handler', 'ERROR'):
+            header_list, dataset, error_message = ods_to_list_of_dicts(b'PK\x03\x04 not a zip')
+        self.assertTrue(error_message.startswith("An unexpected error occurred during ODS processing"))
+
+
+class TableAPITests(MediaRootTestCase):
+    """Sorting, filtering and cursor pagination of the data table API over the whole dataset."""
+
+    CONTENT = STATEMENT_CSV + "2024-03-01,Pending,DEBIT,\n"
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.url = reverse('visualizer:dataset_rows', args=[self.upload(self.client, self.CONTENT)])
+
+    def rows(self, params, column='Description'):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        page = response.json()
+        return [row[page['columns'].index(column)] for row in page['rows']]
+
+    def test_first_page(self):
+        page = self.client.get(self.url).json()
+        self.assertEqual(page['columns'], ['Date', 'Description', 'Type', 'Amount'])
+        self.assertEqual(page['rows'][0], ['2024-01-05', 'Coffee shop', 'DEBIT', -3.5])
+        self.assertEqual((page['total'], page['dataset_total'], page['next_cursor']), (5, 5, None))
+        self.assertEqual(self.rows({'columns': ['Amount', 'Date'], 'offset': 3}, 'Date'), ['2024-02-14', '2024-03-01'])
+
+    def test_sort(self):
+        # Missing cells come last in both orders
+        self.assertEqual(self.rows({'sort': 'Amount'}, 'Amount'), [-42.99, -3.5, 12.0, 2500.0, None])
+        self.assertEqual(self.rows({'sort': 'Amount', 'order': 'desc'}, 'Amount'), [2500.0, 12.0, -3.5, -42.99, None])
+        self.assertEqual(self.rows({'sort': 'Description'}), ['Amazon order', 'Coffee shop', 'Pending', 'Refund', 'Salary'])
+        self.assertEqual(self.rows({'sort': 'Date', 'order': 'desc', 'limit': 2}), ['Pending', 'Refund'])
+        # Pages of a sorted view at an offset
+        self.assertEqual(self.rows({'sort': 'Amount', 'order': 'desc', 'offset': 3}, 'Amount'), [-42.99, None])
+
+    def test_filter(self):
+        self.assertEqual(self.rows({'filter': 'Type:eq:debit'}), ['Coffee shop', 'Amazon order', 'Pending'])
+        self.assertEqual(self.rows({'filter': ['Date:gte:2024-02-01', 'Amount:lt:0']}), ['Amazon order'])
+        self.assertEqual(self.rows({'filter': 'Description:contains:ORDER'}), ['Amazon order'])
+        self.assertEqual(self.rows({'filter': 'Amount:empty'}), ['Pending'])
+        self.assertEqual(self.rows({'filter': 'Amount:ne:12'}), ['Coffee shop', 'Salary', 'Amazon order'])
+        self.assertEqual(self.rows({'filter': 'Type:eq:CREDIT', 'sort': 'Amount', 'order': 'desc'}), ['Salary', 'Refund'])
+        self.assertEqual(self.client.get(self.url, {'filter': 'Type:eq:TRANSFER'}).json()['total'], 0)
+
+    def test_cursor_keeps_the_view(self):
+        params = {'limit': 1, 'sort': 'Amount', 'order': 'desc', 'filter': 'Type:eq:DEBIT'}
+        descriptions = []
+        while True:
+            page = self.client.get(self.url, params).json()
+            self.assertEqual(page['total'], 3)
+            descriptions.extend(row[1] for row in page['rows'])
+            if page['next_cursor'] is None:
+                break
+            params = {'limit': 1, 'cursor': page['next_cursor']}
+        self.assertEqual(descriptions, ['Coffee shop', 'Amazon order', 'Pending'])
+
+    def test_invalid_requests(self):
+        for params in [{'limit': 0}, {'limit': 'ten'}, {'offset': -1}, {'order': 'up', 'sort': 'Amount'},
+                       {'sort': 'Balance'}, {'columns': 'Balance'}, {'cursor': 'not-a-cursor'},
+                       {'filter': 'Amount'}, {'filter': 'Amount:lt'}, {'filter': 'Amount:lt:cheap'},
+                       {'filter': 'Amount:contains:1'}, {'filter': 'Date:gte:01/02/2024'}]:
+            with self.subTest(params=params), self.assertLogs('django.request', 'WARNING'):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+class SeriesDownsamplingTests(SimpleTestCase):
+    """Chart viewports: the rows within [x_min, x_max], downsampled to at most max_points."""
+
+    ROWS = 5000
+    FIRST_DAY = 19000 # 2022-01-08
+
+    def setUp(self):
+        directory = tempfile.mkdtemp(prefix='datavis_test_')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        rng = np.random.default_rng(0)
+        days = self.FIRST_DAY + np.arange(self.ROWS, dtype=np.int64)
+        amount = np.sin(np.arange(self.ROWS) / 50) * 100 + rng.normal(0, 5, self.ROWS)
+        amount[1234], amount[3456] = 10_000, -10_000 # Spikes a downsampled chart must keep
+        balance = np.cumsum(rng.normal(0, 1, self.ROWS))
+        balance[4321] = 5_000
+        amount_valid = np.ones(self.ROWS, dtype=bool)
+        amount_valid[2000:2100] = False
+        # Stored out of date order: the viewport follows the Date sort order, not the file order
+        self.order = rng.permutation(self.ROWS)
+        dataset = Dataset(['Date', 'Amount', 'Balance', 'Label'], {
+            'Date': Column('Date', DATE, days[self.order], np.ones(self.ROWS, dtype=bool)),
+            'Amount': Column('Amount', FLOAT, amount[self.order], amount_valid[self.order]),
+            'Balance': Column('Balance', FLOAT, balance[self.order], np.ones(self.ROWS, dtype=bool)),
+            'Label': Column('Label', STRING, np.zeros(self.ROWS, dtype=np.int32), np.ones(self.ROWS, dtype=bool), ['x']),
+        })
+        path = os.path.join(directory, 'statement.dvcols')
+        save_dataset(dataset, path)
+        self.stored = open_dataset(path)
+
+    def days(self, rows):
+        """Day offsets (0..ROWS - 1) of stored rows."""
+        return (self.stored.column_array('Date')[0][rows] - self.FIRST_DAY).tolist()
+
+    def test_bounds_and_extremes(self):
+        for method in ('lttb', 'minmax'):
+            for max_points in (3, 4, 100, 1000):
+                with self.subTest(method=method, max_points=max_points):
+                    rows, total = downsample_rows(self.stored, 'Date', ['Amount'], max_points=max_points, method=method)
+                    self.assertEqual(total, self.ROWS)
+                    self.assertLessEqual(len(rows), max_points)
+                    days = self.days(rows)
+                    self.assertEqual(days, sorted(set(days)))
+                    self.assertTrue(set(days).isdisjoint(range(2000, 2100))) # Missing amounts are never points
+                    if max_points >= 4:
+                        self.assertTrue({1234, 3456} <= set(days))
+                    if max_points >= 100:
+                        self.assertEqual((days[0], days[-1]), (0, self.ROWS - 1))
+
+    def test_every_y_column_keeps_its_extremes(self):
+        for method in ('lttb', 'minmax'):
+            with self.subTest(method=method):
+                rows, total = downsample_rows(self.stored, 'Date', ['Amount', 'Balance', 'Amount'], max_points=200, method=method)
+                self.assertLessEqual(len(rows), 200)
+                self.assertTrue({1234, 3456, 4321} <= set(self.days(rows)))
+
+    def test_viewport(self):
+        x_min, x_max = (self.FIRST_DAY + 1000) * MS_PER_DAY, (self.FIRST_DAY + 1999) * MS_PER_DAY
+        rows, total = downsample_rows(self.stored, 'Date', ['Amount'], x_min=x_min, x_max=x_max, max_points=5000)
+        # Bounds are inclusive; a viewport under max_points is returned whole, in x order
+        self.assertEqual(total, 1000)
+        self.assertEqual(self.days(rows), list(range(1000, 2000)))
+
+        rows, total = downsample_rows(self.stored, 'Date', ['Amount'], x_min=x_min, x_max=x_max, max_points=50)
+        self.assertEqual((total, len(rows) <= 50), (1000, True))
+        self.assertIn(1234, self.days(rows))
+        self.assertTrue(all(1000 <= day < 2000 for day in self.days(rows)))
+
+        # Open-ended and empty viewports
+        self.assertEqual(downsample_rows(self.stored, 'Date', ['Amount'], x_min=(self.FIRST_DAY + 4990) * MS_PER_DAY)[1], 10)
+        self.assertEqual(downsample_rows(self.stored, 'Date', ['Amount'], x_max=self.FIRST_DAY * MS_PER_DAY - 1)[1], 0)
+        self.assertEqual(downsample_rows(self.stored, 'Date', ['Amount'], x_min=x_max, x_max=x_min)[1], 0)
+
+    def test_repeated_calls_read_the_saved_extremes(self):
+        first = downsample_rows(self.stored, 'Date', ['Amount'], max_points=20)[0]
+        import visualizer.series
+        with mock.patch.object(visualizer.series, '_numeric_values', wraps=visualizer.series._numeric_values) as numeric_values:
+            again = downsample_rows(self.stored, 'Date', ['Amount'], max_points=20)[0]
+        self.assertEqual(first.tolist(), again.tolist())
+        # Only the block extremes saved by the first call are read, not the whole column
+        self.assertLess(max(len(call.args[2]) for call in numeric_values.call_args_list), self.ROWS // 4)
+
+    def test_invalid_arguments(self):
+        with self.assertRaisesMessage(ValueError, "'max_points' must be at least 3 per y column (6 for 2 columns)."):
+            downsample_rows(self.stored, 'Date', ['Amount', 'Balance'], max_points=5)
+        with self.assertRaisesMessage(ValueError, "x_min and x_max need a numeric or date x column"):
+            downsample_rows(self.stored, 'Label', ['Amount'], x_min=0)
+        with self.assertRaises(ValueError):
+            downsample_rows(self.stored, 'Date', ['Missing'])
+
+
+class SeriesWindowAPITests(MediaRootTestCase):
+    """Downsampling parameters of the series API."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.url = reverse('visualizer:dataset_series', args=[self.upload(self.client)])
+
+    def test_window(self):
+        response = self.client.get(self.url, {'x': 'Date', 'y': 'Amount', 'max_points': 3, 'method': 'minmax'})
+        self.assertEqual(response.status_code, 200)
+        window = response.json()['window']
+        # One min/max bucket: the largest and smallest amounts
+        self.assertEqual((window['total'], window['returned'], window['max_points'], window['method']), (4, 2, 3, 'minmax'))
+        self.assertEqual(response.json()['y'][0]['values'], [2500.0, -42.99])
+
+        january = {'x': 'Date', 'y': 'Amount', 'x_min': 1704412800000, 'x_max': 1706659200000} # 2024-01-05 to 2024-01-31
+        window = self.client.get(self.url, january).json()['window']
+        self.assertEqual((window['total'], window['returned'], window['method']), (2, 2, 'lttb'))
+
+    def test_invalid_parameters(self):
+        for params in [{'max_points': 2}, {'max_points': 20001}, {'max_points': 'many'}, {'method': 'average'},
+                       {'x_min': 'yesterday'}, {'x_max': 'inf'}, {'x_min': 'nan'},
+                       {'y': ['Amount', 'Amount', 'Date'], 'max_points': 5}]:
+            with self.subTest(params=params), self.assertLogs('django.request', 'WARNING'):
+                response = self.client.get(self.url, {'x': 'Date', 'y': 'Amount', **params})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+class XLSXExportTests(SimpleTestCase):
+    """write_xlsx: native date and amount cells, and the split across worksheets."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='datavis_test_')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def export(self, dataset, rows_per_sheet):
+        path = os.path.join(self.directory, 'statement.dvcols')
+        save_dataset(dataset, path)
+        xlsx_path = os.path.join(self.directory, 'statement.xlsx')
+        sheet_count = write_xlsx(open_dataset(path), xlsx_path, rows_per_sheet=rows_per_sheet)
+        return sheet_count, openpyxl.load_workbook(xlsx_path)
+
+    def test_rows_per_sheet(self):
+        rows = 5
+        dataset = Dataset(['Date', 'Description', 'Amount', 'Posting date'], {
+            'Date': Column('Date', DATE, 19727 + np.arange(rows, dtype=np.int64), np.ones(rows, dtype=bool)), # From 2024-01-05
+            'Description': Column('Description', STRING, np.array([0, 1, 0, 1, 0], dtype=np.int32), np.ones(rows, dtype=bool), ['Coffee', 'Salary']),
+            'Amount': Column('Amount', FLOAT, np.array([-3.5, 2500.0, 0.0, 1234.5, -42.99]), np.array([True, True, False, True, True])),
+            # Dates stored as text are still written as date cells; text that is not a date stays text
+            'Posting date': Column('Posting date', STRING, np.array([0, 1, 0, 1, 2], dtype=np.int32), np.ones(rows, dtype=bool),
+                                   ['2024-02-01', '2024-02-02', 'pending']),
+        })
+        sheet_count, workbook = self.export(dataset, rows_per_sheet=2)
+
+        self.assertEqual(sheet_count, 3)
+        self.assertEqual(workbook.sheetnames, ['Sheet1', 'Sheet2', 'Sheet3'])
+        cells = [row for sheet in workbook for row in sheet.iter_rows()]
+        headers = [cells[i] for i in (0, 3, 6)]
+        for header in headers:
+            self.assertEqual([cell.value for cell in header], ['Date', 'Description', 'Amount', 'Posting date'])
+            self.assertTrue(header[0].font.bold)
+        data = [row for i, row in enumerate(cells) if i not in (0, 3, 6)]
+        self.assertEqual(len(data), rows)
+
+        self.assertEqual([row[0].value for row in data], [datetime.datetime(2024, 1, 5 + i) for i in range(rows)])
+        self.assertTrue(all(row[0].is_date and row[0].number_format == DATE_FORMAT for row in data))
+        self.assertEqual([row[1].value for row in data], ['Coffee', 'Salary', 'Coffee', 'Salary', 'Coffee'])
+        self.assertEqual([row[1].data_type for row in data], ['s'] * rows)
+        self.assertEqual([row[2].value for row in data], [-3.5, 2500, None, 1234.5, -42.99])
+        self.assertTrue(all(row[2].data_type == 'n' and row[2].number_format == AMOUNT_FORMAT for row in data if row[2].value is not None))
+        self.assertEqual([row[3].value for row in data], [datetime.datetime(2024, 2, 1), datetime.datetime(2024, 2, 2),
+                                                          datetime.datetime(2024, 2, 1), datetime.datetime(2024, 2, 2), 'pending'])
+        self.assertEqual(data[0][3].number_format, DATE_FORMAT)
+
+    def test_empty_dataset(self):
+        dataset = Dataset(['Date', 'Amount'], {
+            'Date': Column('Date', DATE, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)),
+            'Amount': Column('Amount', FLOAT, np.zeros(0), np.zeros(0, dtype=bool)),
+        })
+        sheet_count, workbook = self.export(dataset, rows_per_sheet=2)
+        self.assertEqual((sheet_count, workbook.sheetnames), (1, ['Sheet1']))
+        self.assertEqual([[cell.value for cell in row] for row in workbook['Sheet1'].iter_rows()], [['Date', 'Amount']])
+
+
+def _decode_binary_series(body):
+    """Decodes a format=binary series body into (header, {column name: (values, valid or None)})."""
+    magic, header_length = struct.unpack_from('<4sI', body)
+    assert magic == BINARY_MAGIC, magic
+    start = 8 + header_length
+    assert start % BINARY_ALIGNMENT == 0, start
+    header = json.loads(body[8:start])
+    buffers = memoryview(body)[start:]
+
+    def array(entry):
+        assert entry['offset'] % BINARY_ALIGNMENT == 0, entry
+        return np.frombuffer(buffers[entry['offset']:entry['offset'] + entry['size']], dtype=entry['dtype'])
+
+    columns = {}
+    for description in [header['x'], *header['y']]:
+        valid = array(description['valid']).astype(bool) if 'valid' in description else None
+        columns[description['name']] = (array(description['values']), valid)
+    return header, columns
+
+
+class BinarySeriesTests(MediaRootTestCase):
+    """The format=binary series layout: magic, header length, aligned buffers and validity masks."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.url = reverse('visualizer:dataset_series', args=[self.upload(self.client, STATEMENT_CSV + "2024-03-01,Pending,DEBIT,\n")])
+
+    def get(self, params):
+        response = self.client.get(self.url, {'format': 'binary', **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        return _decode_binary_series(body)
+
+    def test_date_x(self):
+        header, columns = self.get({'x': 'Date', 'y': ['Amount', 'Date']})
+        self.assertEqual(header['length'], 5)
+        self.assertEqual((header['x']['kind'], header['x']['unit'], header['x']['values']['dtype']), ('date', 'day', 'int64'))
+        days, valid = columns['Date']
+        self.assertIsNone(valid) # No mask when no value is missing
+        self.assertEqual((days[0], days[-1]), (19727, 19783)) # 2024-01-05 and 2024-03-01
+
+        amounts, valid = columns['Amount']
+        self.assertEqual(header['y'][0]['values']['dtype'], 'float64')
+        self.assertEqual(valid.tolist(), [True, True, True, True, False])
+        self.assertEqual(amounts[valid].tolist(), [-3.5, 2500.0, -42.99, 12.0])
+        self.assertNotIn('window', header)
+
+    def test_text_x(self):
+        header, columns = self.get({'x': 'Description', 'y': 'Amount'})
+        self.assertEqual((header['x']['kind'], header['x']['values']['dtype']), ('string', 'int32'))
+        codes, valid = columns['Description']
+        self.assertIsNone(valid)
+        self.assertEqual([header['x']['categories'][code] for code in codes],
+                         ['Coffee shop', 'Salary', 'Amazon order', 'Refund', 'Pending'])
+
+    def test_downsampled(self):
+        header, columns = self.get({'x': 'Date', 'y': 'Amount', 'max_points': 3, 'method': 'minmax'})
+        # Five rows in the viewport; the one without an amount is never a point
+        self.assertEqual((header['window']['total'], header['window']['returned'], header['length']), (5, 2, 2))
+        self.assertEqual(columns['Amount'][0].tolist(), [2500.0, -42.99])
+        self.assertIsNone(columns['Amount'][1])
+
+
+class TransactionAggregationTests(MediaRootTestCase):
+    """Per-bucket sums and counts, with the week and quarter buckets computed in SQLite."""
+
+    CONTENT = (
+        "Date,Description,Type,Amount\n"
+        "2024-03-30,Groceries,DEBIT,-10.00\n" # Saturday
+        "2024-03-31,Salary,CREDIT,100.00\n"   # Sunday: still the week of Monday 2024-03-25, and Q1
+        "2024-04-01,Rent,DEBIT,-20.00\n"      # Monday: a new week, and Q2
+        "2024-04-07,Cinema,DEBIT,-5.00\n"     # Sunday
+        "2024-04-08,Refund,CREDIT,50.00\n"    # Monday
+        "2024-07-01,Fee,DEBIT,-1.00\n"        # Q3
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.url = reverse('visualizer:transaction_aggregate', args=[self.upload(self.client, self.CONTENT)])
+
+    def aggregate(self, bucket, **params):
+        response = self.client.get(self.url, {'bucket': bucket, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_buckets(self):
+        expected = {
+            'day': (['2024-03-30', '2024-03-31', '2024-04-01', '2024-04-07', '2024-04-08', '2024-07-01'],
+                    [-10.0, 100.0, -20.0, -5.0, 50.0, -1.0], [1, 1, 1, 1, 1, 1]),
+            'week': (['2024-03-25', '2024-04-01', '2024-04-08', '2024-07-01'], [90.0, -25.0, 50.0, -1.0], [2, 2, 1, 1]),
+            'month': (['2024-03-01', '2024-04-01', '2024-07-01'], [90.0, 25.0, -1.0], [2, 3, 1]),
+            'quarter': (['2024-01-01', '2024-04-01', '2024-07-01'], [90.0, 25.0, -1.0], [2, 3, 1]),
+            'year': (['2024-01-01'], [114.0], [6]),
+        }
+        for bucket, (labels, sums, counts) in expected.items():
+            with self.subTest(bucket=bucket):
+                result = self.aggregate(bucket)
+                self.assertEqual((result['labels'], result['sum'], result['count']), (labels, sums, counts))
+
+    def test_buckets_by_type(self):
+        expected = {
+            'week': {'DEBIT': ([-10.0, -25.0, None, -1.0], [1, 2, 0, 1]), 'CREDIT': ([100.0, None, 50.0, None], [1, 0, 1, 0])},
+            'quarter': {'DEBIT': ([-10.0, -25.0, -1.0], [1, 2, 1]), 'CREDIT': ([100.0, 50.0, None], [1, 1, 0])},
+        }
+        for bucket, series in expected.items():
+            with self.subTest(bucket=bucket):
+                result = self.aggregate(bucket, by='type')
+                self.assertEqual(len(result['labels']), len(series['DEBIT'][0]))
+                self.assertEqual({entry['type']: (entry['sum'], entry['count']) for entry in result['series']}, series)
+
+    def test_date_bounds(self):
+        # 'from' is inclusive, 'to' exclusive
+        result = self.aggregate('week', **{'from': '2024-03-31', 'to': '2024-04-08'})
+        self.assertEqual((result['labels'], result['sum'], result['count']), (['2024-03-25', '2024-04-01'], [100.0, -25.0], [1, 2]))
+
+
+class ParseCacheTests(SimpleTestCase):
+    """Writes of cache entries and the sweep of the cache directory."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='datavis_test_')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    @staticmethod
+    def dataset(rows, amount):
+        return Dataset(['Amount'], {'Amount': Column('Amount', FLOAT, np.full(rows, float(amount)), np.ones(rows, dtype=bool))})
+
+    def test_concurrent_puts_of_the_same_entry(self):
+        # Identical uploads converted at once by the job threads store the same entry together
+        cache = ParseCache(self.directory)
+        datasets = [self.dataset(500_000 * (i + 1), i) for i in range(4)]
+        writers = [threading.Thread(target=cache.put, args=('abc', 'csv', ['Amount'], dataset)) for dataset in datasets]
+        with self.assertNoLogs('file_handlers.parse_cache', 'ERROR'):
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+
+        header_list, dataset = cache.get('abc', 'csv')
+        amounts = dataset.column('Amount').values
+        # One complete write won; nothing of the others is mixed in or left behind
+        self.assertEqual(len(amounts), 500_000 * (int(amounts[0]) + 1))
+        self.assertTrue((amounts == amounts[0]).all())
+        self.assertEqual(os.listdir(cache.directory), ['abc-csv.dvcols'])
+
+    def test_sweep_removes_other_format_versions(self):
+        for name in ('v1', f"v{CACHE_FORMAT_VERSION + 1}", 'exports'):
+            os.makedirs(os.path.join(self.directory, name))
+            save_dataset(self.dataset(10, 1), os.path.join(self.directory, name, 'old-csv.dvcols'))
+        cache = ParseCache(self.directory)
+        cache.put('abc', 'csv', ['Amount'], self.dataset(10, 1))
+        self.assertEqual(sorted(os.listdir(self.directory)), ['exports', f"v{CACHE_FORMAT_VERSION}"])
+        self.assertEqual(cache.stats()['entries'], 1)
@@ -0,0 +1,40 @@
+# In visualizer/upload_handlers.py
+
+import logging
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+from file_handlers.parse_cache import new_upload_digest
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+
+# Django's upload handlers (settings.FILE_UPLOAD_HANDLERS), extended to hash each file's chunks
+# while they are stored. The digest is the one hash_upload computes, set on the UploadedFile as
+# content_hash, so the parse cache lookup does not read the upload a second time.
+class _ContentHashMixin:
+    def new_file(self, *args, **kwargs):
+        self.digest = new_upload_digest()
+        super().new_file(*args, **kwargs) # May raise StopFutureHandlers
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        if remaining is None: # This handler stored the chunk
+            self.digest.update(raw_data)
+        return remaining
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.content_hash = self.digest.hexdigest()
+            logger.debug(f"Debug in file_complete: Hashed {uploaded_file.name} ({file_size} bytes) while storing it.")
+        return uploaded_file
+
+
+class HashingMemoryFileUploadHandler(_ContentHashMixin, MemoryFileUploadHandler):
+    """Small uploads, kept in memory."""
+
+
+class HashingTemporaryFileUploadHandler(_ContentHashMixin, TemporaryFileUploadHandler):
+    """Larger uploads, written to a temporary file."""
@@ -11,5 +11,14 @@ urlpatterns = [
     #path('convert-to-xlsx/', views.convert_to_xlsx_view, name='convert_to_xlsx'),
     path('visualizer/', views.visualizer_interface, name='visualizer_interface'), # Map to visualizer view
 
-    path('chart', views.chart_only_view, name='chart_only')
+    path('chart', views.chart_only_view, name='chart_only'),
+    path('parse-cache/stats/', views.parse_cache_stats_view, name='parse_cache_stats'),
+    path('api/datasets/<int:dataset_id>/aggregate/', views.transaction_aggregate_view, name='transaction_aggregate'),
+    path('api/datasets/<int:dataset_id>/search/', views.transaction_search_view, name='transaction_search'),
+    path('api/datasets/<int:dataset_id>/rows/', views.dataset_rows_view, name='dataset_rows'),
+    path('api/datasets/<int:dataset_id>/series/', views.dataset_series_view, name='dataset_series'),
+    path('datasets/<int:dataset_id>/export.xlsx', views.dataset_export_view, name='dataset_export'),
+    path('jobs/<uuid:job_id>/', views.conversion_job_view, name='conversion_job'),
+    path('jobs/<uuid:job_id>/status/', views.conversion_job_status_view, name='conversion_job_status'),
+    path('jobs/<uuid:job_id>/events/', views.conversion_job_events_view, name='conversion_job_events'),
 ]
\ No newline at end of file
@@ -4,32 +4,40 @@
 # --------------------
 # 0.1 Standard library imports
 import os
-import io # Used for StringIO
+import gzip # Used to serve cached series to clients that do not accept gzip
 import xml.etree.ElementTree as ET # Used for XML logic fallback (though ideally in converter)
 import json # Used for JSON handling
 import re # Used in the view for file extension check
-from datetime import datetime # Used for type checking if needed (though converters handle most)
+import math # Used to validate the chart series API's bounds
+from datetime import datetime, timezone # Used for type checking and for the aggregation API's date bounds
+import time # Used to pace the conversion job event stream
 import logging # Python's built-in logging module
 
 # 0.2 Django imports
 from django.shortcuts import render, redirect
-from django.http import HttpResponse, JsonResponse # Added JsonResponse import
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse # Added JsonResponse import
+from django.utils.dateparse import parse_date
 from django.conf import settings
+from django.utils.cache import patch_vary_headers
 from django.views.decorators.http import require_POST # Useful decorator for POST-only views
 
 # 0.3 Third-party imports
-import pandas as pd # Used for DataFrame in saving XLSX
-import xlsxwriter # Used for saving XLSX
 # pyexcel is not used directly in views.py anymore with refactored converters
 from .forms import XMLUploadForm # Assuming you have a form for file upload
 
 # Import the specific conversion functions from their new locations
 # Note the path: file_handlers.converters.<module_name>
-from file_handlers.converters.csv import csv_to_list_of_dicts
-from file_handlers.converters.xlsx import xlsx_to_list_of_dicts
-from file_handlers.converters.ods_handler import ods_to_list_of_dicts
-from file_handlers.converters.xml import xml_to_csv_spreadsheetml, generic_xml_to_list_of_dicts
-from file_handlers.converters.json import json_to_list_of_dicts
+from .models import ConversionJob, Dataset as DatasetRecord # Model row tying an upload to its stored columns
+from .conversion import convert_upload, get_parse_cache
+from .jobs import expire_if_stale, submit_conversion
+from .aggregation import aggregate_transactions
+from .search import DEFAULT_SEARCH_LIMIT, search_transactions
+from .export import XLSX_CONTENT_TYPE, download_filename, export_key, get_xlsx_export
+from .table import DEFAULT_PAGE_SIZE, decode_cursor, parse_filter, table_page
+from .series import (CONTENT_TYPES, DEFAULT_MAX_POINTS, DOWNSAMPLE_METHODS, MAX_POINTS_LIMIT, SERIES_FORMATS, build_series,
+                     downsample_rows, encode_series_arrow, encode_series_binary, get_series_file, series_etag)
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
@@ -37,8 +45,8 @@ logger = logging.getLogger(__name__)
 
 # 1.0 View for handling file upload and conversion
 # ------------------------------------------------
-# This view now handles the upload, determines file type, converts data to list of dicts,
-# saves XLSX, stores processed data in session, and redirects to the data table.
+# This view now handles the upload and queues its conversion as a background job
+# (visualizer/jobs.py, visualizer/conversion.py); the job page redirects to the data table.
 # @require_POST # Optional: Decorator to ensure only POST requests are allowed
 def upload_file_view(request):
     # Initialize form for GET requests
@@ -49,6 +57,7 @@ def upload_file_view(request):
         request.session.pop('uploaded_filename', None)
         request.session.pop('extracted_header', None)
         request.session.pop('extracted_data_rows_list_of_dicts', None)
+        request.session.pop('dataset_id', None)
         request.session.pop('conversion_error', None)
         logger.debug("Debug in upload_file_view: GET request - Rendering upload form.")
         return render(request, 'visualizer/upload_form.html', {'form': form})
@@ -63,181 +72,40 @@ def upload_file_view(request):
         request.session.pop('uploaded_filename', None)
         request.session.pop('extracted_header', None)
         request.session.pop('extracted_data_rows_list_of_dicts', None)
+        request.session.pop('dataset_id', None)
         request.session.pop('conversion_error', None)
 
 
         if form.is_valid():
             uploaded_file = form.cleaned_data['xml_file']
-
-            header_list = []
-            list_of_dicts = []
-            error_message = None
-            file_type = None
             uploaded_filename = uploaded_file.name
 
             logger.debug(f"Debug in upload_file_view: Processing file: {uploaded_filename}")
 
-            # --- Determine file type and call appropriate converter ---
-            if uploaded_filename:
-                base_name, extension_with_dot = os.path.splitext(uploaded_filename)
-                file_extension = str(extension_with_dot).lower()
-
-                logger.debug(f"Debug in upload_file_view: File extension: {file_extension}")
-
-                try:
-                    raw_file_content = uploaded_file.read()
-                    logger.debug(f"Debug in upload_file_view: Raw file content type: {type(raw_file_content)}")
-
-                    # --- Handle XLSX files ---
-                    if file_extension in ['.xlsx', '.xls']:
-                        file_type = 'xlsx'
-                        logger.debug("Debug in upload_file_view: Handling XLSX.")
-                        header_list, list_of_dicts, error_message = xlsx_to_list_of_dicts(raw_file_content)
-
-                    # --- Handle CSV files ---
-                    elif file_extension == '.csv':
-                        file_type = 'csv'
-                        logger.debug("Debug in upload_file_view: Handling CSV.")
-                        try:
-                            csv_content_string = raw_file_content.decode('utf-8')
-                            csv_file_like_object = io.StringIO(csv_content_string)
-                            header_list, list_of_dicts, error_message = csv_to_list_of_dicts(csv_file_like_object)
-                        except Exception as e:
-                            error_message = f"Error decoding or processing CSV: {e}"
-                            logger.error(f"Debug in upload_file_view: {error_message}", exc_info=True)
-
-
-                    # --- Handle ODS files ---
-                    elif file_extension == '.ods':
-                        file_type = 'ods'
-                        logger.debug("Debug in upload_file_view: Handling ODS.")
-                        header_list, list_of_dicts, error_message = ods_to_list_of_dicts(raw_file_content)
-
-
-                    # --- Handle JSON files ---
-                    elif file_extension == '.json':
-                        file_type = 'json'
-                        logger.debug("Debug in upload_file_view: Handling JSON.")
-                        # Call the json_to_list_of_dicts function
-                        header_list, list_of_dicts, error_message = json_to_list_of_dicts(raw_file_content)
-
-
-                    # --- Handle XML files (try generic first, then SpreadsheetML) ---
-                    elif file_extension == '.xml':
-                        file_type = 'xml'
-                        logger.debug("Debug in upload_file_view: Handling XML.")
-                        try:
-                            # Attempt to parse as generic XML first
-                            logger.debug("Debug in upload_file_view: Attempting to parse as generic XML.")
-                            header_list, list_of_dicts, error_message = generic_xml_to_list_of_dicts(raw_file_content)
-
-                            if not list_of_dicts: # If generic parsing didn't yield data
-                                logger.debug("Debug in upload_file_view: Generic XML parsing failed or found no data. Attempting SpreadsheetML XML.")
-                                # Fallback to SpreadsheetML parsing
-                                # Note the updated function name
-                                csv_string_from_xml = xml_to_csv_spreadsheetml(raw_file_content)
-
-                                if csv_string_from_xml:
-                                    logger.debug("Debug in upload_file_view: SpreadsheetML XML converted to CSV. Processing CSV...")
-                                    csv_file_like_object = io.StringIO(csv_string_from_xml)
-                                    header_list, list_of_dicts, error_message = csv_to_list_of_dicts(csv_file_like_object)
-                                else:
-                                    # If both XML parsing attempts failed
-                                    error_message = error_message if error_message else "XML conversion failed (neither generic nor SpreadsheetML format recognized or contained data)."
-                                    logger.debug(f"Debug in upload_file_view: {error_message}")
-                            else:
-                                logger.debug("Debug in upload_file_view: Successfully parsed as generic XML.")
-
-
-                        except Exception as e:
-                            error_message = f"An error occurred during XML processing: {e}"
-                            logger.error(f"Debug in upload_file_view: {error_message}", exc_info=True)
-
-
-                    else:
-                        file_type = 'unsupported'
-                        error_message = f"Unsupported file type: {file_extension}"
-                        logger.debug(f"Debug in upload_file_view: {error_message}")
-
-
-                except Exception as e:
-                    logger.error(f"Error reading uploaded file: {e}", exc_info=True)
-                    error_message = f"Error processing file: {e}"
-
+            # --- Convert in the background and follow the job's progress ---
+            # The response is sent as soon as the upload is saved; the job page (9.0)
+            # redirects to the data table when the conversion has finished.
+            if getattr(settings, 'CONVERSION_JOBS_ENABLED', True):
+                job = submit_conversion(uploaded_file)
+                if 'application/json' in request.headers.get('Accept', ''):
+                    return JsonResponse(_job_urls(job), status=202)
+                logger.debug(f"Debug in upload_file_view: Redirecting to the progress page of job {job.pk}.")
+                return redirect('visualizer:conversion_job', job_id=job.pk)
+
+            # --- Or convert within the request (CONVERSION_JOBS_ENABLED = False) ---
+            dataset_record, header_list, error_message = convert_upload(uploaded_file, uploaded_filename)
+            if dataset_record is not None:
+                _claim_dataset(request, dataset_record.pk)
 
-            else:
-                file_type = 'unknown'
-                error_message = "Could not determine file type."
-                logger.debug(f"Debug in upload_file_view: {error_message}")
-
-
-            # --- Store the standardized data and any error in the user's session ---
-            # Ensure datetime objects are converted to strings for JSON serialization
-            if list_of_dicts:
-                logger.debug(f"Debug in upload_file_view: Preparing {len(list_of_dicts)} rows for session storage.")
-                for row_dict in list_of_dicts:
-                    for key, value in row_dict.items():
-                        # Check if the value is a datetime object before calling isoformat()
-                        # datetime can be from the standard library or pandas.Timestamp, check for both
-                        if isinstance(value, (datetime, pd.Timestamp)):
-                            try:
-                                # Convert to ISO 8601 format string
-                                row_dict[key] = value.isoformat()
-                                # logger.debug(f"Debug in upload_file_view: Converted datetime object for key '{key}' to string for session.") # Minimize print
-                            except Exception as e:
-                                logger.debug(f"Debug in upload_file_view: Error converting datetime object for key '{key}' to string: {e}")
-                                row_dict[key] = str(value) # Fallback to string conversion
-
-            request.session['extracted_header'] = header_list
-            request.session['extracted_data_rows_list_of_dicts'] = list_of_dicts
             if error_message:
                 request.session['conversion_error'] = error_message
                 logger.debug(f"Debug in upload_file_view: Conversion error stored in session: {error_message}")
             else:
-                logger.debug(f"Debug in upload_file_view: Successfully converted {len(list_of_dicts) if list_of_dicts else 0} rows and {len(header_list) if header_list else 0} headers. Stored in session.")
-
-
-            # --- Save the converted data as an XLSX file (optional) ---
-            # Save only if conversion was successful and produced data
-            if list_of_dicts and not error_message:
-                try:
-                    filename_base = os.path.splitext(uploaded_filename)[0].replace(' ', '_')
-                    saved_filename = f"{filename_base}_converted.xlsx"
-                    # Define the full path to save the file
-                    # Ensure MEDIA_ROOT is configured in settings.py
-                    save_path = os.path.join(settings.MEDIA_ROOT, saved_filename)
-
-                    # Create MEDIA_ROOT directory if it doesn't exist
-                    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
-
-                    # Convert the list of dictionaries to a pandas DataFrame
-                    # Provide headers explicitly to ensure correct column order/names if data_rows is empty
-                    df_to_save = pd.DataFrame(list_of_dicts, columns=header_list if header_list else None)
-
-                    # Use BytesIO to write the Excel file in memory
-                    output = io.BytesIO()
-                    # Specify the engine explicitly
-                    writer = pd.ExcelWriter(output, engine='openpyxl')
-                    df_to_save.to_excel(writer, index=False, sheet_name='Sheet1')
-                    writer.close() # Use close() instead of save() with newer pandas/openpyxl
-                    xlsx_data = output.getvalue()
-
-                    # Write the bytes content to the file
-                    with open(save_path, 'wb') as f:
-                        f.write(xlsx_data)
-
-                    logger.debug(f"Debug in upload_file_view: XLSX file saved to: {save_path}")
-
-                except Exception as e:
-                    logger.error(f"Error saving XLSX file: {e}", exc_info=True)
-                    # Store saving error if no conversion error already exists
-                    if not request.session.get('conversion_error'):
-                        request.session['conversion_error'] = f"Error saving converted file: {e}"
-                        logger.debug("Debug in upload_file_view: XLSX saving error stored.")
+                logger.debug(f"Debug in upload_file_view: Stored dataset {request.session.get('dataset_id')} with {len(header_list)} headers.")
 
 
             # --- Redirect directly to the data table page ---
-            # Redirect regardless of saving XLSX, but only if the form was valid
+            # Redirect only if the form was valid. The XLSX export is written on its first download (see 8.0).
             logger.debug("Debug in upload_file_view: Redirecting to data table page.")
             return redirect('visualizer:visualizer_interface')
 
@@ -256,23 +124,63 @@ def upload_file_view(request):
         return HttpResponse("Method Not Allowed", status=405)
 
 
+# 2.0 Helpers for the server-side dataset store
+# ---------------------------------------------
+# Dataset IDs are sequential, so the dataset APIs only serve the datasets that were
+# converted in the same session: their IDs are kept in the session under 'dataset_ids'.
+def _claim_dataset(request, dataset_id):
+    """Makes dataset_id the session's current dataset and lets the session read it from the dataset APIs."""
+    request.session['dataset_id'] = dataset_id
+    owned_ids = request.session.get('dataset_ids', [])
+    if dataset_id not in owned_ids:
+        request.session['dataset_ids'] = [*owned_ids, dataset_id]
+
+
+def _owned_dataset(request, dataset_id):
+    """
+    Returns the Dataset record of dataset_id if this session converted it, else None
+    (answered as 404, so other sessions' dataset IDs cannot be told apart from missing ones).
+    """
+    if dataset_id not in request.session.get('dataset_ids', []) and dataset_id != request.session.get('dataset_id'):
+        logger.debug(f"Debug in _owned_dataset: Dataset {dataset_id} was not converted in this session.")
+        return None
+    return DatasetRecord.objects.filter(pk=dataset_id).first()
+
+
+def _open_session_dataset(request):
+    """
+    Returns (dataset_record, StoredDataset) for the session's dataset ID; (None, None) if
+    the session has no stored dataset. Opening only reads the columnar file's manifest.
+    """
+    dataset_id = request.session.get('dataset_id')
+    dataset_record = DatasetRecord.objects.filter(pk=dataset_id).first() if dataset_id is not None else None
+    stored = dataset_record.open_columns() if dataset_record is not None else None
+    if stored is None:
+        if dataset_id is not None:
+            logger.debug(f"Debug in _open_session_dataset: Dataset {dataset_id} has no stored columns.")
+        return None, None
+    return dataset_record, stored
+
+
 # 3.0 View for displaying the extracted data table
 # ------------------------------------------------
+# Only the first page of rows is rendered; the page fetches the next ones from the
+# data table API (10.0) as the user scrolls, so the page costs the same for any dataset size.
 def visualizer_interface(request):
-    extracted_data_list = request.session.get('extracted_data_rows_list_of_dicts', [])
-    extracted_header = request.session.get('extracted_header', [])
+    dataset_record, stored = _open_session_dataset(request)
+    table = table_page(stored) if stored is not None else None
     conversion_error = request.session.get('conversion_error', None)
 
-    logger.debug(f"Debug in visualizer_interface: Retrieved {len(extracted_header)} headers from session.")
-    logger.debug(f"Debug in visualizer_interface: Retrieved {len(extracted_data_list)} data rows from session.")
+    if table is not None:
+        logger.debug(f"Debug in visualizer_interface: Rendering {len(table['rows'])} of {table['total']} rows, {len(table['columns'])} columns.")
     if conversion_error:
         logger.debug(f"Debug in visualizer_interface: Conversion error: {conversion_error}")
 
 
     context = {
-        'extracted_header': extracted_header,
-        'extracted_data_rows_list_of_dicts': extracted_data_list,
+        'table': table,
         'conversion_error': conversion_error,
+        'dataset_id': dataset_record.pk if dataset_record is not None else None, # For the XLSX link and the table API
     }
 
     logger.debug("Debug in visualizer_interface: Rendering visualizer_interface.html")
@@ -280,45 +188,428 @@ def visualizer_interface(request):
 
 # 4.0 View for displaying the chart only
 # -------------------------------------
+# The page no longer embeds the data: its script loads the 'Date' and 'Amount' columns
+# from the chart series API (11.0), which the browser can cache and revalidate.
+CHART_COLUMNS = ['Date', 'Amount'] # Columns used by the script in chart_only.html
 def chart_only_view(request):
-    extracted_data_list = request.session.get('extracted_data_rows_list_of_dicts', [])
-    extracted_header = request.session.get('extracted_header', [])
+    dataset_record, stored = _open_session_dataset(request)
     conversion_error = request.session.get('conversion_error', None)
 
-    logger.debug(f"Debug in chart_only_view: Retrieved {len(extracted_header)} headers from session.")
-    logger.debug(f"Debug in chart_only_view: Retrieved {len(extracted_data_list)} data rows from session.")
+    series_url = None
+    if stored is not None and all(name in stored.columns for name in CHART_COLUMNS):
+        x, y = CHART_COLUMNS
+        series_url = f"{reverse('visualizer:dataset_series', args=[dataset_record.pk])}?{urlencode({'x': x, 'y': y})}"
+        logger.debug(f"Debug in chart_only_view: Charting {len(stored)} rows of dataset {dataset_record.pk}.")
+    elif stored is not None:
+        logger.debug(f"Debug in chart_only_view: Dataset {dataset_record.pk} has no {' and '.join(CHART_COLUMNS)} columns to chart.")
     if conversion_error:
         logger.debug(f"Debug in chart_only_view: Conversion error: {conversion_error}")
 
 
-    # Prepare data for the chart (assuming JSON format is needed by your JS)
-    extracted_data_json_string = "[]" # Default to empty JSON array
+    context = {
+        'series_url': series_url,
+        'conversion_error': conversion_error,
+    }
+
+    logger.debug("Debug in chart_only_view: Rendering chart_only.html")
+    return render(request, 'visualizer/chart_only.html', context)
+
+
+# 5.0 Parse cache counters
+# ------------------------
+def parse_cache_stats_view(request):
+    # Hit/miss/eviction counters of this process and the current size of the cache
+    return JsonResponse(get_parse_cache().stats())
+
+
+# 6.0 Transaction aggregation API
+# -------------------------------
+# GET /api/datasets/<id>/aggregate/?bucket=month&by=type&from=2024-01-01&to=2025-01-01&q=amazon
+# Sums/counts/averages are computed by one GROUP BY query over the Transaction table.
+def transaction_aggregate_view(request, dataset_id):
+    if _owned_dataset(request, dataset_id) is None:
+        return JsonResponse({'error': f"Dataset {dataset_id} does not exist."}, status=404)
+
+    date_bounds = {}
+    for param in ('from', 'to'):
+        raw_value = request.GET.get(param)
+        if not raw_value:
+            continue
+        parsed = parse_date(raw_value) if len(raw_value) == 10 else None
+        if parsed is None:
+            return JsonResponse({'error': f"'{param}' must be a date in YYYY-MM-DD format."}, status=400)
+        date_bounds[param] = datetime.combine(parsed, datetime.min.time(), tzinfo=timezone.utc)
+
     try:
-        # Convert the list of dictionaries to a JSON string for the JavaScript
-        # Use default=str to handle any remaining non-serializable objects (like datetime if not converted earlier)
-        # Ensure only valid JSON data is included
-        json_serializable_data = []
-        if extracted_data_list:
-             # Simple deep conversion to string for all values to ensure JSON serializability
-             # More robust handling might be needed depending on data types
-             json_serializable_data = [{key: str(value) if value is not None else None for key, value in row.items()} for row in extracted_data_list]
+        result = aggregate_transactions(
+            dataset_id,
+            bucket=request.GET.get('bucket', 'month'),
+            by_type=request.GET.get('by') == 'type',
+            date_from=date_bounds.get('from'),
+            date_to=date_bounds.get('to'),
+            search=request.GET.get('q'),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    logger.debug(f"Debug in transaction_aggregate_view: Returning {len(result['labels'])} buckets for dataset {dataset_id}.")
+    return JsonResponse({'dataset': dataset_id, **result})
+
+
+# 7.0 Transaction search API
+# --------------------------
+# GET /api/datasets/<id>/search/?q=amaz "direct debit"&limit=1000
+# Bare terms are prefix matches, quoted text is a phrase; answered from the FTS5 index
+# (visualizer.search). The same q parameter filters the aggregation API above.
+def transaction_search_view(request, dataset_id):
+    if _owned_dataset(request, dataset_id) is None:
+        return JsonResponse({'error': f"Dataset {dataset_id} does not exist."}, status=404)
 
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return JsonResponse({'error': "'limit' must be a positive integer."}, status=400)
 
-        extracted_data_json_string = json.dumps(json_serializable_data, separators=(',', ':'))
-        logger.debug("Debug in chart_only_view: Successfully serialized data to JSON string.")
+    query = request.GET.get('q', '')
+    try:
+        result = search_transactions(dataset_id, query, limit=limit)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    logger.debug(f"Debug in transaction_search_view: {result['count']} matches for '{query}' in dataset {dataset_id}.")
+    return JsonResponse({'dataset': dataset_id, 'query': query, **result, 'truncated': result['count'] > len(result['ids'])})
+
+
+# 8.0 XLSX export download
+# ------------------------
+# GET /datasets/<id>/export.xlsx
+# The workbook is written from the stored columns on the first download and cached under
+# the upload's content hash (visualizer.export), so uploads no longer pay for it.
+# Single byte ranges are supported, so interrupted downloads can resume.
+_BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _FileRange:
+    """Read-only view of the next length bytes of an open file, streamed by FileResponse."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _ranged_file_response(request, path, filename, content_type, etag):
+    """
+    Returns a FileResponse for path, or a 206 response for a satisfiable single
+    'Range: bytes=...' request. Multiple ranges, malformed headers and a stale If-Range
+    get the whole file, as RFC 9110 allows.
+    """
+    size = os.path.getsize(path)
+    byte_range = None
+    match = _BYTE_RANGE.match(request.headers.get('Range', '').replace(' ', ''))
+    if match and (match[1] or match[2]) and request.headers.get('If-Range', etag) == etag:
+        if match[1]:
+            start = int(match[1])
+            stop = min(int(match[2]) + 1, size) if match[2] else size
+            valid = not match[2] or int(match[2]) >= start
+        else: # Suffix range: the last N bytes
+            start, stop, valid = max(size - int(match[2]), 0), size, True
+        if valid and start >= stop:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+        if valid:
+            byte_range = (start, stop)
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, as_attachment=True, filename=filename, content_type=content_type)
+    else:
+        start, stop = byte_range
+        file.seek(start)
+        response = FileResponse(_FileRange(file, stop - start), status=206, as_attachment=True,
+                                filename=filename, content_type=content_type)
+        response['Content-Length'] = stop - start
+        response['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
+
+
+def dataset_export_view(request, dataset_id):
+    dataset_record = _owned_dataset(request, dataset_id)
+    if dataset_record is None:
+        return HttpResponse(f"Dataset {dataset_id} does not exist.", status=404)
 
+    try:
+        path = get_xlsx_export(dataset_record)
     except Exception as e:
-        logger.error(f"Error serializing data to JSON for chart: {e}", exc_info=True)
-        # If serialization fails here, it's a fallback error, the main conversion should handle types
-        extracted_data_json_string = "[]" # Ensure it's still valid JSON
+        logger.error(f"Error writing XLSX export of dataset {dataset_id}: {e}", exc_info=True)
+        return HttpResponse(f"Error writing the XLSX file: {e}", status=500)
+    if path is None:
+        return HttpResponse(f"Dataset {dataset_id} has no stored data to export.", status=404)
+
+    logger.debug(f"Debug in dataset_export_view: Serving {path} for dataset {dataset_id}.")
+    return _ranged_file_response(request, path, download_filename(dataset_record), XLSX_CONTENT_TYPE, f'"{export_key(dataset_record)}"')
+
+
+# 9.0 Background conversion jobs
+# ------------------------------
+# GET /jobs/<id>/         progress page; once the job has finished, stores its dataset in the
+#                         session and redirects to the data table
+# GET /jobs/<id>/status/  progress as JSON, for polling
+# GET /jobs/<id>/events/  progress as a Server-Sent Events stream ('progress' events, then 'done')
+JOB_EVENT_POLL_SECONDS = 0.5
+JOB_EVENT_KEEPALIVE_SECONDS = 15 # Comment lines keep proxies from closing an idle stream
+
+
+def _job_urls(job):
+    return {
+        'job_id': str(job.pk),
+        'job_url': reverse('visualizer:conversion_job', args=[job.pk]),
+        'status_url': reverse('visualizer:conversion_job_status', args=[job.pk]),
+        'events_url': reverse('visualizer:conversion_job_events', args=[job.pk]),
+    }
 
 
-    context = {
-        'extracted_header': extracted_header,
-        'extracted_data_json_string': extracted_data_json_string,
-        'conversion_error': conversion_error,
-        'extracted_data_rows_list_of_dicts': extracted_data_list, # Keep for the template check
-    }
+def _job_state(job):
+    state = job.progress()
+    if job.finished:
+        state['redirect_url'] = reverse('visualizer:conversion_job', args=[job.pk])
+    return state
 
-    logger.debug("Debug in chart_only_view: Rendering chart_only.html")
-    return render(request, 'visualizer/chart_only.html', context)
+
+def conversion_job_view(request, job_id):
+    job = ConversionJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return HttpResponse(f"Conversion job {job_id} does not exist.", status=404)
+    job = expire_if_stale(job)
+
+    if job.finished:
+        # Same session keys as a synchronous upload
+        request.session.pop('dataset_id', None)
+        request.session.pop('conversion_error', None)
+        if job.dataset_id is not None:
+            _claim_dataset(request, job.dataset_id)
+        if job.error:
+            request.session['conversion_error'] = job.error
+        logger.debug(f"Debug in conversion_job_view: Job {job_id} {job.status}, redirecting to data table page.")
+        return redirect('visualizer:visualizer_interface')
+
+    context = {'job': job, 'job_state': _job_state(job), **_job_urls(job)}
+    return render(request, 'visualizer/conversion_job.html', context)
+
+
+def conversion_job_status_view(request, job_id):
+    job = ConversionJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({'error': f"Conversion job {job_id} does not exist."}, status=404)
+    return JsonResponse(_job_state(expire_if_stale(job)))
+
+
+def conversion_job_events_view(request, job_id):
+    if not ConversionJob.objects.filter(pk=job_id).exists():
+        return JsonResponse({'error': f"Conversion job {job_id} does not exist."}, status=404)
+
+    def event_stream():
+        last_state = None
+        last_sent = time.monotonic()
+        while True:
+            job = ConversionJob.objects.filter(pk=job_id).first()
+            if job is None:
+                return
+            state = _job_state(expire_if_stale(job))
+            if state != last_state:
+                yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+                last_state, last_sent = state, time.monotonic()
+            elif time.monotonic() - last_sent >= JOB_EVENT_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            if job.finished:
+                yield f"event: done\ndata: {json.dumps(state)}\n\n"
+                return
+            time.sleep(JOB_EVENT_POLL_SECONDS)
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Disable proxy buffering (nginx)
+    return response
+
+
+# 10.0 Data table API
+# -------------------
+# GET /api/datasets/<id>/rows/?limit=100&offset=0&columns=Date&columns=Amount
+# GET /api/datasets/<id>/rows/?sort=Amount&order=desc&filter=Type:eq:DEBIT&filter=Date:gte:2024-01-01
+# GET /api/datasets/<id>/rows/?cursor=<next_cursor of the previous page>
+# Returns one page of rows as JSON arrays in column order (visualizer.table), read from
+# the columnar file; used by the data table to load rows past the first page and to
+# sort and filter the whole dataset (sort orders are computed once per column and saved).
+def dataset_rows_view(request, dataset_id):
+    dataset_record = _owned_dataset(request, dataset_id)
+    stored = dataset_record.open_columns() if dataset_record is not None else None
+    if stored is None:
+        return JsonResponse({'error': f"Dataset {dataset_id} does not exist."}, status=404)
+
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(request.GET.get('offset', 0))
+    except ValueError:
+        return JsonResponse({'error': "'limit' and 'offset' must be integers."}, status=400)
+
+    try:
+        if request.GET.get('cursor'):
+            # The cursor carries the view (sort and filters) of the page it follows
+            view = decode_cursor(request.GET['cursor'])
+            offset = view.pop('offset')
+        else:
+            view = {'sort': request.GET.get('sort') or None, 'order': request.GET.get('order', 'asc'),
+                    'filters': [parse_filter(text) for text in request.GET.getlist('filter')]}
+        result = table_page(stored, columns=request.GET.getlist('columns'), offset=offset, limit=limit, **view)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    logger.debug(f"Debug in dataset_rows_view: Returning {len(result['rows'])} rows of dataset {dataset_id} from row {offset}.")
+    return JsonResponse({'dataset': dataset_id, **result})
+
+
+# 11.0 Chart series API
+# ---------------------
+# GET /api/datasets/<id>/series/?x=Date&y=Amount&y=Balance[&format=json|binary|arrow]
+#     [&x_min=...&x_max=...&max_points=2000&method=lttb|minmax]
+# Returns the requested columns as typed arrays (visualizer.series): numbers as numbers,
+# dates as epoch milliseconds. Each series is built once, stored gzip-compressed and served
+# as is; its ETag is derived from the upload's content hash, so a revalidation (If-None-Match)
+# is answered with 304 without reading anything.
+# format=binary streams the stored column arrays after a small JSON header (read by
+# chart_logic.js into Float64Arrays) and format=arrow returns an Arrow IPC stream (needs
+# pyarrow); both are encoded per request, as they cost little more than reading the columns.
+# With any of x_min, x_max, max_points or method, only the rows within [x_min, x_max] are
+# returned, downsampled to at most max_points (visualizer.series.downsample_rows), with a
+# 'window' describing them; the chart requests a new window after each zoom or pan.
+def _etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match', '')
+    return if_none_match.strip() == '*' or etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+
+
+def _series_window(request):
+    """
+    Parses the downsampling parameters of a series request.
+
+    Returns:
+        dict: x_min, x_max, max_points and method (keyword arguments of downsample_rows),
+              or None if the request has none of them (the whole series).
+
+    Raises:
+        ValueError: If a parameter is invalid.
+    """
+    if not any(name in request.GET for name in ('x_min', 'x_max', 'max_points', 'method')):
+        return None
+    window = {'x_min': None, 'x_max': None, 'max_points': DEFAULT_MAX_POINTS, 'method': request.GET.get('method') or 'lttb'}
+    for name in ('x_min', 'x_max'):
+        if request.GET.get(name):
+            try:
+                window[name] = float(request.GET[name])
+            except ValueError:
+                raise ValueError(f"'{name}' must be a number.") from None
+            if not math.isfinite(window[name]):
+                raise ValueError(f"'{name}' must be a finite number.")
+    if request.GET.get('max_points'):
+        try:
+            window['max_points'] = int(request.GET['max_points'])
+        except ValueError:
+            raise ValueError("'max_points' must be an integer.") from None
+        if not 3 <= window['max_points'] <= MAX_POINTS_LIMIT:
+            raise ValueError(f"'max_points' must be between 3 and {MAX_POINTS_LIMIT}.")
+    if window['method'] not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"'method' must be one of: {', '.join(DOWNSAMPLE_METHODS)}.")
+    return window
+
+
+def _json_series_response(request, dataset_record, x, y_columns):
+    path = get_series_file(dataset_record, x, y_columns)
+    if path is None:
+        return None
+    if re.search(r'\bgzip\b', request.headers.get('Accept-Encoding', '')):
+        response = FileResponse(open(path, 'rb'), content_type=CONTENT_TYPES['json'])
+        response['Content-Encoding'] = 'gzip'
+    else:
+        with open(path, 'rb') as f:
+            response = HttpResponse(gzip.decompress(f.read()), content_type=CONTENT_TYPES['json'])
+    logger.debug(f"Debug in dataset_series_view: Serving {os.path.basename(path)} for dataset {dataset_record.pk}.")
+    return response
+
+
+def _encoded_series_response(dataset_record, x, y_columns, series_format, window):
+    stored = dataset_record.open_columns()
+    if stored is None:
+        return None
+    rows = None
+    if window is not None:
+        rows, total = downsample_rows(stored, x, y_columns, **window)
+        window = {**window, 'total': total, 'returned': len(rows)}
+
+    if series_format == 'json':
+        response = JsonResponse({'dataset': dataset_record.pk, **build_series(stored, x, y_columns, rows), 'window': window})
+        response['Content-Length'] = len(response.content)
+    elif series_format == 'binary':
+        chunks = encode_series_binary(stored, x, y_columns, dataset_id=dataset_record.pk, rows=rows, window=window)
+        # Streamed chunk by chunk: the column buffers are never joined into one body
+        response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES['binary'])
+        response['Content-Length'] = sum(len(chunk) for chunk in chunks)
+    else:
+        body = encode_series_arrow(stored, x, y_columns, rows=rows, window=window)
+        response = HttpResponse(memoryview(body), content_type=CONTENT_TYPES['arrow'])
+        response['Content-Length'] = body.size
+    logger.debug(f"Debug in dataset_series_view: Serving {series_format} series of dataset {dataset_record.pk} "
+                 f"({response['Content-Length']} bytes).")
+    return response
+
+
+def dataset_series_view(request, dataset_id):
+    x = request.GET.get('x')
+    y_columns = request.GET.getlist('y')
+    series_format = request.GET.get('format', 'json')
+    if not x or not y_columns:
+        return JsonResponse({'error': "'x' and at least one 'y' column are required."}, status=400)
+    if series_format not in SERIES_FORMATS:
+        return JsonResponse({'error': f"'format' must be one of: {', '.join(SERIES_FORMATS)}."}, status=400)
+    try:
+        window = _series_window(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    dataset_record = _owned_dataset(request, dataset_id)
+    if dataset_record is None:
+        return JsonResponse({'error': f"Dataset {dataset_id} does not exist."}, status=404)
+
+    etag = f'"{series_etag(dataset_record, x, y_columns, series_format, window)}"'
+    if _etag_matches(request, etag):
+        response = HttpResponse(status=304)
+    else:
+        try:
+            if series_format == 'json' and window is None:
+                response = _json_series_response(request, dataset_record, x, y_columns)
+            else:
+                response = _encoded_series_response(dataset_record, x, y_columns, series_format, window)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except ImportError:
+            logger.error("Arrow series requested but pyarrow is not installed.")
+            return JsonResponse({'error': "The Arrow format is not available on this server (pyarrow is not installed)."}, status=406)
+        if response is None:
+            return JsonResponse({'error': f"Dataset {dataset_id} has no stored data."}, status=404)
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache' # Cached by the browser, revalidated on every use
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response